@@ -0,0 +1,198 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of DetectionIoUEvaluator and DetMetric against the previous
+evaluator, which built the shapely polygons of every (gt, det) pair in
+nested loops and evaluated the images one by one. Images hold text line
+quads, some of them don't care, detections are jittered gts with misses and
+false positives.
+
+    python benchmark/det_eval_benchmark.py --image_num 500 --num_workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from ppocr.metrics.det_metric import DetMetric
+from ppocr.metrics.eval_det_iou import DetectionIoUEvaluator
+
+
+def evaluate_image_legacy(evaluator, gt, pred):
+    def get_union(pD, pG):
+        return Polygon(pD).union(Polygon(pG)).area
+
+    def get_intersection(pD, pG):
+        return Polygon(pD).intersection(Polygon(pG)).area
+
+    gtPols = []
+    detPols = []
+    gtDontCarePolsNum = []
+    detDontCarePolsNum = []
+    detMatched = 0
+    for n in range(len(gt)):
+        points = gt[n]['points']
+        if not Polygon(points).is_valid:
+            continue
+        gtPols.append(points)
+        if gt[n]['ignore']:
+            gtDontCarePolsNum.append(len(gtPols) - 1)
+
+    for n in range(len(pred)):
+        points = pred[n]['points']
+        if not Polygon(points).is_valid:
+            continue
+        detPols.append(points)
+        for dontCarePol in gtDontCarePolsNum:
+            dontCarePol = gtPols[dontCarePol]
+            intersected_area = get_intersection(dontCarePol, points)
+            pdDimensions = Polygon(points).area
+            precision = 0 if pdDimensions == 0 else intersected_area / pdDimensions
+            if (precision > evaluator.area_precision_constraint):
+                detDontCarePolsNum.append(len(detPols) - 1)
+                break
+
+    if len(gtPols) > 0 and len(detPols) > 0:
+        iouMat = np.empty([len(gtPols), len(detPols)])
+        gtRectMat = np.zeros(len(gtPols), np.int8)
+        detRectMat = np.zeros(len(detPols), np.int8)
+        for gtNum in range(len(gtPols)):
+            for detNum in range(len(detPols)):
+                pG = gtPols[gtNum]
+                pD = detPols[detNum]
+                iouMat[gtNum, detNum] = get_intersection(pD, pG) / get_union(
+                    pD, pG)
+        for gtNum in range(len(gtPols)):
+            for detNum in range(len(detPols)):
+                if gtRectMat[gtNum] == 0 and detRectMat[
+                        detNum] == 0 and gtNum not in gtDontCarePolsNum and detNum not in detDontCarePolsNum:
+                    if iouMat[gtNum, detNum] > evaluator.iou_constraint:
+                        gtRectMat[gtNum] = 1
+                        detRectMat[detNum] = 1
+                        detMatched += 1
+
+    return {
+        'gtCare': len(gtPols) - len(gtDontCarePolsNum),
+        'detCare': len(detPols) - len(detDontCarePolsNum),
+        'detMatched': detMatched,
+    }
+
+
+def gen_quad(rng, cx, cy, w, h):
+    theta = rng.uniform(-0.2, 0.2)
+    xs = np.array([-w, w, w, -w]) / 2
+    ys = np.array([-h, -h, h, h]) / 2
+    return np.stack(
+        [
+            cx + xs * np.cos(theta) - ys * np.sin(theta),
+            cy + xs * np.sin(theta) + ys * np.cos(theta)
+        ],
+        axis=1).astype(np.float32)
+
+
+def gen_image(rng, text_num, img_size=960):
+    """
+    return: (gt polygons [K, 4, 2], ignore tags [K], det polygons [L, 4, 2])
+    """
+    gts = []
+    dets = []
+    for _ in range(text_num):
+        cx, cy = rng.uniform(0, img_size, 2)
+        w, h = rng.uniform(30, 300), rng.uniform(12, 40)
+        gts.append(gen_quad(rng, cx, cy, w, h))
+        if rng.uniform() < 0.9:
+            jx, jy = rng.normal(0, h * 0.15, 2)
+            dets.append(
+                gen_quad(rng, cx + jx, cy + jy, w * rng.uniform(0.8, 1.2),
+                         h * rng.uniform(0.8, 1.2)))
+    for _ in range(text_num // 10):
+        cx, cy = rng.uniform(0, img_size, 2)
+        dets.append(
+            gen_quad(rng, cx, cy, rng.uniform(30, 300), rng.uniform(12, 40)))
+    ignore_tags = rng.uniform(size=len(gts)) < 0.1
+    return np.array(gts), ignore_tags, np.array(dets).reshape([-1, 4, 2])
+
+
+def to_batches(images, batch_size):
+    for i in range(0, len(images), batch_size):
+        chunk = images[i:i + batch_size]
+        preds = [{'points': dets} for _, _, dets in chunk]
+        batch = [
+            None, None, [gts for gts, _, _ in chunk],
+            [ignore_tags for _, ignore_tags, _ in chunk]
+        ]
+        yield preds, batch
+
+
+def to_info_lists(image):
+    gts, ignore_tags, dets = image
+    gt_info_list = [{
+        'points': gt,
+        'text': '',
+        'ignore': ignore_tag
+    } for gt, ignore_tag in zip(gts, ignore_tags)]
+    det_info_list = [{'points': det, 'text': ''} for det in dets]
+    return gt_info_list, det_info_list
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    images = [gen_image(rng, args.text_num) for _ in range(args.image_num)]
+    evaluator = DetectionIoUEvaluator()
+
+    start = time.time()
+    legacy = [
+        evaluate_image_legacy(evaluator, *to_info_lists(image))
+        for image in images
+    ]
+    legacy_cost = time.time() - start
+
+    start = time.time()
+    new = [evaluator.evaluate_image(*to_info_lists(image)) for image in images]
+    cost = time.time() - start
+
+    metric = DetMetric(num_workers=args.num_workers)
+    start = time.time()
+    for preds, batch in to_batches(images, args.batch_size):
+        metric(preds, batch)
+    pool_metrics = metric.get_metric()
+    pool_cost = time.time() - start
+
+    legacy_metrics = evaluator.combine_results(legacy)
+    print("images: {}, texts per image: {}".format(
+        len(images), args.text_num))
+    print("per image results equal: {}, metrics equal: {}, {}".format(
+        legacy == new, legacy_metrics == evaluator.combine_results(new),
+        legacy_metrics == pool_metrics))
+    print("legacy: {:.2f}s, new: {:.2f}s, speedup: {:.1f}x, DetMetric with "
+          "{} workers: {:.2f}s, speedup: {:.1f}x".format(
+              legacy_cost, cost, legacy_cost / cost, args.num_workers,
+              pool_cost, legacy_cost / pool_cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image_num", type=int, default=500)
+    parser.add_argument("--text_num", type=int, default=40)
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--num_workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,197 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Samples/sec of MakeBorderMap on dense synthetic DB training samples against
+the previous (num_vertices, H, W) implementation, with a tolerance check of
+the threshold maps and masks.
+
+The previous implementation loses a few pixels lying on an edge line to NaN
+(1 - cos^2 gets slightly negative), those pixels are left out of the check
+and counted separately.
+
+    python benchmark/make_border_map_benchmark.py --num_polys 200
+"""
+
+import os
+import sys
+import time
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import cv2
+import numpy as np
+
+from ppocr.data.imaug.make_border_map import MakeBorderMap, Polygon, pyclipper
+
+
+class MakeBorderMapLegacy(MakeBorderMap):
+    def __call__(self, data):
+        # pixels whose distance came out NaN, left out of the comparison
+        self.nan_mask = np.zeros(data['image'].shape[:2], dtype=bool)
+        data = super(MakeBorderMapLegacy, self).__call__(data)
+        data['nan_mask'] = self.nan_mask
+        return data
+
+    def draw_border_map(self, polygon, canvas, mask):
+        polygon = np.array(polygon)
+        polygon_shape = Polygon(polygon)
+        if polygon_shape.area <= 0:
+            return
+        distance = polygon_shape.area * (
+            1 - np.power(self.shrink_ratio, 2)) / polygon_shape.length
+        subject = [tuple(l) for l in polygon]
+        padding = pyclipper.PyclipperOffset()
+        padding.AddPath(subject, pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
+
+        padded_polygon = np.array(padding.Execute(distance)[0])
+        cv2.fillPoly(mask, [padded_polygon.astype(np.int32)], 1.0)
+
+        xmin = padded_polygon[:, 0].min()
+        xmax = padded_polygon[:, 0].max()
+        ymin = padded_polygon[:, 1].min()
+        ymax = padded_polygon[:, 1].max()
+        width = xmax - xmin + 1
+        height = ymax - ymin + 1
+
+        polygon[:, 0] = polygon[:, 0] - xmin
+        polygon[:, 1] = polygon[:, 1] - ymin
+
+        xs = np.broadcast_to(
+            np.linspace(
+                0, width - 1, num=width).reshape(1, width), (height, width))
+        ys = np.broadcast_to(
+            np.linspace(
+                0, height - 1, num=height).reshape(height, 1), (height, width))
+
+        distance_map = np.zeros(
+            (polygon.shape[0], height, width), dtype=np.float32)
+        for i in range(polygon.shape[0]):
+            j = (i + 1) % polygon.shape[0]
+            absolute_distance = self._distance(xs, ys, polygon[i], polygon[j])
+            distance_map[i] = np.clip(absolute_distance / distance, 0, 1)
+        distance_map = distance_map.min(axis=0)
+
+        xmin_valid = min(max(0, xmin), canvas.shape[1] - 1)
+        xmax_valid = min(max(0, xmax), canvas.shape[1] - 1)
+        ymin_valid = min(max(0, ymin), canvas.shape[0] - 1)
+        ymax_valid = min(max(0, ymax), canvas.shape[0] - 1)
+        distance_map = distance_map[
+            ymin_valid - ymin:ymax_valid - ymax + height,
+            xmin_valid - xmin:xmax_valid - xmax + width]
+        self.nan_mask[ymin_valid:ymax_valid + 1, xmin_valid:xmax_valid + 1] |= \
+            np.isnan(distance_map)
+        canvas[ymin_valid:ymax_valid + 1, xmin_valid:xmax_valid + 1] = np.fmax(
+            1 - distance_map,
+            canvas[ymin_valid:ymax_valid + 1, xmin_valid:xmax_valid + 1])
+
+
+    def _distance(self, xs, ys, point_1, point_2):
+        '''
+        compute the distance from point to a line
+        ys: coordinates in the first axis
+        xs: coordinates in the second axis
+        point_1, point_2: (x, y), the end of the line
+        '''
+        height, width = xs.shape[:2]
+        square_distance_1 = np.square(xs - point_1[0]) + np.square(ys - point_1[
+            1])
+        square_distance_2 = np.square(xs - point_2[0]) + np.square(ys - point_2[
+            1])
+        square_distance = np.square(point_1[0] - point_2[0]) + np.square(
+            point_1[1] - point_2[1])
+
+        cosin = (square_distance - square_distance_1 - square_distance_2) / (
+            2 * np.sqrt(square_distance_1 * square_distance_2))
+        square_sin = 1 - np.square(cosin)
+        square_sin = np.nan_to_num(square_sin)
+        result = np.sqrt(square_distance_1 * square_distance_2 * square_sin /
+                         square_distance)
+
+        result[cosin <
+               0] = np.sqrt(np.fmin(square_distance_1, square_distance_2))[cosin
+                                                                           < 0]
+        return result
+
+def gen_sample(rng, height, width, num_polys):
+    """Rotated boxes and curved text polygons centered inside the image."""
+    polys = []
+    for _ in range(num_polys):
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        bw, bh = rng.uniform(8, 120), rng.uniform(6, 40)
+        if rng.rand() < 0.3:
+            t = np.linspace(0, 1, rng.randint(3, 8))
+            top = np.stack([t * bw - bw / 2, 5 * np.sin(t * 3) - bh / 2], 1)
+            t = t[::-1]
+            bottom = np.stack([t * bw - bw / 2, 5 * np.sin(t * 3) + bh / 2], 1)
+            pts = np.concatenate([top, bottom])
+        else:
+            pts = np.array([[-bw, -bh], [bw, -bh], [bw, bh], [-bw, bh]]) / 2
+        angle = rng.uniform(-0.5, 0.5)
+        rotate = np.array([[np.cos(angle), -np.sin(angle)],
+                           [np.sin(angle), np.cos(angle)]])
+        pts = pts.dot(rotate.T) + [cx, cy]
+        if rng.rand() < 0.5:
+            pts = np.round(pts)
+        polys.append(pts.astype(np.float32))
+    return {
+        'image': np.zeros((height, width, 3), dtype=np.uint8),
+        'polys': polys,
+        'ignore_tags': [rng.rand() < 0.05 for _ in polys]
+    }
+
+
+def run(op, samples):
+    start = time.time()
+    results = [op(dict(sample)) for sample in samples]
+    return results, time.time() - start
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    samples = [
+        gen_sample(rng, args.height, args.width, args.num_polys)
+        for _ in range(args.num_samples)
+    ]
+
+    legacy_res, legacy_cost = run(MakeBorderMapLegacy(), samples)
+    res, cost = run(MakeBorderMap(), samples)
+
+    map_diff = np.concatenate([
+        np.abs(a['threshold_map'] - b['threshold_map'])[~a['nan_mask']]
+        for a, b in zip(legacy_res, res)
+    ])
+    mask_diff = sum((a['threshold_mask'] != b['threshold_mask']).sum()
+                    for a, b in zip(legacy_res, res))
+    print("threshold map: max diff {:.2e}, pixels beyond {}: {}, legacy NaN "
+          "pixels: {}".format(map_diff.max(), args.tolerance, (
+              map_diff > args.tolerance).sum(), sum(a['nan_mask'].sum()
+                                                      for a in legacy_res)))
+    print("threshold mask: {} different pixels".format(mask_diff))
+    print("samples: {}, legacy: {:.2f} samples/s, new: {:.2f} samples/s, "
+          "speedup: {:.1f}x".format(
+              len(samples), len(samples) / legacy_cost, len(samples) / cost,
+              legacy_cost / cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=10)
+    parser.add_argument("--num_polys", type=int, default=200)
+    parser.add_argument("--height", type=int, default=640)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--tolerance", type=float, default=2e-3)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
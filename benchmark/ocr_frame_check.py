@@ -0,0 +1,82 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Regression check of TextSystem.ocr_frame on a synthetic fixed camera stream:
+a frame without text followed by frames with text must be detected, and
+text appearing outside of the rois of the last frame must be found within
+frame_redetect_interval frames. Takes the usual inference args.
+
+    python benchmark/ocr_frame_check.py --det_model_dir=... \
+        --rec_model_dir=... --frame_diff_thresh=8 --frame_redetect_interval=5
+"""
+
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import cv2
+import numpy as np
+
+import tools.infer.utility as utility
+from tools.infer.predict_system import TextSystem
+
+
+def gen_frame(rng, texts):
+    img = np.full((240, 480, 3), 255, np.uint8)
+    for text, org in texts:
+        cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0),
+                    5)
+    noise = rng.randint(-3, 4, img.shape)
+    return np.clip(img.astype(np.int64) + noise, 0, 255).astype(np.uint8)
+
+
+def box_num(boxes):
+    return 0 if boxes is None else len(boxes)
+
+
+def main(args):
+    if args.frame_diff_thresh <= 0:
+        args.frame_diff_thresh = 8
+    interval = max(args.frame_redetect_interval, 1)
+    args.frame_redetect_interval = interval
+    text_sys = TextSystem(args)
+    rng = np.random.RandomState(0)
+
+    failed = 0
+    blank = gen_frame(rng, [])
+    boxes, _, _ = text_sys.ocr_frame(blank)
+    text = [('12345', (40, 100))]
+    for _ in range(3):
+        boxes, _, _ = text_sys.ocr_frame(gen_frame(rng, text))
+    if box_num(boxes) == 0:
+        failed += 1
+        print("text after a frame without text is not detected")
+
+    found = box_num(boxes)
+    text.append(('678', (40, 200)))
+    for _ in range(interval + 1):
+        boxes, _, _ = text_sys.ocr_frame(gen_frame(rng, text))
+    if box_num(boxes) <= found:
+        failed += 1
+        print("text outside of the last rois is not detected")
+
+    print("frames processed: {}, skipped: {}, failed checks: {}".format(
+        text_sys.frame_processed, text_sys.frame_skipped, failed))
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(utility.parse_args()) else 1)
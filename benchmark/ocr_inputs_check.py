@@ -0,0 +1,84 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Regression check of PaddleOCR.ocr on a directory holding images and a pdf:
+the directory is read and detected in chunks of det_batch_num images, every
+input must get the same result as ocr() on the input alone, the result of
+the pdf being the list of the results of its pages. Needs PyMuPDF to write
+the pdf.
+
+    python benchmark/ocr_inputs_check.py --image_dir doc/imgs --det_batch_num 4
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import fitz
+
+from paddleocr import PaddleOCR
+from ppocr.utils.utility import get_image_file_list
+
+
+def write_pdf(image_files, pdf_path):
+    pdf = fitz.open()
+    for image_file in image_files:
+        img = fitz.open(image_file)
+        pdf.insert_pdf(fitz.open("pdf", img.convert_to_pdf()))
+    pdf.save(pdf_path)
+
+
+def main(args):
+    image_files = get_image_file_list(args.image_dir)[:args.image_num]
+    input_dir = tempfile.mkdtemp()
+    try:
+        for image_file in image_files:
+            shutil.copy(image_file, input_dir)
+        write_pdf(image_files[:args.page_num],
+                  os.path.join(input_dir, 'pages.pdf'))
+        inputs = get_image_file_list(input_dir)
+
+        ocr = PaddleOCR(
+            det_batch_num=args.det_batch_num, page_num=0, show_log=False)
+        failed = 0
+        for rec in [True, False]:
+            results = ocr.ocr(input_dir, rec=rec, cls=False)
+            assert len(results) == len(inputs)
+            for input_file, result in zip(inputs, results):
+                expected = ocr.ocr(input_file, rec=rec, cls=False)
+                if not input_file.endswith('.pdf'):
+                    expected = expected[0]
+                if result != expected:
+                    failed += 1
+                    print("mismatch of {} with rec={}".format(input_file,
+                                                              rec))
+        print("inputs: {}, pdf pages: {}, mismatch: {}".format(
+            len(inputs), min(args.page_num, len(image_files)), failed))
+    finally:
+        shutil.rmtree(input_dir)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image_dir", type=str, default="doc/imgs")
+    parser.add_argument("--image_num", type=int, default=6)
+    parser.add_argument("--page_num", type=int, default=3)
+    parser.add_argument("--det_batch_num", type=int, default=4)
+    sys.exit(0 if main(parser.parse_args()) else 1)
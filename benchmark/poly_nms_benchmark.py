@@ -0,0 +1,133 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the polygon NMS of FCE/DRRG (poly_nms) and of EAST/SAST without
+lanms (standard_nms) against the previous implementations, which computed
+the IoU of the kept polygon with every remaining one in a Python loop.
+Candidates are clusters of jittered text polygons, like the raw outputs of
+a detector.
+
+    python benchmark/poly_nms_benchmark.py --num 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from ppocr.utils.poly_nms import poly_nms, boundary_iou
+from ppocr.postprocess.locality_aware_nms import standard_nms, intersection
+
+
+def poly_nms_legacy(polygons, threshold):
+    polygons = np.array(sorted(polygons, key=lambda x: x[-1]))
+
+    keep_poly = []
+    index = [i for i in range(polygons.shape[0])]
+
+    while len(index) > 0:
+        keep_poly.append(polygons[index[-1]].tolist())
+        A = polygons[index[-1]][:-1]
+        index = np.delete(index, -1)
+        iou_list = np.zeros((len(index), ))
+        for i in range(len(index)):
+            B = polygons[index[i]][:-1]
+            iou_list[i] = boundary_iou(A, B)
+        remove_index = np.where(iou_list > threshold)
+        index = np.delete(index, remove_index)
+
+    return keep_poly
+
+
+def standard_nms_legacy(S, thres):
+    order = np.argsort(S[:, 8])[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+
+        inds = np.where(ovr <= thres)[0]
+        order = order[inds + 1]
+
+    return S[keep]
+
+
+def gen_candidates(rng, num, num_points, img_size=1280, per_text=8):
+    """
+    return: (num, 2 * num_points + 1) array of polygons around jittered
+        ellipses of text lines, followed by their score
+    """
+    candidates = []
+    angles = np.linspace(0, 2 * np.pi, num_points, endpoint=False)
+    while len(candidates) < num:
+        cx, cy = rng.uniform(0, img_size, 2)
+        w, h = rng.uniform(40, 300), rng.uniform(12, 40)
+        theta = rng.uniform(-0.3, 0.3)
+        for _ in range(per_text):
+            jx, jy = rng.normal(0, h * 0.15, 2)
+            sw, sh = rng.uniform(0.85, 1.15, 2)
+            xs = w * sw / 2 * np.cos(angles)
+            ys = h * sh / 2 * np.sin(angles)
+            pts = np.stack([
+                cx + jx + xs * np.cos(theta) - ys * np.sin(theta),
+                cy + jy + xs * np.sin(theta) + ys * np.cos(theta)
+            ], 1)
+            candidates.append(
+                np.concatenate([pts.reshape(-1), [rng.uniform(0.5, 1)]]))
+    return np.array(candidates[:num])
+
+
+def timeit(func, *args):
+    start = time.time()
+    out = func(*args)
+    return out, time.time() - start
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+
+    polygons = gen_candidates(rng, args.num, args.num_points).tolist()
+    legacy, legacy_cost = timeit(poly_nms_legacy, polygons, args.thresh)
+    keep, cost = timeit(poly_nms, polygons, args.thresh)
+    print("poly_nms     candidates: {}, kept: {}, same keep set: {}, "
+          "legacy: {:.3f}s, new: {:.3f}s, speedup: {:.1f}x".format(
+              len(polygons),
+              len(keep), legacy == keep, legacy_cost, cost, legacy_cost /
+              cost))
+
+    quads = gen_candidates(rng, args.num, 4)
+    legacy, legacy_cost = timeit(standard_nms_legacy, quads, args.thresh)
+    keep, cost = timeit(standard_nms, quads, args.thresh)
+    print("standard_nms candidates: {}, kept: {}, same keep set: {}, "
+          "legacy: {:.3f}s, new: {:.3f}s, speedup: {:.1f}x".format(
+              len(quads),
+              len(keep),
+              np.array_equal(legacy, keep), legacy_cost, cost, legacy_cost /
+              cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num", type=int, default=2000)
+    parser.add_argument("--num_points", type=int, default=14)
+    parser.add_argument("--thresh", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
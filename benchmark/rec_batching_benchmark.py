@@ -0,0 +1,172 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the TextRecognizer batching plans: fixed groups of
+rec_batch_num crops against bucket batches under a padded pixel budget
+(use_rec_bucket_batch), over crop width distributions of meters, documents
+and a mix of both. Reports batches, distinct input widths, padding
+efficiency (crop pixels / padded pixels) and the preprocessing time. No
+model is needed, the padded pixels are what the predictor pays for.
+
+    python benchmark/rec_batching_benchmark.py --distribution meter
+"""
+
+import os
+import sys
+import time
+import math
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import numpy as np
+
+from tools.infer.predict_rec import (TextRecognizer, plan_rec_batches,
+                                     BUCKET_WIDTH_SCALES)
+
+# (min, max) characters of a crop, a character is about 0.6 height wide
+DISTRIBUTIONS = {
+    'meter': [(1, 2), (3, 6), (3, 6), (5, 8)],
+    'document': [(2, 10), (8, 25), (20, 60)],
+    'mixed': [(1, 2), (3, 6), (5, 8), (8, 25), (20, 60)],
+}
+
+
+def build_recognizer(rec_image_shape):
+    # preprocessing only, skip __init__ so that no predictor is created
+    recognizer = TextRecognizer.__new__(TextRecognizer)
+    recognizer.rec_algorithm = 'SVTR_LCNet'
+    recognizer.rec_image_shape = [int(v) for v in rec_image_shape.split(",")]
+    recognizer.use_onnx = False
+    recognizer.batch_buffer = None
+    return recognizer
+
+
+def gen_crops(rng, num, distribution):
+    crops = []
+    char_ranges = DISTRIBUTIONS[distribution]
+    for _ in range(num):
+        min_chars, max_chars = char_ranges[rng.randint(len(char_ranges))]
+        h = rng.randint(16, 64)
+        w = max(int(h * 0.6 * rng.randint(min_chars, max_chars + 1)), 4)
+        crops.append(rng.randint(0, 256, (h, w, 3)).astype(np.uint8))
+    return crops
+
+
+def run_plan(recognizer, crops, batch_num, bucket_widths, batch_pixels):
+    """
+    return: (batches, input widths, crop pixels, padded pixels, crop index ->
+        normalized crop without padding, unless it was squeezed)
+    """
+    imgH = recognizer.rec_image_shape[1]
+    wh_ratios = [crop.shape[1] / float(crop.shape[0]) for crop in crops]
+    indices = np.argsort(np.array(wh_ratios))
+    sorted_ratios = [wh_ratios[i] for i in indices]
+    batches = plan_rec_batches(sorted_ratios, recognizer.rec_image_shape,
+                               batch_num, bucket_widths, batch_pixels)
+    widths = set()
+    useful = 0
+    padded = 0
+    outs = {}
+    for beg, end, max_wh_ratio in batches:
+        norm_img_batch = recognizer.get_batch_buffer(end - beg, max_wh_ratio)
+        batch_w = norm_img_batch.shape[3]
+        widths.add(batch_w)
+        padded += (end - beg) * batch_w * imgH
+        for ino in range(beg, end):
+            recognizer.resize_norm_img_into(crops[indices[ino]], max_wh_ratio,
+                                            norm_img_batch[ino - beg])
+            need_w = int(math.ceil(imgH * sorted_ratios[ino]))
+            resized_w = min(batch_w, need_w)
+            useful += resized_w * imgH
+            # the widest crop of a fixed batch can be squeezed by a pixel
+            if resized_w == need_w:
+                outs[indices[ino]] = norm_img_batch[ino - beg, :, :, :
+                                                    resized_w].copy()
+    return len(batches), widths, useful, padded, outs
+
+
+def timeit(recognizer, crop_lists, batch_num, bucket_widths, batch_pixels):
+    start = time.time()
+    for crops in crop_lists:
+        run_plan(recognizer, crops, batch_num, bucket_widths, batch_pixels)
+    return (time.time() - start) / len(crop_lists)
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    recognizer = build_recognizer(args.rec_image_shape)
+    imgH, imgW = recognizer.rec_image_shape[1:3]
+    if args.rec_bucket_widths:
+        bucket_widths = sorted(
+            set(int(v) for v in args.rec_bucket_widths.split(",")))
+    else:
+        bucket_widths = sorted(
+            set(int(imgW * s) for s in BUCKET_WIDTH_SCALES))
+    batch_pixels = args.rec_batch_pixels
+    if batch_pixels <= 0:
+        batch_pixels = args.rec_batch_num * imgH * imgW
+    crop_lists = [
+        gen_crops(rng, args.crop_num, args.distribution)
+        for _ in range(args.image_count)
+    ]
+
+    plans = [('fixed', None), ('bucket', bucket_widths)]
+    stats = {name: [0, set(), 0, 0] for name, _ in plans}
+    mismatch = 0
+    for crops in crop_lists:
+        results = []
+        for name, widths in plans:
+            batch_cnt, input_widths, useful, padded, outs = run_plan(
+                recognizer, crops, args.rec_batch_num, widths, batch_pixels)
+            stats[name][0] += batch_cnt
+            stats[name][1] |= input_widths
+            stats[name][2] += useful
+            stats[name][3] += padded
+            results.append(outs)
+        # every crop is resized the same way, only the padding differs
+        if any(not np.array_equal(results[0][i], results[1][i])
+               for i in results[0] if i in results[1]):
+            mismatch += 1
+    print("distribution: {}, images: {}, crops per image: {}".format(
+        args.distribution, len(crop_lists), args.crop_num))
+    print("crop mismatch: {}/{}".format(mismatch, len(crop_lists)))
+
+    for name, widths in plans:
+        batch_cnt, input_widths, useful, padded = stats[name]
+        cost = timeit(recognizer, crop_lists, args.rec_batch_num, widths,
+                      batch_pixels)
+        print("{:<6s} batches: {:>6d}, input widths: {:>4d}, padded pixels: "
+              "{:>12d}, padding efficiency: {:>6.2%}, preprocess: {:.3f}ms".
+              format(name, batch_cnt,
+                     len(input_widths), padded, useful / max(padded, 1),
+                     cost * 1000))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--distribution",
+        type=str,
+        default="meter",
+        choices=list(DISTRIBUTIONS))
+    parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
+    parser.add_argument("--rec_batch_num", type=int, default=6)
+    parser.add_argument("--rec_bucket_widths", type=str, default="")
+    parser.add_argument("--rec_batch_pixels", type=int, default=0)
+    parser.add_argument("--crop_num", type=int, default=30)
+    parser.add_argument("--image_count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,121 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Microbenchmark of the TextRecognizer batch preprocessing: crops written
+into the reused batch buffer against per crop resize_norm_img +
+np.concatenate + copy. No model is needed.
+
+    python benchmark/rec_preprocess_benchmark.py --rec_algorithm SVTR_LCNet
+"""
+
+import os
+import sys
+import time
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import numpy as np
+
+from tools.infer.predict_rec import TextRecognizer
+
+
+def build_recognizer(rec_algorithm, rec_image_shape):
+    # preprocessing only, skip __init__ so that no predictor is created
+    recognizer = TextRecognizer.__new__(TextRecognizer)
+    recognizer.rec_algorithm = rec_algorithm
+    recognizer.rec_image_shape = [int(v) for v in rec_image_shape.split(",")]
+    recognizer.use_onnx = False
+    recognizer.batch_buffer = None
+    return recognizer
+
+
+def gen_crops(rng, num, height):
+    crops = []
+    for _ in range(num):
+        h = rng.randint(height // 2, height * 2)
+        w = rng.randint(h // 2, h * 12)
+        crops.append(rng.randint(0, 256, (h, w, 3)).astype(np.uint8))
+    return crops
+
+
+def max_wh_ratio_of(recognizer, crops):
+    imgC, imgH, imgW = recognizer.rec_image_shape
+    max_wh_ratio = imgW / imgH
+    for crop in crops:
+        max_wh_ratio = max(max_wh_ratio, crop.shape[1] * 1.0 / crop.shape[0])
+    return max_wh_ratio
+
+
+def preprocess_legacy(recognizer, crops):
+    max_wh_ratio = max_wh_ratio_of(recognizer, crops)
+    norm_img_batch = []
+    for crop in crops:
+        if recognizer.rec_algorithm in ["SVTR", "SATRN"]:
+            norm_img = recognizer.resize_norm_img_svtr(
+                crop, recognizer.rec_image_shape)
+        else:
+            norm_img = recognizer.resize_norm_img(crop, max_wh_ratio)
+        norm_img_batch.append(norm_img[np.newaxis, :])
+    norm_img_batch = np.concatenate(norm_img_batch)
+    return norm_img_batch.copy()
+
+
+def preprocess_buffer(recognizer, crops):
+    max_wh_ratio = max_wh_ratio_of(recognizer, crops)
+    norm_img_batch = recognizer.get_batch_buffer(len(crops), max_wh_ratio)
+    for i, crop in enumerate(crops):
+        recognizer.resize_norm_img_into(crop, max_wh_ratio, norm_img_batch[i])
+    return norm_img_batch
+
+
+def timeit(func, recognizer, batches):
+    start = time.time()
+    for crops in batches:
+        func(recognizer, crops)
+    return (time.time() - start) / len(batches)
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    recognizer = build_recognizer(args.rec_algorithm, args.rec_image_shape)
+    batches = [
+        gen_crops(rng, args.rec_batch_num, recognizer.rec_image_shape[1])
+        for _ in range(args.batch_count)
+    ]
+
+    mismatch = 0
+    for crops in batches:
+        if not np.array_equal(
+                preprocess_legacy(recognizer, crops),
+                preprocess_buffer(recognizer, crops)):
+            mismatch += 1
+    print("batch mismatch: {}/{}".format(mismatch, len(batches)))
+
+    legacy_cost = timeit(preprocess_legacy, recognizer, batches)
+    cost = timeit(preprocess_buffer, recognizer, batches)
+    print("batch size: {}, legacy: {:.3f}ms, buffer: {:.3f}ms, speedup: {:.1f}x".
+          format(args.rec_batch_num, legacy_cost * 1000, cost * 1000,
+                 legacy_cost / cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rec_algorithm", type=str, default="SVTR_LCNet")
+    parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
+    parser.add_argument("--rec_batch_num", type=int, default=6)
+    parser.add_argument("--batch_count", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,146 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Microbenchmark of tools.infer.predict_system.sorted_boxes against the
+previous sorted() + bubble pass implementation, on line, slanted, dense,
+two column and random layouts.
+
+    python benchmark/sorted_boxes_benchmark.py --num_rows 60 --num_cols 12
+"""
+
+import os
+import sys
+import time
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import numpy as np
+
+from tools.infer.predict_system import sorted_boxes
+
+
+def sorted_boxes_legacy(dt_boxes):
+    num_boxes = dt_boxes.shape[0]
+    sorted_boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
+    _boxes = list(sorted_boxes)
+
+    for i in range(num_boxes - 1):
+        for j in range(i, -1, -1):
+            if abs(_boxes[j + 1][0][1] - _boxes[j][0][1]) < 10 and \
+                    (_boxes[j + 1][0][0] < _boxes[j][0][0]):
+                tmp = _boxes[j]
+                _boxes[j] = _boxes[j + 1]
+                _boxes[j + 1] = tmp
+            else:
+                break
+    return _boxes
+
+
+def gen_boxes(rng, num_rows, num_cols, jitter=8, drop_ratio=0.3):
+    """Boxes laid out in lines with `jitter` px of vertical noise."""
+    boxes = []
+    for row in range(num_rows):
+        for col in range(num_cols):
+            if rng.rand() < drop_ratio:
+                continue
+            x = col * 60 + rng.rand() * 20
+            y = row * 30 + rng.rand() * jitter
+            boxes.append([[x, y], [x + 50, y], [x + 50, y + 20], [x, y + 20]])
+    return np.array(boxes, dtype=np.float32).reshape([-1, 4, 2])
+
+
+def gen_slanted_boxes(rng, num_rows, num_cols):
+    """Lines of a photo taken at an angle, y grows by 4-8px per box."""
+    slope = rng.uniform(4, 8) / 60
+    boxes = gen_boxes(rng, num_rows, num_cols, jitter=4, drop_ratio=0.1)
+    boxes[:, :, 1] += boxes[:, :1, 0] * slope
+    return boxes
+
+
+def gen_dense_boxes(rng, num_rows, num_cols):
+    """Lines 12px apart with 6px of noise, neighbour lines are in reach."""
+    boxes = gen_boxes(rng, num_rows, num_cols, jitter=6)
+    boxes[:, :, 1] *= 12. / 30
+    return boxes
+
+
+def gen_two_column_boxes(rng, num_rows, num_cols):
+    """Two text columns whose lines are not aligned with each other."""
+    left = gen_boxes(rng, num_rows, max(num_cols // 2, 1))
+    right = gen_boxes(rng, num_rows, max(num_cols // 2, 1))
+    right[:, :, 0] += 60 * max(num_cols // 2, 1) + 40
+    right[:, :, 1] += rng.uniform(0, 30)
+    return np.concatenate([left, right])
+
+
+def gen_random_boxes(rng, num_rows, num_cols):
+    """Boxes anywhere on the page."""
+    num = max(int(num_rows * num_cols * 0.7), 1)
+    xy = rng.uniform(0, [60 * num_cols, 30 * num_rows], (num, 2))
+    boxes = np.tile(xy[:, None], (1, 4, 1))
+    boxes[:, 1:3, 0] += 50
+    boxes[:, 2:, 1] += 20
+    return boxes.astype(np.float32)
+
+
+LAYOUTS = {
+    'rows': gen_boxes,
+    'slanted': gen_slanted_boxes,
+    'dense': gen_dense_boxes,
+    'two_column': gen_two_column_boxes,
+    'random': gen_random_boxes,
+}
+
+
+def timeit(func, dt_boxes, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        func(dt_boxes)
+    return (time.time() - start) / repeat
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+
+    for name, gen in LAYOUTS.items():
+        mismatch = 0
+        for _ in range(args.check_num):
+            dt_boxes = gen(rng,
+                           rng.randint(1, args.num_rows + 1),
+                           rng.randint(1, args.num_cols + 1))
+            if not np.array_equal(
+                    np.array(sorted_boxes_legacy(dt_boxes)),
+                    np.array(sorted_boxes(dt_boxes))):
+                mismatch += 1
+
+        dt_boxes = gen(rng, args.num_rows, args.num_cols)
+        legacy_cost = timeit(sorted_boxes_legacy, dt_boxes, args.repeat)
+        cost = timeit(sorted_boxes, dt_boxes, args.repeat)
+        print("{:<10s} order mismatch: {}/{}, boxes: {}, legacy: {:.3f}ms, "
+              "new: {:.3f}ms, speedup: {:.1f}x".format(
+                  name, mismatch, args.check_num,
+                  len(dt_boxes), legacy_cost * 1000, cost * 1000,
+                  legacy_cost / cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_rows", type=int, default=60)
+    parser.add_argument("--num_cols", type=int, default=12)
+    parser.add_argument("--check_num", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,228 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the cell matching of TableMatch (SLANet) and TableMasterMatcher
+against the previous implementations, which computed the distance and IoU of
+every (OCR box, structure cell) pair in Python loops. Tables are synthetic
+grids of cells with jittered OCR lines, some cells hold several lines, some
+lines fall between cells and some cells are empty.
+
+    python benchmark/table_match_benchmark.py --rows 40 --cols 12
+"""
+
+import os
+import sys
+import time
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
+
+import numpy as np
+
+from ppstructure.table.matcher import TableMatch, distance, compute_iou
+from ppstructure.table.table_master_match import (
+    convert_coord, cal_iou, cal_distance, is_inside, center_rule_match,
+    iou_rule_match, distance_rule_match)
+
+
+def match_result_legacy(dt_boxes, pred_bboxes):
+    matched = {}
+    for i, gt_box in enumerate(dt_boxes):
+        distances = []
+        for j, pred_box in enumerate(pred_bboxes):
+            if len(pred_box) == 8:
+                pred_box = [
+                    np.min(pred_box[0::2]), np.min(pred_box[1::2]),
+                    np.max(pred_box[0::2]), np.max(pred_box[1::2])
+                ]
+            distances.append((distance(gt_box, pred_box),
+                              1. - compute_iou(gt_box, pred_box)))
+        sorted_distances = distances.copy()
+        sorted_distances = sorted(
+            sorted_distances, key=lambda item: (item[1], item[0]))
+        if distances.index(sorted_distances[0]) not in matched.keys():
+            matched[distances.index(sorted_distances[0])] = [i]
+        else:
+            matched[distances.index(sorted_distances[0])].append(i)
+    return matched
+
+
+def center_rule_match_legacy(end2end_xywh_bboxes, structure_master_xyxy_bboxes):
+    match_pairs_list = []
+    for i, end2end_xywh in enumerate(end2end_xywh_bboxes):
+        for j, master_xyxy in enumerate(structure_master_xyxy_bboxes):
+            center_point_end2end = (end2end_xywh[0], end2end_xywh[1])
+            corner_point_master = ((master_xyxy[0], master_xyxy[1]),
+                                   (master_xyxy[2], master_xyxy[3]))
+            if is_inside(center_point_end2end, corner_point_master):
+                match_pairs_list.append([i, j])
+    return match_pairs_list
+
+
+def iou_rule_match_legacy(end2end_xyxy_bboxes, end2end_xyxy_indexes,
+                          structure_master_xyxy_bboxes):
+    match_pair_list = []
+    for end2end_xyxy_index, end2end_xyxy in zip(end2end_xyxy_indexes,
+                                                end2end_xyxy_bboxes):
+        max_iou = 0
+        max_match = [None, None]
+        for j, master_xyxy in enumerate(structure_master_xyxy_bboxes):
+            iou = cal_iou(
+                convert_coord(end2end_xyxy), convert_coord(master_xyxy))
+            if iou > max_iou:
+                max_match[0], max_match[1] = end2end_xyxy_index, j
+                max_iou = iou
+        if max_match[0] is None:
+            continue
+        match_pair_list.append(max_match)
+    return match_pair_list
+
+
+def distance_rule_match_legacy(end2end_indexes, end2end_bboxes, master_indexes,
+                               master_bboxes):
+    min_match_list = []
+    for j, master_bbox in zip(master_indexes, master_bboxes):
+        min_distance = np.inf
+        min_match = [0, 0]
+        for i, end2end_bbox in zip(end2end_indexes, end2end_bboxes):
+            dist = cal_distance((master_bbox[0], master_bbox[1]),
+                                (end2end_bbox[0], end2end_bbox[1]))
+            if dist < min_distance:
+                min_match[0], min_match[1] = i, j
+                min_distance = dist
+        min_match_list.append(min_match)
+    return min_match_list
+
+
+def gen_table(rng, rows, cols, cell_w=90, cell_h=30):
+    """
+    return: (xyxy OCR boxes [N, 4] float32, xyxy cells [rows * cols, 4]
+        float32), cells are shrunk by a few pixels like predicted cells
+    """
+    xs = np.cumsum(rng.uniform(0.5, 1.5, cols + 1) * cell_w)
+    ys = np.cumsum(rng.uniform(0.8, 1.2, rows + 1) * cell_h)
+    cells = []
+    boxes = []
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0, x1, y1 = xs[c], ys[r], xs[c + 1], ys[r + 1]
+            cells.append([
+                x0 + rng.uniform(0, 4), y0 + rng.uniform(0, 4),
+                x1 - rng.uniform(0, 4), y1 - rng.uniform(0, 4)
+            ])
+            lines = rng.choice([0, 1, 1, 1, 2])
+            for k in range(lines):
+                h = (y1 - y0) / max(lines, 1)
+                bw = rng.uniform(0.2, 0.9) * (x1 - x0)
+                bx = x0 + rng.uniform(0, x1 - x0 - bw)
+                by = y0 + k * h + rng.normal(0, h * 0.3)
+                boxes.append([bx, by, bx + bw, by + h * 0.8])
+    # lines between cells
+    for _ in range(max(rows * cols // 20, 1)):
+        c = rng.randint(cols)
+        r = rng.randint(rows)
+        bx, by = xs[c] + rng.uniform(-20, 20), ys[r] + rng.uniform(-10, 10)
+        boxes.append([bx, by, bx + rng.uniform(20, 120), by + cell_h * 0.6])
+    return np.array(boxes, np.float32), np.array(cells, np.float32)
+
+
+def master_rules(rules, end2end_xyxy, master_xyxy):
+    """
+    run the three rules of Matcher.match with the given rule functions
+    return: match list
+    """
+    center, iou, dist = rules
+    end2end_xywh = end2end_xyxy.copy()
+    end2end_xywh[:, :2] = (end2end_xyxy[:, :2] + end2end_xyxy[:, 2:]) / 2
+    end2end_xywh[:, 2:] = end2end_xyxy[:, 2:] - end2end_xyxy[:, :2]
+    master_xywh = master_xyxy.copy()
+    master_xywh[:, :2] = (master_xyxy[:, :2] + master_xyxy[:, 2:]) / 2
+    master_xywh[:, 2:] = master_xyxy[:, 2:] - master_xyxy[:, :2]
+
+    match_list = center(end2end_xywh, master_xyxy)
+    matched = set(m[0] for m in match_list)
+    no_match = [i for i in range(len(end2end_xyxy)) if i not in matched]
+    if len(no_match) > 0:
+        match_list.extend(iou(end2end_xyxy[no_match], no_match, master_xyxy))
+    matched = set(m[0] for m in match_list)
+    no_match = [i for i in range(len(end2end_xyxy)) if i not in matched]
+    matched = set(m[1] for m in match_list)
+    no_match_master = [j for j in range(len(master_xyxy)) if j not in matched]
+    if len(no_match) > 0 and len(no_match_master) > 0:
+        match_list.extend(
+            dist(no_match, end2end_xywh[no_match], no_match_master,
+                 master_xywh[no_match_master]))
+    return match_list
+
+
+def timeit(func, *args):
+    start = time.time()
+    out = func(*args)
+    return out, time.time() - start
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    tables = [
+        gen_table(rng, args.rows, args.cols) for _ in range(args.table_num)
+    ]
+    match = TableMatch()
+    legacy_rules = (center_rule_match_legacy, iou_rule_match_legacy,
+                    distance_rule_match_legacy)
+    new_rules = (center_rule_match, iou_rule_match, distance_rule_match)
+
+    costs = np.zeros((4, ))
+    mismatch = [0, 0, 0]
+    for boxes, cells in tables:
+        # SLANet predicts 8 point cells
+        cells_8 = cells[:, [0, 1, 2, 1, 2, 3, 0, 3]]
+        legacy, legacy_cost = timeit(match_result_legacy, boxes, cells_8)
+        new, cost = timeit(match.match_result, boxes, cells_8)
+        costs[:2] += legacy_cost, cost
+        mismatch[0] += legacy != new
+
+        legacy, legacy_cost = timeit(master_rules, legacy_rules, boxes, cells)
+        new, cost = timeit(master_rules, new_rules, boxes, cells)
+        costs[2:] += legacy_cost, cost
+        mismatch[1] += legacy != new
+
+        # boxes without a center rule match go through the iou rule
+        no_center = list(range(len(boxes)))
+        mismatch[2] += iou_rule_match_legacy(boxes, no_center,
+                                             cells) != iou_rule_match(
+                                                 boxes, no_center, cells)
+
+    boxes_num = sum(len(boxes) for boxes, _ in tables)
+    print("tables: {}, cells per table: {}, OCR boxes per table: {:.0f}".
+          format(len(tables), args.rows * args.cols, boxes_num / len(tables)))
+    print("TableMatch         mismatch: {}/{}, legacy: {:.2f}ms, new: "
+          "{:.2f}ms, speedup: {:.1f}x".format(
+              mismatch[0], len(tables), costs[0] / len(tables) * 1000,
+              costs[1] / len(tables) * 1000, costs[0] / costs[1]))
+    print("TableMasterMatcher mismatch: {}/{} (iou rule alone: {}/{}), "
+          "legacy: {:.2f}ms, new: {:.2f}ms, speedup: {:.1f}x".format(
+              mismatch[1],
+              len(tables), mismatch[2],
+              len(tables), costs[2] / len(tables) * 1000, costs[3] /
+              len(tables) * 1000, costs[2] / costs[3]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--table_num", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -1,76 +1,53 @@
 from __future__ import print_function
-import cv2
-import numpy as np
-
-
-MAX_FEATURES = 500
-GOOD_MATCH_PERCENT = 0.15
-
-
-def alignImages(im1, im2):
-    # Convert images to grayscale
-    im1Gray = cv2.cvtColor(im1, cv2.COLOR_BGR2GRAY)
-    im2Gray = cv2.cvtColor(im2, cv2.COLOR_BGR2GRAY)
-
-    # Detect ORB features and compute descriptors.
-    orb = cv2.ORB_create(MAX_FEATURES)
-    keypoints1, descriptors1 = orb.detectAndCompute(im1Gray, None)
-    keypoints2, descriptors2 = orb.detectAndCompute(im2Gray, None)
-
-    # Match features.
-    matcher = cv2.DescriptorMatcher_create(cv2.DESCRIPTOR_MATCHER_BRUTEFORCE_HAMMING)
-    matches = matcher.match(descriptors1, descriptors2, None)
+import os
+import sys
 
-    # Sort matches by score
-    matches = list(matches)
-    matches.sort(key=lambda x: x.distance, reverse=False)
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '..')))
 
-    # Remove not so good matches
-    numGoodMatches = int(len(matches) * GOOD_MATCH_PERCENT)
-    matches = matches[:numGoodMatches]
-
-    # Draw top matches
-    imMatches = cv2.drawMatches(im1, keypoints1, im2, keypoints2, matches, None)
-    cv2.imwrite("matches.jpg", imMatches)
-
-    # Extract location of good matches
-    points1 = np.zeros((len(matches), 2), dtype=np.float32)
-    points2 = np.zeros((len(matches), 2), dtype=np.float32)
-
-    for i, match in enumerate(matches):
-        points1[i, :] = keypoints1[match.queryIdx].pt
-        points2[i, :] = keypoints2[match.trainIdx].pt
+import cv2
 
-    # Find homography
-    h, mask = cv2.findHomography(points1, points2, cv2.RANSAC)
+from ppocr.utils.meter_align import MeterAligner, MAX_FEATURES, GOOD_MATCH_PERCENT
 
-    # Use homography
-    height, width, channels = im2.shape
-    im1Reg = cv2.warpPerspective(im1, h, (width, height))
 
-    return im1Reg, h
+def alignImages(im1, im2, debug=False):
+    # Register im1 onto the reference image im2. Prefer building one
+    # MeterAligner per template when aligning many frames, so the template
+    # features are only extracted once.
+    aligner = MeterAligner(
+        im2,
+        max_features=MAX_FEATURES,
+        good_match_percent=GOOD_MATCH_PERCENT,
+        debug_dir="." if debug else None)
+    return aligner.align_one(im1)
 
 
 if __name__ == "__main__":
-    # Read reference image
+    # Read reference image, its ORB features are cached next to it
     refFilename = "hanpu3_template.bmp"
     print("Reading reference image : ", refFilename)
-    imReference = cv2.imread(refFilename, cv2.IMREAD_COLOR)
+    aligner = MeterAligner(refFilename, cache_path="hanpu3_template.npz")
 
-    # Read image to be aligned
-    imFilename = "hanpu3_1.jpg"
-    print("Reading image to align : ", imFilename)
-    im = cv2.imread(imFilename, cv2.IMREAD_COLOR)
+    # Read images to be aligned
+    imFilenames = ["hanpu3_{}.jpg".format(i) for i in range(1, 6)]
+    ims = []
+    for imFilename in imFilenames:
+        print("Reading image to align : ", imFilename)
+        ims.append(cv2.imread(imFilename, cv2.IMREAD_COLOR))
 
     print("Aligning images ...")
-    # Registered image will be resotred in imReg.
-    # The estimated homography will be stored in h.
-    imReg, h = alignImages(im, imReference)
-
-    # Write aligned image to disk.
-    outFilename = "aligned.jpg"
-    print("Saving aligned image : ", outFilename)
-    cv2.imwrite(outFilename, imReg)
-
-    # Print estimated homography
-    print("Estimated homography : \n", h)
+    # Registered images will be resotred in imRegs.
+    # The estimated homographies will be stored in hs.
+    imRegs, hs = aligner.align(ims)
+
+    for imFilename, imReg, h in zip(imFilenames, imRegs, hs):
+        if imReg is None:
+            print("Failed to align : ", imFilename)
+            continue
+        # Write aligned image to disk.
+        outFilename = "aligned_" + imFilename
+        print("Saving aligned image : ", outFilename)
+        cv2.imwrite(outFilename, imReg)
+
+        # Print estimated homography
+        print("Estimated homography : \n", h)
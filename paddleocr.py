@@ -15,6 +15,7 @@
 import os
 import sys
 import importlib
+import itertools
 
 __dir__ = os.path.dirname(__file__)
 
@@ -627,7 +628,7 @@ class PaddleOCR(predict_system.TextSystem):
         """
         OCR with PaddleOCR
         args：
-            img: img for OCR, support ndarray, img_path and list or ndarray
+            img: img for OCR, support ndarray, img_path, image directory and list of ndarray. With det, a list or directory is processed as multiple inputs: they are read in chunks of det_batch_num images and text detection is batched across a chunk. The result has one item per input, the item of a pdf is the list of the results of its pages
             det: use text detection or not. If False, only rec will be exec. Default is True
             rec: use text recognition or not. If False, only det will be exec. Default is True
             cls: use angle classifier or not. Default is True. If True, the text with rotation of 180 degrees can be recognized. If no text is rotated by 180 degrees, use cls=False to get better performance. Text with rotation of 90 or 270 degrees can be recognized even if cls=False.
@@ -636,14 +637,24 @@ class PaddleOCR(predict_system.TextSystem):
             alpha_color: set RGB color Tuple for transparent parts replacement. Default is pure white.
         """
         assert isinstance(img, (np.ndarray, list, str, bytes))
-        if isinstance(img, list) and det == True:
-            logger.error('When input a list of images, det must be false')
-            exit(0)
         if cls == True and self.use_angle_cls == False:
             logger.warning(
                 'Since the angle classifier is not initialized, it will not be used during the forward process'
             )
 
+        def preprocess_image(_image):
+            _image = alpha_to_color(_image, alpha_color)
+            if inv:
+                _image = cv2.bitwise_not(_image)
+            if bin:
+                _image = binarize_img(_image)
+            return _image
+
+        if isinstance(img, str) and os.path.isdir(img):
+            img = get_image_file_list(img)
+        if isinstance(img, list) and det == True:
+            return self.ocr_inputs(img, rec, cls, preprocess_image)
+
         img = check_img(img)
         # for infer pdf file
         if isinstance(img, list):
@@ -653,37 +664,12 @@ class PaddleOCR(predict_system.TextSystem):
         else:
             imgs = [img]
 
-        def preprocess_image(_image):
-            _image = alpha_to_color(_image, alpha_color)
-            if inv:
-                _image = cv2.bitwise_not(_image)
-            if bin:
-                _image = binarize_img(_image)
-            return _image
-
-        if det and rec:
-            ocr_res = []
-            for idx, img in enumerate(imgs):
-                img = preprocess_image(img)
-                dt_boxes, rec_res, _ = self.__call__(img, cls)
-                if not dt_boxes and not rec_res:
-                    ocr_res.append(None)
-                    continue
-                tmp_res = [[box.tolist(), res]
-                           for box, res in zip(dt_boxes, rec_res)]
-                ocr_res.append(tmp_res)
-            return ocr_res
-        elif det and not rec:
-            ocr_res = []
-            for idx, img in enumerate(imgs):
-                img = preprocess_image(img)
-                dt_boxes, elapse = self.text_detector(img)
-                if not dt_boxes:
-                    ocr_res.append(None)
-                    continue
-                tmp_res = [box.tolist() for box in dt_boxes]
-                ocr_res.append(tmp_res)
-            return ocr_res
+        if det:
+            imgs = [
+                preprocess_image(img) if img is not None else None
+                for img in imgs
+            ]
+            return self.ocr_pages(imgs, rec, cls)
         else:
             ocr_res = []
             cls_res = []
@@ -692,15 +678,89 @@ class PaddleOCR(predict_system.TextSystem):
                     img = preprocess_image(img)
                     img = [img]
                 if self.use_angle_cls and cls:
-                    img, cls_res_tmp, elapse = self.text_classifier(img)
+                    with self.checkout('text_classifier') as text_classifier:
+                        img, cls_res_tmp, elapse = text_classifier(img)
                     if not rec:
                         cls_res.append(cls_res_tmp)
-                rec_res, elapse = self.text_recognizer(img)
+                with self.checkout('text_recognizer') as text_recognizer:
+                    rec_res, elapse = text_recognizer(img)
                 ocr_res.append(rec_res)
             if not rec:
                 return cls_res
             return ocr_res
 
+    def ocr_pages(self, imgs, rec=True, cls=True):
+        """
+        Detect, and with rec recognize, the text of preprocessed images with
+        batched detection
+        return: list of the results of imgs, None for an image without text
+        """
+        ocr_res = []
+        if rec:
+            for dt_boxes, rec_res, _ in self.ocr_batch(imgs, cls):
+                if not dt_boxes and not rec_res:
+                    ocr_res.append(None)
+                    continue
+                tmp_res = [[box.tolist(), res]
+                           for box, res in zip(dt_boxes, rec_res)]
+                ocr_res.append(tmp_res)
+            return ocr_res
+        with self.checkout('text_detector') as text_detector:
+            dt_boxes_list, elapse = text_detector.detect_batch(imgs)
+        for dt_boxes in dt_boxes_list:
+            if dt_boxes is None or len(dt_boxes) == 0:
+                ocr_res.append(None)
+                continue
+            tmp_res = [box.tolist() for box in dt_boxes]
+            ocr_res.append(tmp_res)
+        return ocr_res
+
+    def iter_input_pages(self, inputs, preprocess_image):
+        """
+        Lazily read inputs
+        args:
+            inputs: list of ndarray, img_path or bytes
+            preprocess_image: function applied to every loaded image
+        return:
+            generator of (input index, is_pdf, image), a pdf yields its first
+            page_num pages, image is None for an input that failed to load
+        """
+        for input_idx, _img in enumerate(inputs):
+            _img = check_img(_img)
+            if isinstance(_img, list):
+                page_num = self.page_num
+                if page_num > len(_img) or page_num == 0:
+                    page_num = len(_img)
+                for page in _img[:page_num]:
+                    yield input_idx, True, preprocess_image(page)
+            else:
+                yield input_idx, False, preprocess_image(
+                    _img) if _img is not None else None
+
+    def ocr_inputs(self, inputs, rec, cls, preprocess_image):
+        """
+        OCR of several inputs, read and detected in chunks of det_batch_num
+        images so that only one chunk is in memory
+        return: one result per input, the list of the results of the pages
+            for a pdf
+        """
+        ocr_res = [None] * len(inputs)
+        page_iter = self.iter_input_pages(inputs, preprocess_image)
+        chunk_size = max(self.args.det_batch_num, 1)
+        while True:
+            chunk = list(itertools.islice(page_iter, chunk_size))
+            if len(chunk) == 0:
+                break
+            chunk_res = self.ocr_pages([img for _, _, img in chunk], rec, cls)
+            for (input_idx, is_pdf, _), res in zip(chunk, chunk_res):
+                if not is_pdf:
+                    ocr_res[input_idx] = res
+                    continue
+                if ocr_res[input_idx] is None:
+                    ocr_res[input_idx] = []
+                ocr_res[input_idx].append(res)
+        return ocr_res
+
 
 class PPStructure(StructureSystem):
     def __init__(self, **kwargs):
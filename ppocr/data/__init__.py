@@ -35,9 +35,11 @@ import paddle.distributed as dist
 from ppocr.data.imaug import transform, create_operators
 from ppocr.data.simple_dataset import SimpleDataSet, MultiScaleDataSet
 from ppocr.data.lmdb_dataset import LMDBDataSet, LMDBDataSetSR, LMDBDataSetTableMaster
+from ppocr.data.packed_dataset import PackedDataSet
 from ppocr.data.pgnet_dataset import PGDataSet
 from ppocr.data.pubtab_dataset import PubTabDataSet
 from ppocr.data.multi_scale_sampler import MultiScaleSampler
+from ppocr.data.op_profiler import OpProfiler
 
 # for PaddleX dataset_type
 TextDetDataset = SimpleDataSet
@@ -97,6 +99,7 @@ def build_dataloader(config, mode, device, logger, seed=None):
         'MSTextRecDataset',
         'PubTabTableRecDataset',
         'KieDataset',
+        'PackedDataSet',
     ]
     module_name = config[mode]['dataset']['name']
     assert module_name in support_dict, Exception(
@@ -114,6 +117,8 @@ def build_dataloader(config, mode, device, logger, seed=None):
         use_shared_memory = loader_config['use_shared_memory']
     else:
         use_shared_memory = True
+    if loader_config.get('profile_transforms', False):
+        dataset.op_profiler = OpProfiler(dataset, num_workers)
 
     if mode == "Train":
         # Distribute data to multiple cards
@@ -21,6 +21,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import math
 import numpy as np
 import cv2
 
@@ -89,62 +90,70 @@ class MakeBorderMap(object):
         xmax = padded_polygon[:, 0].max()
         ymin = padded_polygon[:, 1].min()
         ymax = padded_polygon[:, 1].max()
-        width = xmax - xmin + 1
-        height = ymax - ymin + 1
-
-        polygon[:, 0] = polygon[:, 0] - xmin
-        polygon[:, 1] = polygon[:, 1] - ymin
-
-        xs = np.broadcast_to(
-            np.linspace(
-                0, width - 1, num=width).reshape(1, width), (height, width))
-        ys = np.broadcast_to(
-            np.linspace(
-                0, height - 1, num=height).reshape(height, 1), (height, width))
-
-        distance_map = np.zeros(
-            (polygon.shape[0], height, width), dtype=np.float32)
-        for i in range(polygon.shape[0]):
-            j = (i + 1) % polygon.shape[0]
-            absolute_distance = self._distance(xs, ys, polygon[i], polygon[j])
-            distance_map[i] = np.clip(absolute_distance / distance, 0, 1)
-        distance_map = distance_map.min(axis=0)
 
+        # only the part of the padded box inside the canvas is computed
         xmin_valid = min(max(0, xmin), canvas.shape[1] - 1)
         xmax_valid = min(max(0, xmax), canvas.shape[1] - 1)
         ymin_valid = min(max(0, ymin), canvas.shape[0] - 1)
         ymax_valid = min(max(0, ymax), canvas.shape[0] - 1)
+        distance_map = np.sqrt(
+            self._min_square_distance(xmin_valid, xmax_valid, ymin_valid,
+                                      ymax_valid, polygon, distance))
+        distance_map = np.clip(distance_map / distance, 0, 1)
         canvas[ymin_valid:ymax_valid + 1, xmin_valid:xmax_valid + 1] = np.fmax(
-            1 - distance_map[ymin_valid - ymin:ymax_valid - ymax + height,
-                             xmin_valid - xmin:xmax_valid - xmax + width],
+            1 - distance_map,
             canvas[ymin_valid:ymax_valid + 1, xmin_valid:xmax_valid + 1])
 
-    def _distance(self, xs, ys, point_1, point_2):
-        '''
-        compute the distance from point to a line
-        ys: coordinates in the first axis
-        xs: coordinates in the second axis
-        point_1, point_2: (x, y), the end of the line
-        '''
-        height, width = xs.shape[:2]
-        square_distance_1 = np.square(xs - point_1[0]) + np.square(ys - point_1[
-            1])
-        square_distance_2 = np.square(xs - point_2[0]) + np.square(ys - point_2[
-            1])
-        square_distance = np.square(point_1[0] - point_2[0]) + np.square(
-            point_1[1] - point_2[1])
-
-        cosin = (square_distance - square_distance_1 - square_distance_2) / (
-            2 * np.sqrt(square_distance_1 * square_distance_2))
-        square_sin = 1 - np.square(cosin)
-        square_sin = np.nan_to_num(square_sin)
-        result = np.sqrt(square_distance_1 * square_distance_2 * square_sin /
-                         square_distance)
-
-        result[cosin <
-               0] = np.sqrt(np.fmin(square_distance_1, square_distance_2))[cosin
-                                                                           < 0]
-        # self.extend_line(point_1, point_2, result)
+    def _min_square_distance(self, xmin, xmax, ymin, ymax, polygon,
+                             max_distance):
+        """
+        Squared distance from the pixels of [xmin, xmax] x [ymin, ymax] to the
+        nearest edge of polygon, computed in float32. The distance to an edge
+        is the distance to its line if the edge is seen from the pixel under
+        an angle of at least 90 degrees, else the distance to the nearer end.
+        Distances beyond max_distance are only known to be beyond it, so each
+        edge is evaluated in its own box grown by max_distance.
+        return: (ymax - ymin + 1, xmax - xmin + 1) float32 array
+        """
+        height, width = ymax - ymin + 1, xmax - xmin + 1
+        result = np.full(
+            (height, width), max_distance * max_distance + 1, dtype=np.float32)
+        # plain floats, numpy scalar arithmetic is slow for small boxes
+        points = polygon.astype(np.float32).tolist()
+        for i in range(len(points)):
+            point_1 = points[i]
+            point_2 = points[(i + 1) % len(points)]
+            x0 = max(math.ceil(min(point_1[0], point_2[0]) - max_distance),
+                     xmin)
+            x1 = min(int(max(point_1[0], point_2[0]) + max_distance), xmax)
+            y0 = max(math.ceil(min(point_1[1], point_2[1]) - max_distance),
+                     ymin)
+            y1 = min(int(max(point_1[1], point_2[1]) + max_distance), ymax)
+            if x0 > x1 or y0 > y1:
+                continue
+            xs = np.arange(x0, x1 + 1, dtype=np.float32)
+            ys = np.arange(y0, y1 + 1, dtype=np.float32)[:, np.newaxis]
+            edge_x = point_2[0] - point_1[0]
+            edge_y = point_2[1] - point_1[1]
+            square_distance = edge_x * edge_x + edge_y * edge_y
+
+            dx_1 = xs - point_1[0]
+            dy_1 = ys - point_1[1]
+            square_distance_1 = np.square(dx_1) + np.square(dy_1)
+            square_distance_2 = np.square(xs - point_2[0]) + np.square(
+                ys - point_2[1])
+
+            # acute angle at the pixel, the nearer end point is used
+            edge_distance = np.fmin(square_distance_1, square_distance_2)
+            if square_distance > 0:
+                obtuse = square_distance_1 + square_distance_2 <= \
+                    square_distance
+                np.copyto(
+                    edge_distance,
+                    np.square(dx_1 * edge_y - dy_1 * edge_x) / square_distance,
+                    where=obtuse)
+            window = result[y0 - ymin:y1 - ymin + 1, x0 - xmin:x1 - xmin + 1]
+            np.fmin(window, edge_distance, out=window)
         return result
 
     def extend_line(self, point_1, point_2, result, shrink_ratio):
@@ -45,7 +45,7 @@ class DecodeImage(object):
             assert type(img) is str and len(
                 img) > 0, "invalid input 'img' in DecodeImage"
         else:
-            assert type(img) is bytes and len(
+            assert type(img) in (bytes, memoryview) and len(
                 img) > 0, "invalid input 'img' in DecodeImage"
         img = np.frombuffer(img, dtype='uint8')
         if self.ignore_orientation:
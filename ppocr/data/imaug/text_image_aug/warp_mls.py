@@ -16,6 +16,7 @@ This code is refer from:
 https://github.com/RubanSeven/Text-Image-Augmentation-python/blob/master/warp_mls.py
 """
 
+import cv2
 import numpy as np
 
 
@@ -29,138 +30,105 @@ class WarpMLS:
         self.dst_h = dst_h
         self.trans_ratio = trans_ratio
         self.grid_size = 100
-        self.rdx = np.zeros((self.dst_h, self.dst_w))
-        self.rdy = np.zeros((self.dst_h, self.dst_w))
-
-    @staticmethod
-    def __bilinear_interp(x, y, v11, v12, v21, v22):
-        return (v11 * (1 - y) + v12 * y) * (1 - x) + (v21 *
-                                                      (1 - y) + v22 * y) * x
+        # the displacement is solved on grid nodes placed every grid_size
+        # pixels plus the last column/row, and interpolated in between
+        self.grid_x = self.__grid_nodes(self.dst_w)
+        self.grid_y = self.__grid_nodes(self.dst_h)
+        self.rdx = np.zeros((len(self.grid_y), len(self.grid_x)))
+        self.rdy = np.zeros((len(self.grid_y), len(self.grid_x)))
+
+    def __grid_nodes(self, size):
+        nodes = np.arange(0, size, self.grid_size)
+        if nodes[-1] != size - 1:
+            nodes = np.append(nodes, size - 1)
+        return nodes
 
     def generate(self):
         self.calc_delta()
         return self.gen_img()
 
     def calc_delta(self):
-        w = np.zeros(self.pt_count, dtype=np.float32)
-
+        """
+        Similarity MLS deformation of all grid nodes at once.
+        """
         if self.pt_count < 2:
             return
 
-        i = 0
-        while 1:
-            if self.dst_w <= i < self.dst_w + self.grid_size - 1:
-                i = self.dst_w - 1
-            elif i >= self.dst_w:
-                break
-
-            j = 0
-            while 1:
-                if self.dst_h <= j < self.dst_h + self.grid_size - 1:
-                    j = self.dst_h - 1
-                elif j >= self.dst_h:
-                    break
-
-                sw = 0
-                swp = np.zeros(2, dtype=np.float32)
-                swq = np.zeros(2, dtype=np.float32)
-                new_pt = np.zeros(2, dtype=np.float32)
-                cur_pt = np.array([i, j], dtype=np.float32)
-
-                k = 0
-                for k in range(self.pt_count):
-                    if i == self.dst_pts[k][0] and j == self.dst_pts[k][1]:
-                        break
-
-                    w[k] = 1. / (
-                        (i - self.dst_pts[k][0]) * (i - self.dst_pts[k][0]) +
-                        (j - self.dst_pts[k][1]) * (j - self.dst_pts[k][1]))
-
-                    sw += w[k]
-                    swp = swp + w[k] * np.array(self.dst_pts[k])
-                    swq = swq + w[k] * np.array(self.src_pts[k])
-
-                if k == self.pt_count - 1:
-                    pstar = 1 / sw * swp
-                    qstar = 1 / sw * swq
-
-                    miu_s = 0
-                    for k in range(self.pt_count):
-                        if i == self.dst_pts[k][0] and j == self.dst_pts[k][1]:
-                            continue
-                        pt_i = self.dst_pts[k] - pstar
-                        miu_s += w[k] * np.sum(pt_i * pt_i)
-
-                    cur_pt -= pstar
-                    cur_pt_j = np.array([-cur_pt[1], cur_pt[0]])
-
-                    for k in range(self.pt_count):
-                        if i == self.dst_pts[k][0] and j == self.dst_pts[k][1]:
-                            continue
-
-                        pt_i = self.dst_pts[k] - pstar
-                        pt_j = np.array([-pt_i[1], pt_i[0]])
-
-                        tmp_pt = np.zeros(2, dtype=np.float32)
-                        tmp_pt[0] = np.sum(pt_i * cur_pt) * self.src_pts[k][0] - \
-                                    np.sum(pt_j * cur_pt) * self.src_pts[k][1]
-                        tmp_pt[1] = -np.sum(pt_i * cur_pt_j) * self.src_pts[k][0] + \
-                                    np.sum(pt_j * cur_pt_j) * self.src_pts[k][1]
-                        tmp_pt *= (w[k] / miu_s)
-                        new_pt += tmp_pt
-
-                    new_pt += qstar
-                else:
-                    new_pt = self.src_pts[k]
-
-                self.rdx[j, i] = new_pt[0] - i
-                self.rdy[j, i] = new_pt[1] - j
-
-                j += self.grid_size
-            i += self.grid_size
+        dst_pts = np.asarray(self.dst_pts, dtype=np.float64)
+        src_pts = np.asarray(self.src_pts, dtype=np.float64)
+        node_y, node_x = np.meshgrid(self.grid_y, self.grid_x, indexing='ij')
+        nodes = np.stack(
+            [node_x.ravel(), node_y.ravel()], axis=1).astype(np.float64)
+
+        dist = np.sum(np.square(nodes[:, None, :] - dst_pts[None]), axis=-1)
+        on_pt = dist == 0
+        w = np.divide(1., dist, out=np.zeros_like(dist), where=~on_pt)
+        sw = np.sum(w, axis=1, keepdims=True)
+        pstar = w.dot(dst_pts) / sw
+        qstar = w.dot(src_pts) / sw
+
+        pt_i = dst_pts[None] - pstar[:, None]
+        miu_s = np.sum(w * np.sum(np.square(pt_i), axis=-1), axis=1)
+        cur_pt = nodes - pstar
+        # the four products of the reference loop are these two up to sign
+        px, py = pt_i[..., 0], pt_i[..., 1]
+        cx, cy = cur_pt[:, 0:1], cur_pt[:, 1:2]
+        dot = px * cx + py * cy
+        cross = py * cx - px * cy
+        w = w / miu_s[:, None]
+        new_x = np.sum(
+            w * (dot * src_pts[:, 0] + cross * src_pts[:, 1]),
+            axis=1) + qstar[:, 0]
+        new_y = np.sum(
+            w * (dot * src_pts[:, 1] - cross * src_pts[:, 0]),
+            axis=1) + qstar[:, 1]
+
+        # a node on a control point maps to its source point, except for the
+        # last control point which keeps the fit of the others like the
+        # reference loop does
+        first_pt = np.argmax(on_pt, axis=1)
+        on_pt = np.any(on_pt, axis=1) & (first_pt != self.pt_count - 1)
+        new_x[on_pt] = src_pts[first_pt[on_pt], 0]
+        new_y[on_pt] = src_pts[first_pt[on_pt], 1]
+
+        self.rdx = (new_x - nodes[:, 0]).reshape(self.rdx.shape)
+        self.rdy = (new_y - nodes[:, 1]).reshape(self.rdy.shape)
+
+    def __interp_weights(self, size, grid):
+        """
+        For every pixel along one axis, the two grid nodes around it and the
+        weight of the second one. The last cell is divided by its length
+        plus one, as in the reference implementation.
+        """
+        pos = np.arange(size)
+        start = pos // self.grid_size * self.grid_size
+        end = np.minimum(start + self.grid_size, size - 1)
+        length = np.where(start + self.grid_size >= size, size - start,
+                          self.grid_size)
+        return (np.searchsorted(grid, start), np.searchsorted(grid, end),
+                (pos - start) / length)
+
+    def __interp_delta(self, delta):
+        y0, y1, ty = self.__interp_weights(self.dst_h, self.grid_y)
+        x0, x1, tx = self.__interp_weights(self.dst_w, self.grid_x)
+        delta = delta[y0] * (1 - ty[:, None]) + delta[y1] * ty[:, None]
+        return delta[:, x0] * (1 - tx) + delta[:, x1] * tx
 
     def gen_img(self):
         src_h, src_w = self.src.shape[:2]
-        dst = np.zeros_like(self.src, dtype=np.float32)
-
-        for i in np.arange(0, self.dst_h, self.grid_size):
-            for j in np.arange(0, self.dst_w, self.grid_size):
-                ni = i + self.grid_size
-                nj = j + self.grid_size
-                w = h = self.grid_size
-                if ni >= self.dst_h:
-                    ni = self.dst_h - 1
-                    h = ni - i + 1
-                if nj >= self.dst_w:
-                    nj = self.dst_w - 1
-                    w = nj - j + 1
-
-                di = np.reshape(np.arange(h), (-1, 1))
-                dj = np.reshape(np.arange(w), (1, -1))
-                delta_x = self.__bilinear_interp(
-                    di / h, dj / w, self.rdx[i, j], self.rdx[i, nj],
-                    self.rdx[ni, j], self.rdx[ni, nj])
-                delta_y = self.__bilinear_interp(
-                    di / h, dj / w, self.rdy[i, j], self.rdy[i, nj],
-                    self.rdy[ni, j], self.rdy[ni, nj])
-                nx = j + dj + delta_x * self.trans_ratio
-                ny = i + di + delta_y * self.trans_ratio
-                nx = np.clip(nx, 0, src_w - 1)
-                ny = np.clip(ny, 0, src_h - 1)
-                nxi = np.array(np.floor(nx), dtype=np.int32)
-                nyi = np.array(np.floor(ny), dtype=np.int32)
-                nxi1 = np.array(np.ceil(nx), dtype=np.int32)
-                nyi1 = np.array(np.ceil(ny), dtype=np.int32)
-
-                if len(self.src.shape) == 3:
-                    x = np.tile(np.expand_dims(ny - nyi, axis=-1), (1, 1, 3))
-                    y = np.tile(np.expand_dims(nx - nxi, axis=-1), (1, 1, 3))
-                else:
-                    x = ny - nyi
-                    y = nx - nxi
-                dst[i:i + h, j:j + w] = self.__bilinear_interp(
-                    x, y, self.src[nyi, nxi], self.src[nyi, nxi1],
-                    self.src[nyi1, nxi], self.src[nyi1, nxi1])
+        map_x = np.arange(self.dst_w) + self.__interp_delta(
+            self.rdx) * self.trans_ratio
+        map_y = np.arange(self.dst_h)[:, None] + self.__interp_delta(
+            self.rdy) * self.trans_ratio
+        map_x = np.clip(map_x, 0, src_w - 1).astype(np.float32)
+        map_y = np.clip(map_y, 0, src_h - 1).astype(np.float32)
+
+        dst = cv2.remap(
+            self.src.astype(np.float32),
+            map_x,
+            map_y,
+            interpolation=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_REPLICATE)
 
         dst = np.clip(dst, 0, 255)
         dst = np.array(dst, dtype=np.uint8)
@@ -20,8 +20,36 @@ import string
 import six
 import pickle
 from PIL import Image
+from functools import partial
 
 from .imaug import transform, create_operators
+from .transform_cache import build_transform_cache, transform_sample
+
+# lmdb environments of the current process keyed by dir path. An lmdb can
+# only be opened once per process, so all datasets share them, and the ones
+# inherited through fork are closed and opened again.
+_lmdb_envs = {}
+_lmdb_envs_pid = None
+
+
+def get_lmdb_env(dirpath):
+    global _lmdb_envs, _lmdb_envs_pid
+    if _lmdb_envs_pid != os.getpid():
+        for env in _lmdb_envs.values():
+            env.close()
+        _lmdb_envs = {}
+        _lmdb_envs_pid = os.getpid()
+    env = _lmdb_envs.get(dirpath)
+    if env is None:
+        env = lmdb.open(
+            dirpath,
+            max_readers=32,
+            readonly=True,
+            lock=False,
+            readahead=False,
+            meminit=False)
+        _lmdb_envs[dirpath] = env
+    return env
 
 
 class LMDBDataSet(Dataset):
@@ -43,44 +71,71 @@ class LMDBDataSet(Dataset):
         self.ops = create_operators(dataset_config['transforms'], global_config)
         self.ext_op_transform_idx = dataset_config.get("ext_op_transform_idx",
                                                        1)
+        self.transform_cache = build_transform_cache(dataset_config,
+                                                     global_config, logger)
 
         ratio_list = dataset_config.get("ratio_list", [1.0])
         self.need_reset = True in [x < 1 for x in ratio_list]
 
+    def get_num_samples(self, txn):
+        return int(txn.get('num-samples'.encode()))
+
     def load_hierarchical_lmdb_dataset(self, data_dir):
         lmdb_sets = {}
         dataset_idx = 0
         for dirpath, dirnames, filenames in os.walk(data_dir + '/'):
             if not dirnames:
-                env = lmdb.open(
-                    dirpath,
-                    max_readers=32,
-                    readonly=True,
-                    lock=False,
-                    readahead=False,
-                    meminit=False)
-                txn = env.begin(write=False)
-                num_samples = int(txn.get('num-samples'.encode()))
-                lmdb_sets[dataset_idx] = {"dirpath":dirpath, "env":env, \
-                    "txn":txn, "num_samples":num_samples}
+                with get_lmdb_env(dirpath).begin(write=False) as txn:
+                    num_samples = self.get_num_samples(txn)
+                lmdb_sets[dataset_idx] = {
+                    "dirpath": dirpath,
+                    "num_samples": num_samples
+                }
                 dataset_idx += 1
         return lmdb_sets
 
+    def get_txn(self, lmdb_idx):
+        """
+        Read transaction of lmdb lmdb_idx, opened on first use in every
+        process, so forked dataloader workers never use the handles of
+        their parent.
+        """
+        if getattr(self, 'lmdb_pid', None) != os.getpid():
+            self.lmdb_pid = os.getpid()
+            self.lmdb_txns = {}
+        txn = self.lmdb_txns.get(lmdb_idx)
+        if txn is None:
+            env = get_lmdb_env(self.lmdb_sets[lmdb_idx]['dirpath'])
+            txn = env.begin(write=False)
+            self.lmdb_txns[lmdb_idx] = txn
+        return txn
+
+    def __getstate__(self):
+        # lmdb handles can not be pickled, spawned workers open their own
+        state = self.__dict__.copy()
+        state.pop('lmdb_pid', None)
+        state.pop('lmdb_txns', None)
+        return state
+
     def dataset_traversal(self):
+        """
+        Index of all samples as an int32 (N, 2) array of
+        (lmdb idx, file idx), file idx starting at 1.
+        """
         lmdb_num = len(self.lmdb_sets)
-        total_sample_num = 0
-        for lno in range(lmdb_num):
-            total_sample_num += self.lmdb_sets[lno]['num_samples']
-        data_idx_order_list = np.zeros((total_sample_num, 2))
+        num_samples = [
+            self.lmdb_sets[lno]['num_samples'] for lno in range(lmdb_num)
+        ]
+        total_sample_num = sum(num_samples)
+        data_idx_order_list = np.empty((total_sample_num, 2), dtype=np.int32)
+        data_idx_order_list[:, 0] = np.repeat(
+            np.arange(lmdb_num, dtype=np.int32), num_samples)
         beg_idx = 0
-        for lno in range(lmdb_num):
-            tmp_sample_num = self.lmdb_sets[lno]['num_samples']
+        for tmp_sample_num in num_samples:
             end_idx = beg_idx + tmp_sample_num
-            data_idx_order_list[beg_idx:end_idx, 0] = lno
-            data_idx_order_list[beg_idx:end_idx, 1] \
-                = list(range(tmp_sample_num))
-            data_idx_order_list[beg_idx:end_idx, 1] += 1
-            beg_idx = beg_idx + tmp_sample_num
+            data_idx_order_list[beg_idx:end_idx, 1] = np.arange(
+                1, tmp_sample_num + 1, dtype=np.int32)
+            beg_idx = end_idx
         return data_idx_order_list
 
     def get_img_data(self, value):
@@ -105,20 +160,20 @@ class LMDBDataSet(Dataset):
         ext_data = []
 
         while len(ext_data) < ext_data_num:
-            lmdb_idx, file_idx = self.data_idx_order_list[np.random.randint(
-                len(self))]
-            lmdb_idx = int(lmdb_idx)
-            file_idx = int(file_idx)
-            sample_info = self.get_lmdb_sample_info(
-                self.lmdb_sets[lmdb_idx]['txn'], file_idx)
-            if sample_info is None:
-                continue
-            img, label = sample_info
-            data = {'image': img, 'label': label}
-            data = transform(data, load_data_ops)
-            if data is None:
-                continue
-            ext_data.append(data)
+            idxs = np.random.randint(
+                len(self), size=ext_data_num - len(ext_data))
+            for idx, sample_info in zip(idxs,
+                                        self.get_lmdb_sample_infos(idxs)):
+                if sample_info is None:
+                    continue
+                img, label = sample_info
+                data = {'image': img, 'label': label}
+                data = transform_sample(self.transform_cache,
+                                        self.get_sample_key(idx),
+                                        lambda: data, load_data_ops)
+                if data is None:
+                    continue
+                ext_data.append(data)
         return ext_data
 
     def get_lmdb_sample_info(self, txn, index):
@@ -131,22 +186,58 @@ class LMDBDataSet(Dataset):
         imgbuf = txn.get(img_key)
         return imgbuf, label
 
+    def get_lmdb_sample_infos(self, idxs):
+        """
+        Bulk version of get_lmdb_sample_info for the dataset indices idxs,
+        used by get_ext_data to read the extra samples of an augmentation in
+        one lookup. Keys are fetched per lmdb in key order with one cursor,
+        so runs of neighbouring samples are read sequentially.
+        return: list of (imgbuf, label) or None, in the order of idxs
+        """
+        sample_infos = [None] * len(idxs)
+        order = self.data_idx_order_list[np.asarray(idxs, dtype=np.int64)]
+        for lmdb_idx in np.unique(order[:, 0]):
+            pos = np.nonzero(order[:, 0] == lmdb_idx)[0]
+            file_idxs = order[pos, 1].tolist()
+            with self.get_txn(int(lmdb_idx)).cursor() as cursor:
+                labels = dict(
+                    cursor.getmulti(sorted(
+                        set('label-%09d'.encode() % i for i in file_idxs))))
+                imgbufs = dict(
+                    cursor.getmulti(sorted(
+                        set('image-%09d'.encode() % i for i in file_idxs))))
+            for p, file_idx in zip(pos, file_idxs):
+                label = labels.get('label-%09d'.encode() % file_idx)
+                if label is None:
+                    continue
+                sample_infos[p] = (
+                    imgbufs.get('image-%09d'.encode() % file_idx),
+                    label.decode('utf-8'))
+        return sample_infos
+
     def __getitem__(self, idx):
-        lmdb_idx, file_idx = self.data_idx_order_list[idx]
-        lmdb_idx = int(lmdb_idx)
-        file_idx = int(file_idx)
-        sample_info = self.get_lmdb_sample_info(self.lmdb_sets[lmdb_idx]['txn'],
-                                                file_idx)
-        if sample_info is None:
-            return self.__getitem__(np.random.randint(self.__len__()))
-        img, label = sample_info
-        data = {'image': img, 'label': label}
-        data['ext_data'] = self.get_ext_data()
-        outs = transform(data, self.ops)
+        outs = transform_sample(self.transform_cache,
+                                self.get_sample_key(idx),
+                                partial(self.load_sample, idx), self.ops,
+                                self.get_ext_data)
         if outs is None:
             return self.__getitem__(np.random.randint(self.__len__()))
         return outs
 
+    def get_sample_key(self, idx):
+        lmdb_idx, file_idx = self.data_idx_order_list[idx]
+        return '{}:{}'.format(self.lmdb_sets[int(lmdb_idx)]['dirpath'],
+                              file_idx)
+
+    def load_sample(self, idx):
+        lmdb_idx, file_idx = self.data_idx_order_list[idx]
+        sample_info = self.get_lmdb_sample_info(
+            self.get_txn(int(lmdb_idx)), int(file_idx))
+        if sample_info is None:
+            return None
+        img, label = sample_info
+        return {'image': img, 'label': label}
+
     def __len__(self):
         return self.data_idx_order_list.shape[0]
 
@@ -194,8 +285,8 @@ class LMDBDataSetSR(LMDBDataSet):
         lmdb_idx, file_idx = self.data_idx_order_list[idx]
         lmdb_idx = int(lmdb_idx)
         file_idx = int(file_idx)
-        sample_info = self.get_lmdb_sample_info(self.lmdb_sets[lmdb_idx]['txn'],
-                                                file_idx)
+        sample_info = self.get_lmdb_sample_info(
+            self.get_txn(lmdb_idx), file_idx)
         if sample_info is None:
             return self.__getitem__(np.random.randint(self.__len__()))
         img_HR, img_lr, label_str = sample_info
@@ -207,20 +298,18 @@ class LMDBDataSetSR(LMDBDataSet):
 
 
 class LMDBDataSetTableMaster(LMDBDataSet):
+    def get_num_samples(self, txn):
+        return int(pickle.loads(txn.get(b"__len__")))
+
     def load_hierarchical_lmdb_dataset(self, data_dir):
         lmdb_sets = {}
         dataset_idx = 0
-        env = lmdb.open(
-            data_dir,
-            max_readers=32,
-            readonly=True,
-            lock=False,
-            readahead=False,
-            meminit=False)
-        txn = env.begin(write=False)
-        num_samples = int(pickle.loads(txn.get(b"__len__")))
-        lmdb_sets[dataset_idx] = {"dirpath":data_dir, "env":env, \
-            "txn":txn, "num_samples":num_samples}
+        with get_lmdb_env(data_dir).begin(write=False) as txn:
+            num_samples = self.get_num_samples(txn)
+        lmdb_sets[dataset_idx] = {
+            "dirpath": data_dir,
+            "num_samples": num_samples
+        }
         return lmdb_sets
 
     def get_img_data(self, value):
@@ -277,8 +366,7 @@ class LMDBDataSetTableMaster(LMDBDataSet):
         lmdb_idx, file_idx = self.data_idx_order_list[idx]
         lmdb_idx = int(lmdb_idx)
         file_idx = int(file_idx)
-        data = self.get_lmdb_sample_info(self.lmdb_sets[lmdb_idx]['txn'],
-                                         file_idx)
+        data = self.get_lmdb_sample_info(self.get_txn(lmdb_idx), file_idx)
         if data is None:
             return self.__getitem__(np.random.randint(self.__len__()))
         outs = transform(data, self.ops)
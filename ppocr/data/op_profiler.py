@@ -0,0 +1,129 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Per operator timing of the dataset transforms, enabled with
+profile_transforms: True in the loader config.
+"""
+
+import os
+import time
+import multiprocessing
+
+import numpy as np
+from paddle.io import get_worker_info
+
+__all__ = ['OpProfiler']
+
+
+class TimedOp(object):
+    """
+    Wrap a transform operator and report the wall time of every call to the
+    profiler. Other attributes (e.g. ext_data_num) are read from the wrapped
+    operator.
+    """
+
+    def __init__(self, op, op_idx, profiler):
+        self.op = op
+        self.op_idx = op_idx
+        self.profiler = profiler
+
+    def __call__(self, data):
+        start = time.perf_counter()
+        data = self.op(data)
+        self.profiler.add(self.op_idx, time.perf_counter() - start)
+        return data
+
+    def __getattr__(self, name):
+        # pickle looks up special methods before __dict__ is restored
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.op, name)
+
+
+class OpProfiler(object):
+    """
+    Accumulate the wall time and call count of every operator of a dataset.
+    The counters live in shared memory with one row per DataLoader worker
+    and one for the main process, every process only writes its own row, so
+    no lock is needed. The main process sums the rows and reports what
+    happened since the previous report.
+
+    args:
+        dataset: dataset whose ops are replaced by timed ones
+        num_workers: num_workers of the DataLoader
+    """
+
+    def __init__(self, dataset, num_workers):
+        self.names = [op.__class__.__name__ for op in dataset.ops]
+        self.num_rows = num_workers + 1
+        size = self.num_rows * len(self.names)
+        self.costs = multiprocessing.RawArray('d', size)
+        self.calls = multiprocessing.RawArray('q', size)
+        self.last_costs = np.zeros(len(self.names))
+        self.last_calls = np.zeros(len(self.names), dtype=np.int64)
+        self.pid = None
+        self.row_offset = 0
+        dataset.ops = [
+            TimedOp(op, op_idx, self) for op_idx, op in enumerate(dataset.ops)
+        ]
+
+    def get_row_offset(self):
+        pid = os.getpid()
+        if pid != self.pid:
+            worker_info = get_worker_info()
+            row = self.num_rows - 1 if worker_info is None else worker_info.id
+            self.pid = pid
+            self.row_offset = row * len(self.names)
+        return self.row_offset
+
+    def add(self, op_idx, cost):
+        pos = self.get_row_offset() + op_idx
+        self.costs[pos] += cost
+        self.calls[pos] += 1
+
+    def get(self):
+        """
+        return: (names, costs, calls) of every operator since the previous
+            call, costs in seconds
+        """
+        shape = (self.num_rows, len(self.names))
+        costs = np.frombuffer(self.costs, dtype=np.float64).reshape(shape).sum(
+            axis=0)
+        calls = np.frombuffer(self.calls, dtype=np.int64).reshape(shape).sum(
+            axis=0)
+        delta_costs = costs - self.last_costs
+        delta_calls = calls - self.last_calls
+        self.last_costs = costs
+        self.last_calls = calls
+        return self.names, delta_costs, delta_calls
+
+    def log(self):
+        """
+        return: table of the operators ranked by total time since the
+            previous call
+        """
+        names, costs, calls = self.get()
+        total_cost = max(costs.sum(), 1e-12)
+        strs = [
+            'transform profile of {} workers, total: {:.3f} s'.format(
+                self.num_rows - 1, costs.sum())
+        ]
+        for op_idx in np.argsort(-costs, kind='stable'):
+            strs.append(
+                '{:>3d} {:<24s} calls: {:>8d}, total: {:>9.3f} s, avg: '
+                '{:>8.3f} ms, ratio: {:>6.2%}'.format(
+                    op_idx, names[op_idx], calls[op_idx], costs[op_idx],
+                    costs[op_idx] / max(calls[op_idx], 1) * 1000,
+                    costs[op_idx] / total_cost))
+        return '\n'.join(strs)
@@ -0,0 +1,122 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Dataset reading samples from pack files, see ppocr/utils/pack_file.py for
+the format and ppocr/utils/gen_pack.py to convert label files.
+"""
+import os
+import random
+import traceback
+
+import numpy as np
+
+from functools import partial
+from .simple_dataset import SimpleDataSet
+from .transform_cache import transform_sample
+from ppocr.utils.pack_file import PackFile
+
+
+class PackedDataSet(SimpleDataSet):
+    """
+    SimpleDataSet reading samples from pack files instead of label files
+    and image files. label_file_list lists the pack files, ratio_list,
+    shuffle and ext_op_transform_idx work as in SimpleDataSet. data_lines
+    holds (pack idx, sample idx) pairs.
+    """
+
+    def get_image_info_list(self, file_list, ratio_list):
+        if isinstance(file_list, str):
+            file_list = [file_list]
+        self.packs = []
+        data_lines = []
+        for idx, file in enumerate(file_list):
+            pack = PackFile(file)
+            self.packs.append(pack)
+            sample_idxs = list(range(len(pack)))
+            if self.mode == "train" or ratio_list[idx] < 1.0:
+                random.seed(self.seed)
+                sample_idxs = random.sample(
+                    sample_idxs, round(len(sample_idxs) * ratio_list[idx]))
+            lines = np.empty((len(sample_idxs), 2), dtype=np.int64)
+            lines[:, 0] = idx
+            lines[:, 1] = sample_idxs
+            data_lines.append(lines)
+        if len(data_lines) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.concatenate(data_lines)
+
+    def shuffle_data_random(self):
+        np.random.RandomState(self.seed).shuffle(self.data_lines)
+        return
+
+    def get_sample(self, file_idx):
+        pack_idx, sample_idx = self.data_lines[file_idx]
+        pack = self.packs[pack_idx]
+        img_path = os.path.join(self.data_dir, pack.get_name(sample_idx))
+        return {
+            'img_path': img_path,
+            'label': pack.get_label(sample_idx),
+            'image': pack.get_image(sample_idx)
+        }
+
+    def get_sample_key(self, file_idx):
+        pack_idx, sample_idx = self.data_lines[file_idx]
+        return '{}:{}'.format(self.packs[pack_idx].pack_path, sample_idx)
+
+    def get_ext_data(self):
+        ext_data_num = 0
+        for op in self.ops:
+            if hasattr(op, 'ext_data_num'):
+                ext_data_num = getattr(op, 'ext_data_num')
+                break
+        load_data_ops = self.ops[:self.ext_op_transform_idx]
+        ext_data = []
+
+        while len(ext_data) < ext_data_num:
+            file_idx = self.data_idx_order_list[np.random.randint(self.__len__(
+            ))]
+            data = transform_sample(
+                self.transform_cache,
+                self.get_sample_key(file_idx),
+                partial(self.get_sample, file_idx), load_data_ops)
+
+            if data is None:
+                continue
+            if 'polys' in data.keys():
+                if data['polys'].shape[1] != 4:
+                    continue
+            ext_data.append(data)
+        return ext_data
+
+    def __getitem__(self, idx):
+        file_idx = self.data_idx_order_list[idx]
+        try:
+            outs = transform_sample(
+                self.transform_cache,
+                self.get_sample_key(file_idx),
+                partial(self.get_sample, file_idx), self.ops,
+                self.get_ext_data)
+        except:
+            self.logger.error(
+                "When parsing sample {} of {}, error happened with msg: {}".
+                format(self.data_lines[file_idx][1], self.packs[
+                    self.data_lines[file_idx][0]].pack_path,
+                       traceback.format_exc()))
+            outs = None
+        if outs is None:
+            # during evaluation, we should fix the idx to get same results for many times of evaluation.
+            rnd_idx = np.random.randint(self.__len__(
+            )) if self.mode == "train" else (idx + 1) % self.__len__()
+            return self.__getitem__(rnd_idx)
+        return outs
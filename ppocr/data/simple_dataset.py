@@ -19,7 +19,9 @@ import json
 import random
 import traceback
 from paddle.io import Dataset
+from functools import partial
 from .imaug import transform, create_operators
+from .transform_cache import build_transform_cache, transform_sample
 
 
 class SimpleDataSet(Dataset):
@@ -56,6 +58,8 @@ class SimpleDataSet(Dataset):
         self.ops = create_operators(dataset_config['transforms'], global_config)
         self.ext_op_transform_idx = dataset_config.get("ext_op_transform_idx",
                                                        2)
+        self.transform_cache = build_transform_cache(dataset_config,
+                                                     global_config, logger)
         self.need_reset = True in [x < 1 for x in ratio_list]
 
     def set_epoch_as_seed(self, seed, dataset_config):
@@ -104,6 +108,15 @@ class SimpleDataSet(Dataset):
                 pass
         return file_name
 
+    def load_sample(self, img_path, label):
+        data = {'img_path': img_path, 'label': label}
+        if not os.path.exists(img_path):
+            raise Exception("{} does not exist!".format(img_path))
+        with open(data['img_path'], 'rb') as f:
+            img = f.read()
+            data['image'] = img
+        return data
+
     def get_ext_data(self):
         ext_data_num = 0
         for op in self.ops:
@@ -123,13 +136,11 @@ class SimpleDataSet(Dataset):
             file_name = self._try_parse_filename_list(file_name)
             label = substr[1]
             img_path = os.path.join(self.data_dir, file_name)
-            data = {'img_path': img_path, 'label': label}
             if not os.path.exists(img_path):
                 continue
-            with open(data['img_path'], 'rb') as f:
-                img = f.read()
-                data['image'] = img
-            data = transform(data, load_data_ops)
+            data = transform_sample(
+                self.transform_cache, img_path + self.delimiter + label,
+                partial(self.load_sample, img_path, label), load_data_ops)
 
             if data is None:
                 continue
@@ -149,14 +160,10 @@ class SimpleDataSet(Dataset):
             file_name = self._try_parse_filename_list(file_name)
             label = substr[1]
             img_path = os.path.join(self.data_dir, file_name)
-            data = {'img_path': img_path, 'label': label}
-            if not os.path.exists(img_path):
-                raise Exception("{} does not exist!".format(img_path))
-            with open(data['img_path'], 'rb') as f:
-                img = f.read()
-                data['image'] = img
-            data['ext_data'] = self.get_ext_data()
-            outs = transform(data, self.ops)
+            outs = transform_sample(
+                self.transform_cache, img_path + self.delimiter + label,
+                partial(self.load_sample, img_path, label), self.ops,
+                self.get_ext_data)
         except:
             self.logger.error(
                 "When parsing line {}, error happened with msg: {}".format(
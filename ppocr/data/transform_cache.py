@@ -0,0 +1,220 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+On disk cache of the output of the deterministic leading transforms of a
+dataset, so that from the second epoch on only the random augmentations run.
+Enabled in the dataset config:
+
+    dataset:
+      name: SimpleDataSet
+      transform_cache:
+        cache_dir: ./output/transform_cache
+        max_size_gb: 16
+"""
+
+import os
+import json
+import pickle
+import hashlib
+
+import lmdb
+
+from .imaug import transform
+
+__all__ = ['TransformCache', 'build_transform_cache', 'transform_sample']
+
+# operators whose output only depends on their input and config
+DETERMINISTIC_OPS = [
+    'DecodeImage', 'NormalizeImage', 'ToCHWImage', 'KeepKeys',
+    'DetResizeForTest', 'DetLabelEncode', 'ClsLabelEncode', 'CTCLabelEncode',
+    'AttnLabelEncode', 'SARLabelEncode', 'NRTRLabelEncode', 'SRNLabelEncode',
+    'ViTSTRLabelEncode', 'ABINetLabelEncode', 'MultiLabelEncode',
+    'ClsResizeImg', 'RecResizeImg', 'SRNRecResizeImg', 'SARRecResizeImg',
+    'SVTRRecResizeImg'
+]
+
+# keys of Global that the label encoders read
+GLOBAL_KEYS = ['character_dict_path', 'max_text_length', 'use_space_char']
+
+# cached value of a sample dropped by the prefix
+_DROPPED = b''
+
+# lmdb environments of the current process keyed by path, see get_lmdb_env
+# in lmdb_dataset.py
+_cache_envs = {}
+_cache_envs_pid = None
+
+
+def get_cache_env(cache_path, map_size):
+    global _cache_envs, _cache_envs_pid
+    if _cache_envs_pid != os.getpid():
+        for env in _cache_envs.values():
+            env.close()
+        _cache_envs = {}
+        _cache_envs_pid = os.getpid()
+    env = _cache_envs.get(cache_path)
+    if env is None:
+        os.makedirs(cache_path, exist_ok=True)
+        env = lmdb.open(
+            cache_path,
+            map_size=map_size,
+            max_readers=1024,
+            readahead=False,
+            meminit=False,
+            sync=False,
+            metasync=False)
+        _cache_envs[cache_path] = env
+    return env
+
+
+def build_transform_cache(dataset_config, global_config, logger):
+    """
+    return: TransformCache of the transform_cache dataset config, None if it
+        is not set or no leading op is deterministic
+    """
+    cache_config = dataset_config.get('transform_cache')
+    if cache_config is None:
+        return None
+    transform_cache = TransformCache(dataset_config['transforms'],
+                                     global_config, **cache_config)
+    if transform_cache.prefix_len == 0:
+        logger.warning("transform_cache is disabled, the first transform "
+                       "is not deterministic")
+        return None
+    logger.info("Cache the output of the first {} transforms in {}".format(
+        transform_cache.prefix_len, transform_cache.cache_path))
+    return transform_cache
+
+
+class TransformCache(object):
+    """
+    Cache of the output of ops[:prefix_len] keyed by sample, stored in an
+    lmdb under cache_dir named after the hash of the prefix config, so a
+    changed prefix never reads stale samples. Samples are added until the
+    lmdb reaches max_size_gb. All dataloader workers share the lmdb, every
+    process opens it on first use.
+
+    args:
+        op_param_list: transforms of the dataset config
+        global_config: Global config, passed to create_operators as well
+        cache_dir: directory of the caches
+        max_size_gb: size limit of the cache
+        prefix_len: number of leading ops to cache, defaults to the longest
+            prefix of ops listed in DETERMINISTIC_OPS
+    """
+
+    def __init__(self,
+                 op_param_list,
+                 global_config,
+                 cache_dir,
+                 max_size_gb=16,
+                 prefix_len=None):
+        op_names = [list(op)[0] for op in op_param_list]
+        if prefix_len is None:
+            prefix_len = 0
+            while prefix_len < len(op_names) and op_names[
+                    prefix_len] in DETERMINISTIC_OPS:
+                prefix_len += 1
+        self.prefix_len = prefix_len
+
+        prefix_config = []
+        for op in op_param_list[:prefix_len]:
+            op_name = list(op)[0]
+            param = op[op_name] or {}
+            prefix_config.append({
+                op_name: {
+                    k: v
+                    for k, v in param.items() if k not in global_config
+                }
+            })
+        prefix_config.append({k: global_config.get(k) for k in GLOBAL_KEYS})
+        config_hash = hashlib.md5(
+            json.dumps(prefix_config, sort_keys=True,
+                       default=str).encode('utf-8')).hexdigest()
+        self.cache_path = os.path.join(cache_dir, config_hash)
+        self.map_size = int(max_size_gb * (1 << 30))
+        self.full = False
+
+    def get_env(self):
+        return get_cache_env(self.cache_path, self.map_size)
+
+    def get_key(self, key):
+        return hashlib.md5(key.encode('utf-8')).digest()
+
+    def get(self, key):
+        """
+        return: (hit, data), data is None for a sample dropped by the prefix
+        """
+        with self.get_env().begin(write=False, buffers=True) as txn:
+            value = txn.get(self.get_key(key))
+            if value is None:
+                return False, None
+            if len(value) == 0:
+                return True, None
+            return True, pickle.loads(value)
+
+    def put(self, key, data):
+        if self.full:
+            return
+        value = _DROPPED if data is None else pickle.dumps(
+            data, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            with self.get_env().begin(write=True) as txn:
+                txn.put(self.get_key(key), value)
+        except lmdb.MapFullError:
+            self.full = True
+
+    def __call__(self, key, load_data, ops):
+        """
+        Output of ops[:prefix_len] for the sample key, load_data() returning
+        the raw sample is only called on a cache miss.
+        """
+        hit, data = self.get(key)
+        if hit:
+            return data
+        data = load_data()
+        if data is None:
+            return None
+        data = transform(data, ops[:self.prefix_len])
+        self.put(key, data)
+        return data
+
+
+def transform_sample(transform_cache, key, load_data, ops, get_ext_data=None):
+    """
+    Same as transform(load_data(), ops) with data['ext_data'] set to
+    get_ext_data(), except that the output of the deterministic prefix of ops
+    is read from transform_cache if it is not None.
+
+    args:
+        transform_cache: TransformCache of the dataset or None
+        key: str identifying the raw sample
+        load_data: function returning the raw sample dict or None
+        ops: the dataset ops or a leading slice of them
+        get_ext_data: function returning the ext_data of the sample
+    """
+    if transform_cache is None or len(ops) < transform_cache.prefix_len:
+        data = load_data()
+        if data is None:
+            return None
+        if get_ext_data is not None:
+            data['ext_data'] = get_ext_data()
+        return transform(data, ops)
+
+    data = transform_cache(key, load_data, ops)
+    if data is None:
+        return None
+    if get_ext_data is not None and isinstance(data, dict):
+        data['ext_data'] = get_ext_data()
+    return transform(data, ops[transform_cache.prefix_len:])
@@ -18,12 +18,88 @@ from __future__ import print_function
 
 __all__ = ['DetMetric', 'DetFCEMetric']
 
+import multiprocessing
+from multiprocessing.pool import AsyncResult
+
 from .eval_det_iou import DetectionIoUEvaluator
 
 
+class BatchEvaluator(object):
+    """
+    Evaluate the images of a batch with DetectionIoUEvaluator, in the calling
+    process or, with num_workers > 0, in a spawned process pool created on
+    first use, so that the images are evaluated while the model predicts the
+    next batches. The pool lives until close, which get_metric calls, a batch
+    failing in a worker raises in the next call.
+    """
+
+    def __init__(self, evaluator, num_workers=0):
+        self.evaluator = evaluator
+        self.num_workers = num_workers
+        self.pool = None
+        self.pending = []
+
+    def __call__(self, gts, preds):
+        """
+        return: list of the results of the images, or an AsyncResult of it
+        """
+        if self.num_workers <= 0:
+            return self.evaluator.evaluate_images(gts, preds)
+        self.check()
+        if self.pool is None:
+            # fork would copy the threads and the device state of the trainer
+            self.pool = multiprocessing.get_context('spawn').Pool(
+                self.num_workers)
+        batch_result = self.pool.apply_async(self.evaluator.evaluate_images,
+                                             (gts, preds))
+        self.pending.append(batch_result)
+        return batch_result
+
+    def check(self):
+        """
+        raise the error of the first batch that failed in the pool
+        """
+        pending = []
+        for batch_result in self.pending:
+            if not batch_result.ready():
+                pending.append(batch_result)
+            elif not batch_result.successful():
+                self.close()
+                batch_result.get()
+        self.pending = pending
+
+    @staticmethod
+    def collect(batch_results):
+        """
+        return: results of all the images in batch order, waits for the
+            batches evaluated in the pool
+        """
+        results = []
+        for batch_result in batch_results:
+            if isinstance(batch_result, AsyncResult):
+                batch_result = batch_result.get()
+            results.extend(batch_result)
+        return results
+
+    def close(self):
+        """
+        shut the pool down, the batches still running are dropped
+        """
+        if self.pool is None:
+            return
+        if all(batch_result.ready() for batch_result in self.pending):
+            self.pool.close()
+        else:
+            self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+        self.pending = []
+
+
 class DetMetric(object):
-    def __init__(self, main_indicator='hmean', **kwargs):
+    def __init__(self, main_indicator='hmean', num_workers=0, **kwargs):
         self.evaluator = DetectionIoUEvaluator()
+        self.batch_evaluator = BatchEvaluator(self.evaluator, num_workers)
         self.main_indicator = main_indicator
         self.reset()
 
@@ -39,6 +115,8 @@ class DetMetric(object):
        '''
         gt_polyons_batch = batch[2]
         ignore_tags_batch = batch[3]
+        gt_info_lists = []
+        det_info_lists = []
         for pred, gt_polyons, ignore_tags in zip(preds, gt_polyons_batch,
                                                  ignore_tags_batch):
             # prepare gt
@@ -52,8 +130,10 @@ class DetMetric(object):
                 'points': det_polyon,
                 'text': ''
             } for det_polyon in pred['points']]
-            result = self.evaluator.evaluate_image(gt_info_list, det_info_list)
-            self.results.append(result)
+            gt_info_lists.append(gt_info_list)
+            det_info_lists.append(det_info_list)
+        self.results.append(
+            self.batch_evaluator(gt_info_lists, det_info_lists))
 
     def get_metric(self):
         """
@@ -64,17 +144,22 @@ class DetMetric(object):
             }
         """
 
-        metrics = self.evaluator.combine_results(self.results)
+        try:
+            metrics = self.evaluator.combine_results(
+                BatchEvaluator.collect(self.results))
+        finally:
+            self.batch_evaluator.close()
         self.reset()
         return metrics
 
     def reset(self):
-        self.results = []  # clear results
+        self.results = []  # clear results, one item per batch
 
 
 class DetFCEMetric(object):
-    def __init__(self, main_indicator='hmean', **kwargs):
+    def __init__(self, main_indicator='hmean', num_workers=0, **kwargs):
         self.evaluator = DetectionIoUEvaluator()
+        self.batch_evaluator = BatchEvaluator(self.evaluator, num_workers)
         self.main_indicator = main_indicator
         self.reset()
 
@@ -90,7 +175,8 @@ class DetFCEMetric(object):
        '''
         gt_polyons_batch = batch[2]
         ignore_tags_batch = batch[3]
-
+        gt_info_lists = []
+        det_info_lists = {score_thr: [] for score_thr in self.results.keys()}
         for pred, gt_polyons, ignore_tags in zip(preds, gt_polyons_batch,
                                                  ignore_tags_batch):
             # prepare gt
@@ -106,14 +192,16 @@ class DetFCEMetric(object):
                 'score': score
             } for det_polyon, score in zip(pred['points'], pred['scores'])]
 
+            gt_info_lists.append(gt_info_list)
             for score_thr in self.results.keys():
                 det_info_list_thr = [
                     det_info for det_info in det_info_list
                     if det_info['score'] >= score_thr
                 ]
-                result = self.evaluator.evaluate_image(gt_info_list,
-                                                       det_info_list_thr)
-                self.results[score_thr].append(result)
+                det_info_lists[score_thr].append(det_info_list_thr)
+        for score_thr in self.results.keys():
+            self.results[score_thr].append(
+                self.batch_evaluator(gt_info_lists, det_info_lists[score_thr]))
 
     def get_metric(self):
         """
@@ -127,10 +215,17 @@ class DetFCEMetric(object):
             'thr 0.9':'precision: 0 recall: 0 hmean: 0',
             }
         """
+        try:
+            results = {
+                score_thr: BatchEvaluator.collect(batch_results)
+                for score_thr, batch_results in self.results.items()
+            }
+        finally:
+            self.batch_evaluator.close()
         metrics = {}
         hmean = 0
         for score_thr in self.results.keys():
-            metric = self.evaluator.combine_results(self.results[score_thr])
+            metric = self.evaluator.combine_results(results[score_thr])
             # for key, value in metric.items():
             #     metrics['{}_{}'.format(key, score_thr)] = value
             metric_str = 'precision:{:.5f} recall:{:.5f} hmean:{:.5f}'.format(
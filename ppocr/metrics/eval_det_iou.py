@@ -1,166 +1,108 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-from collections import namedtuple
 import numpy as np
-from shapely.geometry import Polygon
+import shapely
+
+from ppocr.utils.poly_nms import VECTORIZED, points2polygons, polygon_bounds
 """
 reference from :
 https://github.com/MhLiao/DB/blob/3c32b808d4412680310d3d28eeb6a2d5bf1566c5/concern/icdar2015_eval/detection/iou.py#L8
 """
 
 
+def bounds_overlap(bounds1, bounds2):
+    """
+    return: [N, M] bool of the pairs of bounds [N, 4] and [M, 4] that overlap
+        or touch, the polygons of the other pairs do not intersect
+    """
+    return (bounds1[:, None, 0] <= bounds2[None, :, 2]) & (
+        bounds1[:, None, 2] >= bounds2[None, :, 0]) & (
+            bounds1[:, None, 1] <= bounds2[None, :, 3]) & (
+                bounds1[:, None, 3] >= bounds2[None, :, 1])
+
+
+def pairs_iou(detPols, gtPols, detNums, gtNums):
+    """
+    return: IoU of the pairs (detPols[detNums[i]], gtPols[gtNums[i]])
+    """
+    if VECTORIZED:
+        pD, pG = detPols[detNums], gtPols[gtNums]
+        return shapely.area(shapely.intersection(pD, pG)) / shapely.area(
+            shapely.union(pD, pG))
+    return np.array(
+        [
+            detPols[detNum].intersection(gtPols[gtNum]).area /
+            detPols[detNum].union(gtPols[gtNum]).area
+            for detNum, gtNum in zip(detNums, gtNums)
+        ],
+        dtype=np.float64)
+
+
 class DetectionIoUEvaluator(object):
     def __init__(self, iou_constraint=0.5, area_precision_constraint=0.5):
         self.iou_constraint = iou_constraint
         self.area_precision_constraint = area_precision_constraint
 
     def evaluate_image(self, gt, pred):
-        def get_union(pD, pG):
-            return Polygon(pD).union(Polygon(pG)).area
-
-        def get_intersection_over_union(pD, pG):
-            return get_intersection(pD, pG) / get_union(pD, pG)
-
-        def get_intersection(pD, pG):
-            return Polygon(pD).intersection(Polygon(pG)).area
-
-        def compute_ap(confList, matchList, numGtCare):
-            correct = 0
-            AP = 0
-            if len(confList) > 0:
-                confList = np.array(confList)
-                matchList = np.array(matchList)
-                sorted_ind = np.argsort(-confList)
-                confList = confList[sorted_ind]
-                matchList = matchList[sorted_ind]
-                for n in range(len(confList)):
-                    match = matchList[n]
-                    if match:
-                        correct += 1
-                        AP += float(correct) / (n + 1)
-
-                if numGtCare > 0:
-                    AP /= numGtCare
-
-            return AP
-
-        perSampleMetrics = {}
-
-        matchedSum = 0
-
-        Rectangle = namedtuple('Rectangle', 'xmin ymin xmax ymax')
-
-        numGlobalCareGt = 0
-        numGlobalCareDet = 0
-
-        arrGlobalConfidences = []
-        arrGlobalMatches = []
-
-        recall = 0
-        precision = 0
-        hmean = 0
-
-        detMatched = 0
-
-        iouMat = np.empty([1, 1])
-
-        gtPols = []
-        detPols = []
-
-        gtPolPoints = []
-        detPolPoints = []
-
+        """
+        Every polygon is built once, the intersection and union are only
+        computed for the (gt, det) pairs whose bounds overlap, the IoU of the
+        other pairs is 0.
+        """
+        gtPols = points2polygons([gt_item['points'] for gt_item in gt])
+        gtValid = np.array([gtPol.is_valid for gtPol in gtPols], dtype=bool)
+        gtPols = gtPols[gtValid]
+        gtBounds = polygon_bounds(gtPols)
         # Array of Ground Truth Polygons' keys marked as don't Care
-        gtDontCarePolsNum = []
+        gtIgnore = np.array([gt_item['ignore'] for gt_item in gt], dtype=bool)
+        gtDontCarePolsNum = np.flatnonzero(gtIgnore[gtValid]).tolist()
+
+        detPols = points2polygons([pred_item['points'] for pred_item in pred])
+        detPols = detPols[np.array(
+            [detPol.is_valid for detPol in detPols], dtype=bool)]
+        detBounds = polygon_bounds(detPols)
         # Array of Detected Polygons' matched with a don't Care GT
         detDontCarePolsNum = []
-
-        pairs = []
-        detMatchedNums = []
-
-        arrSampleConfidences = []
-        arrSampleMatch = []
-
-        evaluationLog = ""
-
-        for n in range(len(gt)):
-            points = gt[n]['points']
-            dontCare = gt[n]['ignore']
-            if not Polygon(points).is_valid:
-                continue
-
-            gtPol = points
-            gtPols.append(gtPol)
-            gtPolPoints.append(points)
-            if dontCare:
-                gtDontCarePolsNum.append(len(gtPols) - 1)
-
-        evaluationLog += "GT polygons: " + str(len(gtPols)) + (
-            " (" + str(len(gtDontCarePolsNum)) + " don't care)\n"
-            if len(gtDontCarePolsNum) > 0 else "\n")
-
-        for n in range(len(pred)):
-            points = pred[n]['points']
-            if not Polygon(points).is_valid:
-                continue
-
-            detPol = points
-            detPols.append(detPol)
-            detPolPoints.append(points)
-            if len(gtDontCarePolsNum) > 0:
-                for dontCarePol in gtDontCarePolsNum:
-                    dontCarePol = gtPols[dontCarePol]
-                    intersected_area = get_intersection(dontCarePol, detPol)
-                    pdDimensions = Polygon(detPol).area
+        if len(gtDontCarePolsNum) > 0:
+            dontCareOverlap = bounds_overlap(detBounds,
+                                             gtBounds[gtDontCarePolsNum])
+            for detNum, detPol in enumerate(detPols):
+                pdDimensions = detPol.area
+                for dontCarePol, overlap in zip(gtDontCarePolsNum,
+                                                dontCareOverlap[detNum]):
+                    intersected_area = gtPols[dontCarePol].intersection(
+                        detPol).area if overlap else 0
                     precision = 0 if pdDimensions == 0 else intersected_area / pdDimensions
                     if (precision > self.area_precision_constraint):
-                        detDontCarePolsNum.append(len(detPols) - 1)
+                        detDontCarePolsNum.append(detNum)
                         break
 
-        evaluationLog += "DET polygons: " + str(len(detPols)) + (
-            " (" + str(len(detDontCarePolsNum)) + " don't care)\n"
-            if len(detDontCarePolsNum) > 0 else "\n")
-
+        detMatched = 0
         if len(gtPols) > 0 and len(detPols) > 0:
-            # Calculate IoU and precision matrixs
-            outputShape = [len(gtPols), len(detPols)]
-            iouMat = np.empty(outputShape)
+            # Calculate IoU matrix
+            iouMat = np.zeros([len(gtPols), len(detPols)])
+            gtNums, detNums = np.nonzero(bounds_overlap(gtBounds, detBounds))
+            if len(gtNums) > 0:
+                iouMat[gtNums, detNums] = pairs_iou(detPols, gtPols, detNums,
+                                                    gtNums)
+
             gtRectMat = np.zeros(len(gtPols), np.int8)
             detRectMat = np.zeros(len(detPols), np.int8)
-            for gtNum in range(len(gtPols)):
-                for detNum in range(len(detPols)):
-                    pG = gtPols[gtNum]
-                    pD = detPols[detNum]
-                    iouMat[gtNum, detNum] = get_intersection_over_union(pD, pG)
-
-            for gtNum in range(len(gtPols)):
-                for detNum in range(len(detPols)):
-                    if gtRectMat[gtNum] == 0 and detRectMat[
-                            detNum] == 0 and gtNum not in gtDontCarePolsNum and detNum not in detDontCarePolsNum:
-                        if iouMat[gtNum, detNum] > self.iou_constraint:
-                            gtRectMat[gtNum] = 1
-                            detRectMat[detNum] = 1
-                            detMatched += 1
-                            pairs.append({'gt': gtNum, 'det': detNum})
-                            detMatchedNums.append(detNum)
-                            evaluationLog += "Match GT #" + \
-                                             str(gtNum) + " with Det #" + str(detNum) + "\n"
+            gtDontCare = set(gtDontCarePolsNum)
+            detDontCare = set(detDontCarePolsNum)
+            # only the pairs above the constraint can match, in the order of
+            # looping over gts then dets
+            for gtNum, detNum in zip(*np.nonzero(iouMat >
+                                                 self.iou_constraint)):
+                if gtNum in gtDontCare or detNum in detDontCare:
+                    continue
+                if gtRectMat[gtNum] == 0 and detRectMat[detNum] == 0:
+                    gtRectMat[gtNum] = 1
+                    detRectMat[detNum] = 1
+                    detMatched += 1
 
         numGtCare = (len(gtPols) - len(gtDontCarePolsNum))
         numDetCare = (len(detPols) - len(detDontCarePolsNum))
-        if numGtCare == 0:
-            recall = float(1)
-            precision = float(0) if numDetCare > 0 else float(1)
-        else:
-            recall = float(detMatched) / numGtCare
-            precision = 0 if numDetCare == 0 else float(detMatched) / numDetCare
-
-        hmean = 0 if (precision + recall) == 0 else 2.0 * \
-                                                    precision * recall / (precision + recall)
-
-        matchedSum += detMatched
-        numGlobalCareGt += numGtCare
-        numGlobalCareDet += numDetCare
 
         perSampleMetrics = {
             'gtCare': numGtCare,
@@ -169,6 +111,12 @@ class DetectionIoUEvaluator(object):
         }
         return perSampleMetrics
 
+    def evaluate_images(self, gts, preds):
+        """
+        return: list of the evaluate_image results of the (gt, pred) pairs
+        """
+        return [self.evaluate_image(gt, pred) for gt, pred in zip(gts, preds)]
+
     def combine_results(self, results):
         numGlobalCareGt = 0
         numGlobalCareDet = 0
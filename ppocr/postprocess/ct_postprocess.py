@@ -27,6 +27,8 @@ import cv2
 import paddle
 import pyclipper
 
+from ppocr.postprocess.region_stats import RegionStats, filter_small_components
+
 
 class CTPostProcess(object):
     """
@@ -38,12 +40,6 @@ class CTPostProcess(object):
         self.min_area = min_area
         self.box_type = box_type
 
-        self.coord = np.zeros((2, 300, 300), dtype=np.int32)
-        for i in range(300):
-            for j in range(300):
-                self.coord[0, i, j] = j
-                self.coord[1, i, j] = i
-
     def __call__(self, preds, batch):
         outs = preds['maps']
         out_scores = preds['score']
@@ -77,51 +73,33 @@ class CTPostProcess(object):
             kernel = kernel[0].astype(np.uint8)
             loc = loc[0].astype(np.float32)
 
-            label_num, label_kernel = cv2.connectedComponents(
-                kernel, connectivity=4)
+            # pixel number less than 10, treated as background
+            label_num, label_kernel = filter_small_components(kernel, 10)
 
-            for i in range(1, label_num):
-                ind = (label_kernel == i)
-                if ind.sum(
-                ) < 10:  # pixel number less than 10, treated as background
-                    label_kernel[ind] = 0
-
-            label = np.zeros_like(label_kernel)
+            # every pixel takes the kernel label at the end of its
+            # centripetal shift
             h, w = label_kernel.shape
-            pixels = self.coord[:, :h, :w].reshape(2, -1)
-            points = pixels.transpose([1, 0]).astype(np.float32)
-
-            off_points = (points + 10. / 4. * loc[:, pixels[1], pixels[0]].T
-                          ).astype(np.int32)
-            off_points[:, 0] = np.clip(off_points[:, 0], 0, label.shape[1] - 1)
-            off_points[:, 1] = np.clip(off_points[:, 1], 0, label.shape[0] - 1)
-
-            label[pixels[1], pixels[0]] = label_kernel[off_points[:, 1],
-                                                       off_points[:, 0]]
+            xs = np.arange(w, dtype=np.float32)[np.newaxis, :]
+            ys = np.arange(h, dtype=np.float32)[:, np.newaxis]
+            off_x = np.clip((xs + 10. / 4. * loc[0]).astype(np.int32), 0,
+                            w - 1)
+            off_y = np.clip((ys + 10. / 4. * loc[1]).astype(np.int32), 0,
+                            h - 1)
+            label = label_kernel[off_y, off_x]
             label[label_kernel > 0] = label_kernel[label_kernel > 0]
 
-            score_pocket = [0.0]
-            for i in range(1, label_num):
-                ind = (label_kernel == i)
-                if ind.sum() == 0:
-                    score_pocket.append(0.0)
-                    continue
-                score_i = np.mean(score[ind])
-                score_pocket.append(score_i)
+            score_pocket = RegionStats(label_kernel, label_num).mean(score)
 
-            label_num = np.max(label) + 1
             label = cv2.resize(
                 label, (img_size[1], img_size[0]),
                 interpolation=cv2.INTER_NEAREST)
+            stats = RegionStats(label)
 
             scale = (float(org_img_size[1]) / float(img_size[1]),
                      float(org_img_size[0]) / float(img_size[0]))
 
-            for i in range(1, label_num):
-                ind = (label == i)
-                points = np.array(np.where(ind)).transpose((1, 0))
-
-                if points.shape[0] < self.min_area:
+            for i in range(1, stats.label_num):
+                if stats.area[i] < self.min_area:
                     continue
 
                 score_i = score_pocket[i]
@@ -129,21 +107,13 @@ class CTPostProcess(object):
                     continue
 
                 if self.box_type == 'rect':
-                    rect = cv2.minAreaRect(points[:, ::-1])
+                    ys, xs = stats.pixels(i)
+                    rect = cv2.minAreaRect(np.stack([xs, ys], axis=1))
                     bbox = cv2.boxPoints(rect) * scale
                     z = bbox.mean(0)
                     bbox = z + (bbox - z) * 0.85
                 elif self.box_type == 'poly':
-                    binary = np.zeros(label.shape, dtype='uint8')
-                    binary[ind] = 1
-                    try:
-                        _, contours, _ = cv2.findContours(
-                            binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    except BaseException:
-                        contours, _ = cv2.findContours(
-                            binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-                    bbox = contours[0] * scale
+                    bbox = stats.contours(i)[0] * scale
 
                 bbox = bbox.astype('int32')
                 bboxes.append(bbox.reshape(-1, 2))
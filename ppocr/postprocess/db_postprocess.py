@@ -25,6 +25,8 @@ import paddle
 from shapely.geometry import Polygon
 import pyclipper
 
+from ppocr.postprocess.region_stats import polygon_means
+
 
 class DBPostProcess(object):
     """
@@ -48,8 +50,9 @@ class DBPostProcess(object):
         self.score_mode = score_mode
         self.box_type = box_type
         assert score_mode in [
-            "slow", "fast"
-        ], "Score mode must be in [slow, fast] but got: {}".format(score_mode)
+            "slow", "fast", "batch"
+        ], "Score mode must be in [slow, fast, batch] but got: {}".format(
+            score_mode)
 
         self.dilation_kernel = None if not use_dilation else np.array(
             [[1, 1], [1, 1]])
@@ -118,6 +121,10 @@ class DBPostProcess(object):
             contours, _ = outs[0], outs[1]
 
         num_contours = min(len(contours), self.max_candidates)
+        if self.score_mode == "slow":
+            slow_scores = polygon_means(pred, [
+                contour.reshape(-1, 2) for contour in contours[:num_contours]
+            ])
 
         boxes = []
         scores = []
@@ -130,7 +137,7 @@ class DBPostProcess(object):
             if self.score_mode == "fast":
                 score = self.box_score_fast(pred, points.reshape(-1, 2))
             else:
-                score = self.box_score_slow(pred, contour)
+                score = slow_scores[index]
             if self.box_thresh > score:
                 continue
 
@@ -148,6 +155,79 @@ class DBPostProcess(object):
             scores.append(score)
         return np.array(boxes, dtype="int32"), scores
 
+    def boxes_from_bitmap_batch(self, pred, _bitmap, dest_width, dest_height):
+        '''
+        boxes_from_bitmap_batch: process all contours at once. The contours
+            and their scores are the ones of 'slow' scoring, the mean of pred
+            inside every contour polygon, and the min area rects are unclipped
+            in closed form: offsetting a w x h rect by
+            d = area * unclip_ratio / perimeter and taking the min area rect
+            again gives a (w + 2d) x (h + 2d) rect with the same center and
+            angle.
+        _bitmap: single map with shape (1, H, W),
+                whose values are binarized as {0, 1}
+        '''
+
+        bitmap = _bitmap
+        height, width = bitmap.shape
+
+        outs = cv2.findContours((bitmap * 255).astype(np.uint8), cv2.RETR_LIST,
+                                cv2.CHAIN_APPROX_SIMPLE)
+        contours = outs[0] if len(outs) == 2 else outs[1]
+        contours = contours[:self.max_candidates]
+        if len(contours) == 0:
+            return np.zeros((0, 4, 2), dtype="int32"), []
+
+        rects = np.array(
+            [[*center, *size, angle]
+             for center, size, angle in map(cv2.minAreaRect, contours)],
+            dtype=np.float64)
+        scores = polygon_means(
+            pred, [contour.reshape(-1, 2) for contour in contours])
+
+        rect_w, rect_h = rects[:, 2], rects[:, 3]
+        keep = (np.minimum(rect_w, rect_h) >= self.min_size) & (
+            scores >= self.box_thresh)
+        distance = rect_w * rect_h * self.unclip_ratio / (2 * (rect_w + rect_h)
+                                                          + 1e-6)
+        rects[:, 2] += 2 * distance
+        rects[:, 3] += 2 * distance
+        keep &= np.minimum(rects[:, 2], rects[:, 3]) >= self.min_size + 2
+        rects, scores = rects[keep], scores[keep]
+
+        boxes = self.get_mini_boxes_batch(rects)
+        boxes[:, :, 0] = np.clip(
+            np.round(boxes[:, :, 0] / width * dest_width), 0, dest_width)
+        boxes[:, :, 1] = np.clip(
+            np.round(boxes[:, :, 1] / height * dest_height), 0, dest_height)
+        return boxes.astype("int32"), scores.tolist()
+
+    def get_mini_boxes_batch(self, rects):
+        '''
+        get_mini_boxes_batch: corner points of [N, 5] rotated rects given as
+            (cx, cy, w, h, angle), ordered like get_mini_boxes
+        '''
+        cx, cy, w, h, angle = [rects[:, i:i + 1] for i in range(5)]
+        theta = angle * np.pi / 180
+        b = np.cos(theta) * 0.5
+        a = np.sin(theta) * 0.5
+        # same corner layout as cv2.boxPoints
+        x0, y0 = cx - a * h - b * w, cy + b * h - a * w
+        x1, y1 = cx + a * h - b * w, cy - b * h - a * w
+        points = np.stack(
+            [
+                np.concatenate([x0, x1, 2 * cx - x0, 2 * cx - x1], axis=1),
+                np.concatenate([y0, y1, 2 * cy - y0, 2 * cy - y1], axis=1)
+            ],
+            axis=2)
+
+        order = np.argsort(points[:, :, 0], axis=1, kind='stable')
+        points = np.take_along_axis(points, order[:, :, None], axis=1)
+        index_1 = np.where(points[:, 1, 1] > points[:, 0, 1], 0, 1)
+        index_2 = np.where(points[:, 3, 1] > points[:, 2, 1], 2, 3)
+        index = np.stack([index_1, index_2, 5 - index_2, 1 - index_1], axis=1)
+        return np.take_along_axis(points, index[:, :, None], axis=1)
+
     def unclip(self, box, unclip_ratio):
         poly = Polygon(box)
         distance = poly.area * unclip_ratio / poly.length
@@ -200,22 +280,7 @@ class DBPostProcess(object):
         '''
         box_score_slow: use polyon mean score as the mean score
         '''
-        h, w = bitmap.shape[:2]
-        contour = contour.copy()
-        contour = np.reshape(contour, (-1, 2))
-
-        xmin = np.clip(np.min(contour[:, 0]), 0, w - 1)
-        xmax = np.clip(np.max(contour[:, 0]), 0, w - 1)
-        ymin = np.clip(np.min(contour[:, 1]), 0, h - 1)
-        ymax = np.clip(np.max(contour[:, 1]), 0, h - 1)
-
-        mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
-
-        contour[:, 0] = contour[:, 0] - xmin
-        contour[:, 1] = contour[:, 1] - ymin
-
-        cv2.fillPoly(mask, contour.reshape(1, -1, 2).astype("int32"), 1)
-        return cv2.mean(bitmap[ymin:ymax + 1, xmin:xmax + 1], mask)[0]
+        return polygon_means(bitmap, [np.reshape(contour, (-1, 2))])[0]
 
     def __call__(self, outs_dict, shape_list):
         pred = outs_dict['maps']
@@ -236,6 +301,9 @@ class DBPostProcess(object):
             if self.box_type == 'poly':
                 boxes, scores = self.polygons_from_bitmap(pred[batch_index],
                                                           mask, src_w, src_h)
+            elif self.box_type == 'quad' and self.score_mode == 'batch':
+                boxes, scores = self.boxes_from_bitmap_batch(
+                    pred[batch_index], mask, src_w, src_h)
             elif self.box_type == 'quad':
                 boxes, scores = self.boxes_from_bitmap(pred[batch_index], mask,
                                                        src_w, src_h)
@@ -18,6 +18,7 @@ from __future__ import print_function
 
 import numpy as np
 from .locality_aware_nms import nms_locality
+from .region_stats import polygon_means
 import cv2
 import paddle
 
@@ -91,11 +92,8 @@ class EASTPostProcess(object):
             return []
         # Here we filter some low score boxes by the average score map, 
         #   this is different from the orginal paper.
-        for i, box in enumerate(boxes):
-            mask = np.zeros_like(score_map, dtype=np.uint8)
-            cv2.fillPoly(mask, box[:8].reshape(
-                (-1, 4, 2)).astype(np.int32) // 4, 1)
-            boxes[i, 8] = cv2.mean(score_map, mask)[0]
+        boxes[:, 8] = polygon_means(
+            score_map, boxes[:, :8].reshape((-1, 4, 2)).astype(np.int32) // 4)
         boxes = boxes[boxes[:, 8] > cover_thresh]
         return boxes
 
@@ -4,8 +4,11 @@ This code is refered from: https://github.com/songdejia/EAST/blob/master/localit
 """
 
 import numpy as np
+import shapely
 from shapely.geometry import Polygon
 
+from ppocr.utils.poly_nms import VECTORIZED, points2polygons, greedy_poly_nms
+
 
 def intersection(g, p):
     """
@@ -52,20 +55,29 @@ def weighted_merge(g, p):
     return g
 
 
-def standard_nms(S, thres):
+def quad_nms_inds(S, thres):
     """
-    Standard nms.
+    Greedy nms of quads by score with the iou of intersection, only quads
+    whose bounding boxes overlap are intersected.
     """
     order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+    polys = points2polygons(S[:, :8])
+    if VECTORIZED:
+        polys = shapely.buffer(polys, 0)
+        areas = shapely.area(polys)
+        valid = shapely.is_valid(polys)
+    else:
+        polys[:] = [poly.buffer(0) for poly in polys]
+        areas = np.array([poly.area for poly in polys], dtype=np.float64)
+        valid = np.array([poly.is_valid for poly in polys], dtype=bool)
+    return greedy_poly_nms(polys, areas, order, thres, valid)
 
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
 
+def standard_nms(S, thres):
+    """
+    Standard nms.
+    """
+    keep = quad_nms_inds(S, thres)
     return S[keep]
 
 
@@ -73,34 +85,14 @@ def standard_nms_inds(S, thres):
     """
     Standard nms, retun inds.
     """
-    order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
-
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
-
-    return keep
+    return quad_nms_inds(S, thres)
 
 
 def nms(S, thres):
     """
     nms.
     """
-    order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
-
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
-
-    return keep
+    return quad_nms_inds(S, thres)
 
 
 def soft_nms(boxes_in, Nt_thres=0.3, threshold=0.8, sigma=0.5, method=2):
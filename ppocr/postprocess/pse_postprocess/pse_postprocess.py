@@ -26,6 +26,7 @@ import paddle
 from paddle.nn import functional as F
 
 from ppocr.postprocess.pse_postprocess.pse import pse
+from ppocr.postprocess.region_stats import RegionStats
 
 
 class PSEPostProcess(object):
@@ -80,35 +81,26 @@ class PSEPostProcess(object):
 
     def generate_box(self, score, label, shape):
         src_h, src_w, ratio_h, ratio_w = shape
-        label_num = np.max(label) + 1
+        stats = RegionStats(label)
+        label_scores = stats.mean(score)
 
         boxes = []
         scores = []
-        for i in range(1, label_num):
-            ind = label == i
-            points = np.array(np.where(ind)).transpose((1, 0))[:, ::-1]
-
-            if points.shape[0] < self.min_area:
-                label[ind] = 0
+        for i in range(1, stats.label_num):
+            if stats.area[i] < self.min_area:
                 continue
 
-            score_i = np.mean(score[ind])
+            score_i = label_scores[i]
             if score_i < self.box_thresh:
-                label[ind] = 0
                 continue
 
             if self.box_type == 'quad':
+                ys, xs = stats.pixels(i)
+                points = np.stack([xs, ys], axis=1)
                 rect = cv2.minAreaRect(points)
                 bbox = cv2.boxPoints(rect)
             elif self.box_type == 'poly':
-                box_height = np.max(points[:, 1]) + 10
-                box_width = np.max(points[:, 0]) + 10
-
-                mask = np.zeros((box_height, box_width), np.uint8)
-                mask[points[:, 1], points[:, 0]] = 255
-
-                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL,
-                                               cv2.CHAIN_APPROX_SIMPLE)
+                contours = stats.contours(i)
                 bbox = np.squeeze(contours[0], 1)
             else:
                 raise NotImplementedError
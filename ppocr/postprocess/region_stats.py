@@ -0,0 +1,142 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Statistics of all the instances of a label map (PSE, CT, SAST) or of all the
+boxes of an image (DB, EAST) computed without a full map mask per instance,
+shared by the detection post processes.
+"""
+
+import cv2
+import numpy as np
+
+__all__ = ['RegionStats', 'filter_small_components', 'polygon_means']
+
+
+def filter_small_components(kernel, min_area, connectivity=4):
+    """
+    Label the connected components of a binary kernel and set the ones
+    smaller than min_area pixels to 0, the other labels are kept.
+    return: (label_num, label)
+    """
+    label_num, label, stats, _ = cv2.connectedComponentsWithStats(
+        kernel, connectivity=connectivity)
+    small = stats[:, cv2.CC_STAT_AREA] < min_area
+    small[0] = False
+    if small.any():
+        label[small[label]] = 0
+    return label_num, label
+
+
+def polygon_means(score_map, polys):
+    """
+    Mean of score_map inside every polygon, same as cv2.mean(score_map, mask)
+    with the polygon drawn into a full map mask by cv2.fillPoly, 0 for a
+    polygon that covers no pixel. Every polygon is drawn into a mask of its
+    bounding box clipped to the map, so the cost grows with the box area
+    instead of the map area per box.
+
+    args:
+        score_map: [H, W] map
+        polys: list of [K, 2] int polygons, K may differ
+    return: [N] float64 means
+    """
+    h, w = score_map.shape[:2]
+    means = np.zeros(len(polys), dtype=np.float64)
+    for i, poly in enumerate(polys):
+        poly = np.asarray(poly, dtype=np.int32).reshape(-1, 2)
+        x0, y0 = np.clip(poly.min(axis=0), 0, [w - 1, h - 1])
+        x1, y1 = np.clip(poly.max(axis=0), 0, [w - 1, h - 1])
+        mask = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=np.uint8)
+        offset = np.array([x0, y0], dtype=np.int32)
+        cv2.fillPoly(mask, [poly - offset], 1)
+        means[i] = cv2.mean(score_map[y0:y1 + 1, x0:x1 + 1], mask)[0]
+    return means
+
+
+class RegionStats(object):
+    """
+    Area, bounding box, mean of a map and pixel list of every label of a
+    label map, with one bincount and one sort of the foreground pixels
+    instead of a full image mask per label.
+
+    args:
+        label: int label map, 0 is the background
+        label_num: labels are in [0, label_num), defaults to label.max() + 1
+    """
+
+    def __init__(self, label, label_num=None):
+        self.shape = label.shape
+        flat = label.ravel()
+        if label_num is None:
+            label_num = int(flat.max()) + 1 if flat.size > 0 else 1
+        self.label_num = label_num
+        self.area = np.bincount(flat, minlength=label_num)[:label_num]
+
+        # foreground pixels grouped by label, a stable sort keeps them in
+        # raster order like np.where(label == i)
+        fg = np.flatnonzero(flat)
+        self.order = fg[np.argsort(flat[fg], kind='stable')]
+        self.labels = flat[self.order]
+        self.starts = np.zeros(label_num + 1, dtype=np.int64)
+        self.starts[2:] = np.cumsum(self.area[1:])
+
+        # [x0, y0, x1, y1] of every label, inclusive, 0 for empty labels
+        self.bbox = np.zeros((label_num, 4), dtype=np.int64)
+        nonempty = np.flatnonzero(self.area)
+        nonempty = nonempty[nonempty > 0]
+        if len(nonempty) > 0:
+            ys, xs = np.divmod(self.order, self.shape[1])
+            beg = self.starts[nonempty]
+            end = self.starts[nonempty + 1] - 1
+            self.bbox[nonempty, 0] = np.minimum.reduceat(xs, beg)
+            self.bbox[nonempty, 1] = ys[beg]
+            self.bbox[nonempty, 2] = np.maximum.reduceat(xs, beg)
+            self.bbox[nonempty, 3] = ys[end]
+
+    def mean(self, values):
+        """
+        return: mean of values over every label, 0 for empty labels, in
+            the dtype of values
+        """
+        sums = np.bincount(
+            self.labels,
+            weights=values.ravel()[self.order],
+            minlength=self.label_num)
+        return (sums / np.maximum(self.area, 1)).astype(values.dtype)
+
+    def pixels(self, i):
+        """
+        return: (ys, xs) of the pixels of label i in raster order, same as
+            np.where(label == i)
+        """
+        return np.divmod(self.order[self.starts[i]:self.starts[i + 1]],
+                         self.shape[1])
+
+    def contours(self, i):
+        """
+        return: external contours of label i as cv2.findContours on the
+            full image mask of the label, computed on its bounding box
+        """
+        ys, xs = self.pixels(i)
+        x0, y0, x1, y1 = self.bbox[i]
+        # one pixel of background around the box, so the mask border
+        # behaves like the rest of the image
+        mask = np.zeros((y1 - y0 + 3, x1 - x0 + 3), dtype=np.uint8)
+        mask[ys - y0 + 1, xs - x0 + 1] = 1
+        contours, _ = cv2.findContours(
+            mask,
+            cv2.RETR_EXTERNAL,
+            cv2.CHAIN_APPROX_SIMPLE,
+            offset=(int(x0) - 1, int(y0) - 1))
+        return contours
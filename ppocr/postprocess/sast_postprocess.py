@@ -25,6 +25,7 @@ sys.path.append(os.path.join(__dir__, '..'))
 
 import numpy as np
 from .locality_aware_nms import nms_locality
+from .region_stats import RegionStats
 import paddle
 import cv2
 import time
@@ -240,9 +241,11 @@ class SASTPostProcess(object):
             tcl_map, tcl_map_thresh, quads, tco_map)
 
         # restore single poly with tcl instance.
+        instance_stats = RegionStats(instance_label_map, instance_count)
         poly_list = []
         for instance_idx in range(1, instance_count):
-            xy_text = np.argwhere(instance_label_map == instance_idx)[:, ::-1]
+            ys, xs = instance_stats.pixels(instance_idx)
+            xy_text = np.stack([xs, ys], axis=1)
             quad = quads[instance_idx - 1]
             q_area = quad_areas[instance_idx - 1]
             if q_area < 5:
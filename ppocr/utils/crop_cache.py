@@ -0,0 +1,117 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import collections
+
+import cv2
+import numpy as np
+
+__all__ = ['CropCache']
+
+
+class CropCache(object):
+    """
+    LRU cache of per crop results (e.g. recognized text) keyed by a
+    fingerprint of the crop: its size in steps of 4 pixels and a difference
+    hash of the downsampled gray crop, which ignores brightness changes.
+
+    args:
+        capacity: max number of cached crops
+        tolerance: max number of differing hash bits of a hit, 0 only hits
+            crops with the same hash. Noisy cameras need a few bits, a too
+            large value returns the result of a different crop.
+        hash_size: (height, width) of the difference hash
+    """
+
+    def __init__(self, capacity, tolerance=0, hash_size=(8, 32)):
+        self.capacity = capacity
+        self.tolerance = tolerance
+        self.hash_size = hash_size
+        # (size, hash) -> result, in lru order
+        self.entries = collections.OrderedDict()
+        # size -> set of the hashes cached for that size
+        self.size_hashes = collections.defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        # shared by the instances of a PredictorPool
+        self.lock = threading.Lock()
+
+    def fingerprint(self, img):
+        h, w = img.shape[:2]
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        hash_h, hash_w = self.hash_size
+        small = cv2.resize(
+            img, (hash_w + 1, hash_h), interpolation=cv2.INTER_AREA)
+        bits = small[:, 1:] > small[:, :-1]
+        return (h >> 2, w >> 2), int.from_bytes(
+            np.packbits(bits).tobytes(), 'big')
+
+    def get(self, key):
+        """
+        return: cached result of the fingerprint key, None on a miss
+        """
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        if key not in self.entries and self.tolerance > 0:
+            size, img_hash = key
+            for cached_hash in self.size_hashes.get(size, ()):
+                if bin(img_hash ^ cached_hash).count('1') <= self.tolerance:
+                    key = (size, cached_hash)
+                    break
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        with self.lock:
+            self._put(key, result)
+
+    def _put(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        self.size_hashes[key[0]].add(key[1])
+        while len(self.entries) > self.capacity:
+            (size, img_hash), _ = self.entries.popitem(last=False)
+            self.size_hashes[size].discard(img_hash)
+            if len(self.size_hashes[size]) == 0:
+                del self.size_hashes[size]
+
+    def __call__(self, img_list, predict):
+        """
+        Results of img_list, predict(imgs) returning the list of results of
+        imgs is only called with the crops missing in the cache.
+        """
+        keys = [self.fingerprint(img) for img in img_list]
+        results = [self.get(key) for key in keys]
+        miss_idxs = [i for i, result in enumerate(results) if result is None]
+        if len(miss_idxs) > 0:
+            miss_results = predict([img_list[i] for i in miss_idxs])
+            for i, result in zip(miss_idxs, miss_results):
+                results[i] = result
+                self.put(keys[i], result)
+        return results
+
+    def log(self):
+        total = max(self.hits + self.misses, 1)
+        return 'hits: {}, misses: {}, hit rate: {:.2%}, size: {}/{}'.format(
+            self.hits, self.misses, self.hits / total,
+            len(self.entries), self.capacity)
@@ -0,0 +1,165 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Convert SimpleDataSet label files and their images into sharded lmdbs that
+LMDBDataSet reads, every shard is written by its own process:
+
+    python ppocr/utils/gen_lmdb.py --data_dir ./train_data/ \
+        --label_file_list ./train_data/rec_gt_train.txt \
+        --output_dir ./train_data/rec_lmdb_train --num_shards 8
+
+The shards are stored as output_dir/shard_000, output_dir/shard_001, ...,
+set output_dir as data_dir of LMDBDataSet to train on all of them.
+"""
+
+import os
+import json
+import argparse
+import multiprocessing
+
+import cv2
+import lmdb
+import numpy as np
+
+
+def read_label_lines(label_file_list, delimiter):
+    lines = []
+    for label_file in label_file_list:
+        with open(label_file, 'r', encoding='utf-8') as f:
+            for line in f.readlines():
+                substr = line.strip("\n").split(delimiter, 1)
+                if len(substr) != 2:
+                    continue
+                file_name, label = substr
+                # same as SimpleDataSet, a json list holds several candidate
+                # images of one sample, the first one is kept
+                try:
+                    file_name = json.loads(file_name)[0]
+                except:
+                    pass
+                lines.append((file_name, label))
+    return lines
+
+
+def write_cache(env, cache):
+    with env.begin(write=True) as txn:
+        for k, v in cache.items():
+            txn.put(k, v)
+
+
+def write_shard(shard_args):
+    """
+    Write one lmdb with the keys LMDBDataSet expects: image-%09d and
+    label-%09d starting at 1, and num-samples.
+    return: (shard dir, number of written samples, number of skipped samples)
+    """
+    shard_dir, data_dir, lines, check_image, map_size, commit_num = shard_args
+    os.makedirs(shard_dir, exist_ok=True)
+    env = lmdb.open(shard_dir, map_size=map_size)
+    cnt = 0
+    skip_cnt = 0
+    cache = {}
+    for file_name, label in lines:
+        img_path = os.path.join(data_dir, file_name)
+        if not os.path.exists(img_path):
+            skip_cnt += 1
+            continue
+        with open(img_path, 'rb') as f:
+            imgbuf = f.read()
+        if check_image and cv2.imdecode(
+                np.frombuffer(imgbuf, dtype='uint8'), 1) is None:
+            skip_cnt += 1
+            continue
+        cnt += 1
+        cache['image-%09d'.encode() % cnt] = imgbuf
+        cache['label-%09d'.encode() % cnt] = label.encode('utf-8')
+        if len(cache) >= commit_num * 2:
+            write_cache(env, cache)
+            cache = {}
+    cache['num-samples'.encode()] = str(cnt).encode()
+    write_cache(env, cache)
+    env.close()
+    return shard_dir, cnt, skip_cnt
+
+
+def gen_lmdb(data_dir,
+             label_file_list,
+             output_dir,
+             num_shards=8,
+             num_workers=None,
+             delimiter='\t',
+             check_image=False,
+             map_size=1 << 40,
+             commit_num=1000):
+    lines = read_label_lines(label_file_list, delimiter)
+    num_shards = max(min(num_shards, len(lines)), 1)
+    shard_size = (len(lines) + num_shards - 1) // num_shards
+    shards = [(os.path.join(output_dir, 'shard_%03d' % i), data_dir,
+               lines[i * shard_size:(i + 1) * shard_size], check_image,
+               map_size, commit_num) for i in range(num_shards)]
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    num_workers = max(min(num_workers, num_shards), 1)
+
+    total_cnt = 0
+    total_skip_cnt = 0
+    with multiprocessing.Pool(num_workers) as pool:
+        for shard_dir, cnt, skip_cnt in pool.imap_unordered(write_shard,
+                                                            shards):
+            print("{}: {} samples, {} skipped".format(shard_dir, cnt,
+                                                      skip_cnt))
+            total_cnt += cnt
+            total_skip_cnt += skip_cnt
+    print("Write {} samples to {} shards in {}, {} skipped".format(
+        total_cnt, num_shards, output_dir, total_skip_cnt))
+    return total_cnt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--data_dir',
+        type=str,
+        default=".",
+        help='The root directory of images, same as data_dir of SimpleDataSet')
+    parser.add_argument(
+        '--label_file_list',
+        type=str,
+        nargs='+',
+        required=True,
+        help='Label files of SimpleDataSet')
+    parser.add_argument(
+        '--output_dir', type=str, required=True, help='Output lmdb directory')
+    parser.add_argument(
+        '--num_shards', type=int, default=8, help='Number of lmdb shards')
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=None,
+        help='Number of writer processes, defaults to the number of cpus')
+    parser.add_argument('--delimiter', type=str, default='\t')
+    parser.add_argument(
+        '--check_image',
+        action='store_true',
+        help='Skip images that can not be decoded')
+    parser.add_argument(
+        '--map_size',
+        type=int,
+        default=1 << 40,
+        help='Max size in bytes of every shard')
+
+    args = parser.parse_args()
+    gen_lmdb(args.data_dir, args.label_file_list, args.output_dir,
+             args.num_shards, args.num_workers, args.delimiter,
+             args.check_image, args.map_size)
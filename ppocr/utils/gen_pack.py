@@ -0,0 +1,123 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Convert SimpleDataSet label files and their images into pack files for
+PackedDataSet, one pack file per label file:
+
+    python ppocr/utils/gen_pack.py --data_dir ./train_data/ \
+        --label_file_list ./train_data/rec_gt_train.txt \
+        --output_dir ./train_data/packs
+
+Then use PackedDataSet with the pack files as label_file_list, e.g.
+label_file_list: [./train_data/packs/rec_gt_train.pack].
+"""
+
+import os
+import sys
+import argparse
+import multiprocessing
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '../..')))
+
+import cv2
+import numpy as np
+
+from ppocr.utils.pack_file import write_pack
+from ppocr.utils.gen_lmdb import read_label_lines
+
+
+def iter_samples(data_dir, lines, check_image, skip_cnt):
+    for file_name, label in lines:
+        img_path = os.path.join(data_dir, file_name)
+        if not os.path.exists(img_path):
+            skip_cnt[0] += 1
+            continue
+        with open(img_path, 'rb') as f:
+            imgbuf = f.read()
+        if check_image and cv2.imdecode(
+                np.frombuffer(imgbuf, dtype='uint8'), 1) is None:
+            skip_cnt[0] += 1
+            continue
+        yield file_name, label, imgbuf
+
+
+def convert_label_file(convert_args):
+    """
+    return: (pack path, number of written samples, number of skipped samples)
+    """
+    label_file, data_dir, output_dir, delimiter, check_image = convert_args
+    lines = read_label_lines([label_file], delimiter)
+    pack_path = os.path.join(
+        output_dir, os.path.splitext(os.path.basename(label_file))[0] + '.pack')
+    skip_cnt = [0]
+    cnt = write_pack(pack_path,
+                     iter_samples(data_dir, lines, check_image, skip_cnt))
+    return pack_path, cnt, skip_cnt[0]
+
+
+def gen_pack(data_dir,
+             label_file_list,
+             output_dir,
+             num_workers=None,
+             delimiter='\t',
+             check_image=False):
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(label_file, data_dir, output_dir, delimiter, check_image)
+             for label_file in label_file_list]
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    num_workers = max(min(num_workers, len(tasks)), 1)
+
+    pack_list = []
+    with multiprocessing.Pool(num_workers) as pool:
+        for pack_path, cnt, skip_cnt in pool.imap(convert_label_file, tasks):
+            print("{}: {} samples, {} skipped".format(pack_path, cnt,
+                                                      skip_cnt))
+            pack_list.append(pack_path)
+    return pack_list
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--data_dir',
+        type=str,
+        default=".",
+        help='The root directory of images, same as data_dir of SimpleDataSet')
+    parser.add_argument(
+        '--label_file_list',
+        type=str,
+        nargs='+',
+        required=True,
+        help='Label files of SimpleDataSet')
+    parser.add_argument(
+        '--output_dir',
+        type=str,
+        required=True,
+        help='Output directory of the pack files')
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=None,
+        help='Number of label files converted at the same time')
+    parser.add_argument('--delimiter', type=str, default='\t')
+    parser.add_argument(
+        '--check_image',
+        action='store_true',
+        help='Skip images that can not be decoded')
+
+    args = parser.parse_args()
+    gen_pack(args.data_dir, args.label_file_list, args.output_dir,
+             args.num_workers, args.delimiter, args.check_image)
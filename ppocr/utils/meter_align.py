@@ -0,0 +1,582 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Feature based registration of meter images against fixed templates.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+import cv2
+import numpy as np
+
+__all__ = ['MeterAligner', 'MeterTemplateRegistry', 'MeterTracker']
+
+MAX_FEATURES = 500
+GOOD_MATCH_PERCENT = 0.15
+MIN_MATCH_COUNT = 4
+FLANN_INDEX_LSH = 6
+
+
+def _to_gray(img):
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def _keypoints_to_array(keypoints):
+    """Pack cv2.KeyPoint objects into a float32 array so they can be saved.
+    """
+    return np.array(
+        [[
+            kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave,
+            kp.class_id
+        ] for kp in keypoints],
+        dtype=np.float32).reshape([-1, 7])
+
+
+def _array_to_keypoints(kp_array):
+    return [
+        cv2.KeyPoint(
+            float(x),
+            float(y),
+            float(size),
+            float(angle),
+            float(response), int(octave), int(class_id))
+        for x, y, size, angle, response, octave, class_id in kp_array
+    ]
+
+
+class MeterAligner(object):
+    """Align meter frames to one template image.
+
+    ORB keypoints and descriptors of the template are computed once, kept in
+    memory and optionally stored in `cache_path`, so every call to `align`
+    only has to extract features from the incoming frames.
+
+    args:
+        template(str|ndarray): path of the template image or the image itself
+        max_features(int): number of ORB features to extract per image
+        good_match_percent(float): ratio of the best matches used for RANSAC
+        cache_path(str): optional .npz file holding the template features
+        debug_dir(str): if set, the drawn matches of every frame are saved
+            into this directory
+    """
+
+    def __init__(self,
+                 template,
+                 max_features=MAX_FEATURES,
+                 good_match_percent=GOOD_MATCH_PERCENT,
+                 cache_path=None,
+                 debug_dir=None):
+        if isinstance(template, str):
+            template_path = template
+            template = cv2.imread(template_path, cv2.IMREAD_COLOR)
+            if template is None:
+                raise ValueError("error in loading template:{}".format(
+                    template_path))
+        self.template = template
+        self.max_features = max_features
+        self.good_match_percent = good_match_percent
+        self.debug_dir = debug_dir
+        self._debug_index = 0
+
+        self.orb = cv2.ORB_create(max_features)
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        self.keypoints, self.descriptors = self._load_template_features(
+            cache_path)
+        self.template_points = np.array(
+            [kp.pt for kp in self.keypoints], dtype=np.float32).reshape(
+                [-1, 2])
+
+    @property
+    def template_size(self):
+        """(width, height) of the template, as expected by cv2 warps."""
+        return self.template.shape[1], self.template.shape[0]
+
+    def _cache_key(self):
+        md5 = hashlib.md5(np.ascontiguousarray(self.template).tobytes())
+        md5.update(str((self.template.shape, self.max_features)).encode())
+        return md5.hexdigest()
+
+    def _load_template_features(self, cache_path):
+        cache_key = self._cache_key()
+        if cache_path is not None and os.path.exists(cache_path):
+            cache = np.load(cache_path)
+            if str(cache['key']) == cache_key:
+                return _array_to_keypoints(cache['keypoints']), cache[
+                    'descriptors']
+
+        keypoints, descriptors = self.detect(self.template)
+        if descriptors is None:
+            raise ValueError("no ORB features found in the template")
+        if cache_path is not None:
+            cache_dir = os.path.dirname(cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                np.savez(
+                    f,
+                    key=cache_key,
+                    keypoints=_keypoints_to_array(keypoints),
+                    descriptors=descriptors)
+        return keypoints, descriptors
+
+    def detect(self, img):
+        """Extract ORB keypoints and descriptors of an image."""
+        return self.orb.detectAndCompute(_to_gray(img), None)
+
+    def match(self, descriptors):
+        """Match frame descriptors against the template.
+
+        return:
+            query_idx(ndarray), train_idx(ndarray) of the best matches, with
+            the best `good_match_percent` of them kept in distance order
+        """
+        matches = self.matcher.match(descriptors, self.descriptors)
+        if len(matches) == 0:
+            return np.zeros([0], np.int64), np.zeros([0], np.int64)
+        match_info = np.array(
+            [(m.queryIdx, m.trainIdx, m.distance) for m in matches],
+            dtype=np.float64)
+        order = np.argsort(match_info[:, 2], kind='stable')
+        num_good_matches = int(len(matches) * self.good_match_percent)
+        order = order[:num_good_matches]
+        query_idx = match_info[order, 0].astype(np.int64)
+        train_idx = match_info[order, 1].astype(np.int64)
+        return query_idx, train_idx
+
+    def estimate(self, frame, keypoints=None, descriptors=None):
+        """Estimate the homography mapping `frame` onto the template.
+
+        Precomputed `keypoints` and `descriptors` of the frame can be passed
+        in to avoid extracting them again.
+
+        return:
+            h(ndarray|None): 3x3 homography, None if it cannot be estimated
+            num_inliers(int): number of RANSAC inliers supporting `h`
+        """
+        if keypoints is None or descriptors is None:
+            keypoints, descriptors = self.detect(frame)
+        if descriptors is None or len(keypoints) < MIN_MATCH_COUNT:
+            return None, 0
+
+        query_idx, train_idx = self.match(descriptors)
+        if len(query_idx) < MIN_MATCH_COUNT:
+            return None, 0
+        frame_points = np.array(
+            [kp.pt for kp in keypoints], dtype=np.float32)[query_idx]
+        template_points = self.template_points[train_idx]
+
+        h, mask = cv2.findHomography(frame_points, template_points,
+                                     cv2.RANSAC)
+        if h is None:
+            return None, 0
+        if self.debug_dir is not None:
+            self._save_debug(frame, keypoints, query_idx, train_idx)
+        return h, int(mask.sum())
+
+    def warp(self, frame, h):
+        """Warp `frame` into the template coordinate system."""
+        return cv2.warpPerspective(frame, h, self.template_size)
+
+    def align_one(self, frame):
+        h, _ = self.estimate(frame)
+        if h is None:
+            return None, None
+        return self.warp(frame, h), h
+
+    def align(self, frames):
+        """Align a batch of frames to the template.
+
+        args:
+            frames(list[ndarray]): BGR frames to register
+        return:
+            warped images and homographies, two lists of len(frames). Both
+            entries are None for frames that could not be aligned.
+        """
+        warped_list, h_list = [], []
+        for frame in frames:
+            warped, h = self.align_one(frame)
+            warped_list.append(warped)
+            h_list.append(h)
+        return warped_list, h_list
+
+    def _save_debug(self, frame, keypoints, query_idx, train_idx):
+        os.makedirs(self.debug_dir, exist_ok=True)
+        matches = [
+            cv2.DMatch(int(q), int(t), 0)
+            for q, t in zip(query_idx, train_idx)
+        ]
+        im_matches = cv2.drawMatches(frame, keypoints, self.template,
+                                     self.keypoints, matches, None)
+        cv2.imwrite(
+            os.path.join(self.debug_dir,
+                         "matches_{}.jpg".format(self._debug_index)),
+            im_matches)
+        self._debug_index += 1
+
+
+class MeterTemplateRegistry(object):
+    """Identify which meter template a frame shows and align it.
+
+    The ORB descriptors of all registered templates are packed into a single
+    FLANN LSH index, labelled with the template they belong to. A frame is
+    identified by one approximate nearest neighbour query of its descriptors
+    followed by a vote over the template labels, so the cost of
+    identification grows sub-linearly with the number of templates. Only the
+    winning template runs homography estimation.
+
+    The index is built eagerly by `build` or on the first query. The ORB
+    detector, the index and the matchers of the templates are shared by all
+    callers, so queries hold a lock and one registry can serve concurrent
+    threads.
+
+    args:
+        max_features(int): number of ORB features to extract per image
+        good_match_percent(float): ratio of the best matches used for RANSAC
+        ratio(float): optional Lowe ratio test threshold, if set only
+            distinctive 2-NN matches vote. Meter faces are low-textured, so
+            plain nearest neighbour voting is used by default
+        min_votes(int): minimum number of matches voting for a template,
+            frames below it are reported as unknown
+        cache_dir(str): optional directory for the template feature caches
+    """
+
+    def __init__(self,
+                 max_features=MAX_FEATURES,
+                 good_match_percent=GOOD_MATCH_PERCENT,
+                 ratio=None,
+                 min_votes=10,
+                 cache_dir=None):
+        self.max_features = max_features
+        self.good_match_percent = good_match_percent
+        self.ratio = ratio
+        self.min_votes = min_votes
+        self.cache_dir = cache_dir
+
+        self.orb = cv2.ORB_create(max_features)
+        self.names = []
+        self.aligners = {}
+        self.rois = {}
+        self.flann = None
+        self.labels = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_config(cls, config_path, **kwargs):
+        """Build a registry from a json file of the form
+
+            [{"name": "hanpu3",
+              "template": "hanpu3_template.bmp",
+              "rois": [[[x1, y1], [x2, y2], [x3, y3], [x4, y4]], ...]}, ...]
+
+        Template paths are relative to the config file, rois are quads in
+        template coordinates listed in reading order.
+        """
+        with open(config_path, 'rb') as f:
+            config = json.loads(f.read().decode('utf-8'))
+        config_dir = os.path.dirname(os.path.abspath(config_path))
+        registry = cls(**kwargs)
+        for item in config:
+            registry.add(
+                item['name'],
+                os.path.join(config_dir, item['template']),
+                rois=item.get('rois'))
+        return registry
+
+    def add(self, name, template, rois=None, debug_dir=None):
+        """Register a template under `name` and return its MeterAligner.
+
+        `rois` are the optional text regions of the template, a list of quads
+        in template coordinates.
+        """
+        if name in self.aligners:
+            raise ValueError("template {} already registered".format(name))
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = os.path.join(self.cache_dir, "{}.npz".format(name))
+        aligner = MeterAligner(
+            template,
+            max_features=self.max_features,
+            good_match_percent=self.good_match_percent,
+            cache_path=cache_path,
+            debug_dir=debug_dir)
+        if rois is not None:
+            rois = np.array(rois, dtype=np.float32).reshape([-1, 4, 2])
+        else:
+            rois = np.zeros([0, 4, 2], dtype=np.float32)
+        with self.lock:
+            self.names.append(name)
+            self.aligners[name] = aligner
+            self.rois[name] = rois
+            # the index is rebuilt lazily on the next query
+            self.flann = None
+        return aligner
+
+    def build(self):
+        """Pack the descriptors of every template into one LSH index."""
+        with self.lock:
+            if len(self.names) == 0:
+                raise ValueError("no template registered")
+            descriptors = [
+                self.aligners[name].descriptors for name in self.names
+            ]
+            labels = np.concatenate([
+                np.full([len(desc)], idx, dtype=np.int64)
+                for idx, desc in enumerate(descriptors)
+            ])
+            index_params = dict(
+                algorithm=FLANN_INDEX_LSH,
+                table_number=6,
+                key_size=12,
+                multi_probe_level=1)
+            flann = cv2.FlannBasedMatcher(index_params, dict(checks=50))
+            flann.add([np.concatenate(descriptors, axis=0)])
+            flann.train()
+            self.labels = labels
+            self.flann = flann
+
+    def detect(self, img):
+        gray = _to_gray(img)
+        with self.lock:
+            return self.orb.detectAndCompute(gray, None)
+
+    def identify(self, frame, keypoints=None, descriptors=None):
+        """Find the template that best matches `frame`.
+
+        return:
+            name(str|None): name of the template, None if no template
+                collects `min_votes` matches
+            votes(int): number of matches voting for that template
+        """
+        if keypoints is None or descriptors is None:
+            keypoints, descriptors = self.detect(frame)
+        if descriptors is None or len(descriptors) == 0:
+            return None, 0
+
+        with self.lock:
+            if self.flann is None:
+                self.build()
+            knn_matches = self.flann.knnMatch(
+                descriptors, k=1 if self.ratio is None else 2)
+            labels, names = self.labels, list(self.names)
+        if self.ratio is None:
+            train_idx = [m[0].trainIdx for m in knn_matches if len(m) > 0]
+        else:
+            train_idx = [
+                m[0].trainIdx for m in knn_matches
+                if len(m) == 2 and m[0].distance < self.ratio * m[1].distance
+            ]
+        if len(train_idx) == 0:
+            return None, 0
+        votes = np.bincount(labels[np.array(train_idx)], minlength=len(names))
+        best = int(np.argmax(votes))
+        if votes[best] < self.min_votes:
+            return None, int(votes[best])
+        return names[best], int(votes[best])
+
+    def estimate(self, frame):
+        """Identify the template of `frame` and estimate its homography.
+
+        return:
+            name(str|None), h(ndarray|None), num_inliers(int)
+        """
+        keypoints, descriptors = self.detect(frame)
+        name, _ = self.identify(frame, keypoints, descriptors)
+        if name is None:
+            return None, None, 0
+        # the BFMatcher of the aligner is shared as well
+        with self.lock:
+            h, num_inliers = self.aligners[name].estimate(
+                frame, keypoints, descriptors)
+        return name, h, num_inliers
+
+    def project_rois(self, name, h):
+        """Map the rois of template `name` into the frame that `h` aligns."""
+        rois = self.rois[name]
+        if len(rois) == 0:
+            return rois
+        frame_rois = cv2.perspectiveTransform(
+            rois.reshape([-1, 1, 2]), np.linalg.inv(h))
+        return frame_rois.reshape([-1, 4, 2])
+
+    def align_one(self, frame):
+        name, h, _ = self.estimate(frame)
+        if h is None:
+            return name, None, None
+        return name, self.aligners[name].warp(frame, h), h
+
+    def align(self, frames):
+        """Identify and align a batch of frames.
+
+        return:
+            template names, warped images and homographies, three lists of
+            len(frames) with None entries for frames that failed
+        """
+        name_list, warped_list, h_list = [], [], []
+        for frame in frames:
+            name, warped, h = self.align_one(frame)
+            name_list.append(name)
+            warped_list.append(warped)
+            h_list.append(h)
+        return name_list, warped_list, h_list
+
+
+class MeterTracker(object):
+    """Streaming alignment for frames of a fixed camera.
+
+    The homography of the previous frame is reused as long as the warped
+    frame still agrees with the template. Agreement is checked on a
+    downsampled grayscale ROI with normalized cross correlation, which is
+    insensitive to lighting changes. When the check fails the homography is
+    first refined with ECC on the same downsampled images, and the full
+    ORB + RANSAC estimation only runs if that does not recover either.
+
+    args:
+        aligner(MeterAligner): aligner of the template the camera faces
+        roi(tuple): (x, y, w, h) region of the template used for the drift
+            check, the whole template by default
+        scale(float): downsampling factor of the drift check images
+        min_corr(float): minimum correlation to keep the homography
+        use_ecc(bool): whether to try ECC refinement before re-estimation
+        ecc_motion(int): cv2 motion model of the ECC refinement. Bolted
+            cameras mostly drift by small shifts, which the translation model
+            recovers faster and more reliably than a full homography
+        ecc_iters(int): max iterations of the ECC refinement
+    """
+
+    def __init__(self,
+                 aligner,
+                 roi=None,
+                 scale=0.25,
+                 min_corr=0.9,
+                 use_ecc=True,
+                 ecc_motion=cv2.MOTION_TRANSLATION,
+                 ecc_iters=50):
+        self.aligner = aligner
+        self.min_corr = min_corr
+        self.use_ecc = use_ecc
+        self.ecc_motion = ecc_motion
+        self.ecc_criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT,
+                             ecc_iters, 1e-5)
+
+        tpl_w, tpl_h = aligner.template_size
+        if roi is None:
+            roi = (0, 0, tpl_w, tpl_h)
+        x, y, w, h = roi
+        # maps template coordinates to the downsampled roi image
+        self.scale_mat = np.array(
+            [[scale, 0, -x * scale], [0, scale, -y * scale], [0, 0, 1]],
+            dtype=np.float64)
+        self.small_size = (max(int(round(w * scale)), 1),
+                           max(int(round(h * scale)), 1))
+        small_template = cv2.warpPerspective(aligner.template,
+                                             self.scale_mat, self.small_size)
+        self.small_template = self._smooth(small_template)
+
+        self.h = None
+        self.stats = {
+            'reused': 0,
+            'refined': 0,
+            'reestimated': 0,
+            'failed': 0
+        }
+
+    def reset(self):
+        """Forget the current homography, e.g. after the camera moved."""
+        self.h = None
+
+    def _smooth(self, small):
+        # blurring makes both checks tolerant to sub-pixel interpolation
+        # differences of the fine meter digits
+        small = _to_gray(small).astype(np.float32)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _warp_small(self, frame, h):
+        small = cv2.warpPerspective(frame,
+                                    self.scale_mat.dot(h), self.small_size)
+        return self._smooth(small)
+
+    def _correlation(self, small):
+        a = self.small_template - self.small_template.mean()
+        b = small - small.mean()
+        denom = np.sqrt((a * a).sum() * (b * b).sum())
+        if denom == 0:
+            return 0.0
+        return float((a * b).sum() / denom)
+
+    def _refine(self, frame, small, h):
+        if self.ecc_motion == cv2.MOTION_HOMOGRAPHY:
+            warp = np.eye(3, dtype=np.float32)
+        else:
+            warp = np.eye(2, 3, dtype=np.float32)
+        try:
+            _, warp = cv2.findTransformECC(self.small_template, small, warp,
+                                           self.ecc_motion, self.ecc_criteria,
+                                           None, 1)
+        except cv2.error:
+            return None
+        if warp.shape[0] == 2:
+            warp = np.vstack([warp, [0, 0, 1]])
+        # small(W x) ~ template(x), so the refined frame -> template mapping
+        # is S^-1 W^-1 S H
+        delta = np.linalg.inv(self.scale_mat).dot(
+            np.linalg.inv(warp.astype(np.float64))).dot(self.scale_mat)
+        h = delta.dot(h)
+        h = h / h[2, 2]
+        if self._correlation(self._warp_small(frame, h)) < self.min_corr:
+            return None
+        return h
+
+    def update(self, frame):
+        """Return the homography of `frame`, None if it cannot be aligned."""
+        if self.h is not None:
+            small = self._warp_small(frame, self.h)
+            if self._correlation(small) >= self.min_corr:
+                self.stats['reused'] += 1
+                return self.h
+            if self.use_ecc:
+                h = self._refine(frame, small, self.h)
+                if h is not None:
+                    self.stats['refined'] += 1
+                    self.h = h
+                    return h
+
+        h, _ = self.aligner.estimate(frame)
+        if h is None:
+            self.stats['failed'] += 1
+            self.h = None
+            return None
+        self.stats['reestimated'] += 1
+        self.h = h
+        return h
+
+    def track(self, frame):
+        h = self.update(frame)
+        if h is None:
+            return None, None
+        return self.aligner.warp(frame, h), h
+
+    def stream(self, frames):
+        """Align an iterable of frames lazily, yielding (warped, h)."""
+        for frame in frames:
+            yield self.track(frame)
@@ -0,0 +1,142 @@
+# copyright (c) 2023 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Pack file: the encoded images of a label file one after another, followed
+by the index, read through a memory map. Layout:
+
+    magic                          8 bytes, b'PPOCRPK1'
+    images                         encoded image bytes, back to back
+    names                          utf-8 image file names, back to back
+    labels                         utf-8 labels, back to back
+    image offsets                  int64 (N + 1, ), sample i is
+                                   [offsets[i], offsets[i + 1])
+    name offsets, label offsets    int64 (N + 1, ) each, like image offsets
+    footer                         int64 N and the positions of the names,
+                                   labels and the three offset arrays, then
+                                   the magic again
+"""
+import mmap
+import struct
+
+import numpy as np
+
+PACK_MAGIC = b'PPOCRPK1'
+PACK_FOOTER = struct.Struct('<6q8s')
+
+
+class PackFile(object):
+    """
+    Read only view of a pack file. The file is memory mapped, again after
+    unpickling in a spawned worker, and samples are returned as memoryview
+    slices of the map, no copy is made.
+    """
+
+    def __init__(self, pack_path):
+        self.pack_path = pack_path
+        self.buf = None
+        self.load()
+
+    def load(self):
+        with open(self.pack_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(mm)
+        if len(buf) < len(PACK_MAGIC) + PACK_FOOTER.size or \
+                bytes(buf[:len(PACK_MAGIC)]) != PACK_MAGIC:
+            raise ValueError("{} is not a pack file".format(self.pack_path))
+        (num_samples, names_pos, labels_pos, image_offsets_pos,
+         name_offsets_pos, label_offsets_pos, magic) = PACK_FOOTER.unpack(
+             buf[-PACK_FOOTER.size:])
+        if magic != PACK_MAGIC:
+            raise ValueError("{} is truncated".format(self.pack_path))
+        self.buf = buf
+        self.num_samples = num_samples
+        self.image_offsets = np.frombuffer(
+            buf, np.int64, num_samples + 1, image_offsets_pos)
+        self.name_offsets = np.frombuffer(
+            buf, np.int64, num_samples + 1, name_offsets_pos) + names_pos
+        self.label_offsets = np.frombuffer(
+            buf, np.int64, num_samples + 1, label_offsets_pos) + labels_pos
+
+    def __len__(self):
+        return self.num_samples
+
+    def get_image(self, index):
+        if self.buf is None:
+            self.load()
+        return self.buf[self.image_offsets[index]:self.image_offsets[index +
+                                                                      1]]
+
+    def get_name(self, index):
+        if self.buf is None:
+            self.load()
+        return bytes(self.buf[self.name_offsets[index]:self.name_offsets[
+            index + 1]]).decode('utf-8')
+
+    def get_label(self, index):
+        if self.buf is None:
+            self.load()
+        return bytes(self.buf[self.label_offsets[index]:self.label_offsets[
+            index + 1]]).decode('utf-8')
+
+    def __getstate__(self):
+        # the map is opened again in the process the pack file is sent to
+        state = self.__dict__.copy()
+        state['buf'] = None
+        for key in ['image_offsets', 'name_offsets', 'label_offsets']:
+            state.pop(key, None)
+        return state
+
+
+def write_pack(pack_path, samples):
+    """
+    Write a pack file.
+    args:
+        pack_path(str): output file
+        samples(iterable): (image file name, label, encoded image bytes)
+    return:
+        number of samples written
+    """
+    names = []
+    labels = []
+    image_offsets = [len(PACK_MAGIC)]
+    with open(pack_path, 'wb') as f:
+        f.write(PACK_MAGIC)
+        for name, label, imgbuf in samples:
+            f.write(imgbuf)
+            image_offsets.append(image_offsets[-1] + len(imgbuf))
+            names.append(name.encode('utf-8'))
+            labels.append(label.encode('utf-8'))
+
+        def write_strings(strings):
+            pos = f.tell()
+            f.write(b''.join(strings))
+            offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+            np.cumsum([len(s) for s in strings], out=offsets[1:])
+            return pos, offsets
+
+        names_pos, name_offsets = write_strings(names)
+        labels_pos, label_offsets = write_strings(labels)
+        # keep the offset arrays 8 bytes aligned for np.frombuffer
+        f.write(b'\0' * (-f.tell() % 8))
+        array_pos = []
+        for offsets in [
+                np.array(
+                    image_offsets, dtype=np.int64), name_offsets, label_offsets
+        ]:
+            array_pos.append(f.tell())
+            f.write(offsets.astype('<i8').tobytes())
+        f.write(
+            PACK_FOOTER.pack(
+                len(names), names_pos, labels_pos, *array_pos, PACK_MAGIC))
+    return len(names)
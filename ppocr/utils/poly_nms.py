@@ -13,8 +13,12 @@
 # limitations under the License.
 
 import numpy as np
+import shapely
 from shapely.geometry import Polygon
 
+# shapely 2.x runs geometry operations on arrays of geometries
+VECTORIZED = hasattr(shapely, 'intersection') and hasattr(shapely, 'area')
+
 
 def points2polygon(points):
     """Convert k points to 1 polygon.
@@ -124,23 +128,122 @@ def poly_iou(poly_det, poly_gt):
     return area_inters / area_union
 
 
+def points2polygons(points_list):
+    """Convert a list of k points arrays to an object array of polygons.
+
+    Args:
+        points_list (list[ndarray]): Arrays of shape (2k) or (k, 2).
+
+    Returns:
+        polygons (ndarray): An object array of Polygon.
+    """
+    polygons = np.empty(len(points_list), dtype=object)
+    if VECTORIZED and len(points_list) > 0 and len(
+            set(np.size(points) for points in points_list)) == 1:
+        point_mats = np.array(points_list, dtype=np.float64)
+        polygons[:] = shapely.polygons(
+            point_mats.reshape([len(points_list), -1, 2]))
+        return polygons
+    for i, points in enumerate(points_list):
+        polygons[i] = Polygon(np.array(points).reshape([-1, 2]))
+    return polygons
+
+
+def polygon_bounds(polygons):
+    """Bounding boxes (minx, miny, maxx, maxy) of polygons, nan for empty
+    ones."""
+    if VECTORIZED:
+        return shapely.bounds(polygons)
+    return np.array([(np.nan, ) * 4 if poly.is_empty else poly.bounds
+                     for poly in polygons]).reshape([-1, 4])
+
+
+def batch_poly_iou(polygons, areas, i, idxs):
+    """Calculate the IOU between polygon i and the polygons idxs, the union
+    is areas[i] + areas[idxs] minus the area of the intersection of the
+    polygons. Same values as poly_iou with areas of the unbuffered polygons
+    and buffered polygons.
+
+    Returns:
+        iou (ndarray): The IOU of every polygon of idxs, 0 for a zero union.
+    """
+    if VECTORIZED:
+        area_inters = shapely.area(shapely.intersection(polygons[i], polygons[
+            idxs]))
+    else:
+        area_inters = np.array(
+            [(polygons[i] & polygons[j]).area for j in idxs], dtype=np.float64)
+    area_union = areas[i] + areas[idxs] - area_inters
+    iou = np.zeros(len(idxs), dtype=np.float64)
+    nonzero = area_union != 0
+    iou[nonzero] = area_inters[nonzero] / area_union[nonzero]
+    return iou
+
+
+def greedy_poly_nms(polygons, areas, order, threshold, valid=None):
+    """Greedy polygon NMS. Candidates are visited in order, a candidate is
+    kept unless its IOU (see batch_poly_iou) with a kept one is larger than
+    threshold. For threshold >= 0 only the pairs whose bounding boxes
+    overlap are intersected, the others have no intersection.
+
+    Args:
+        polygons (ndarray): An object array of the polygons intersected.
+        areas (ndarray): The areas of the candidates.
+        order (ndarray): The indices of the candidates, most confident first.
+        threshold (float): The IOU threshold.
+        valid (ndarray): A bool array, the IOU of an invalid candidate is 0.
+
+    Returns:
+        keep (list[int]): The indices of the kept candidates in order.
+    """
+    order = np.asarray(order, dtype=np.int64)
+    bounds = polygon_bounds(polygons)
+    prune = threshold >= 0
+    suppressed = np.zeros(len(polygons), dtype=bool)
+    keep = []
+    for pos, i in enumerate(order):
+        if suppressed[i]:
+            continue
+        keep.append(int(i))
+        rest = order[pos + 1:]
+        rest = rest[~suppressed[rest]]
+        if valid is not None and not valid[i]:
+            if threshold < 0:
+                suppressed[rest] = True
+            continue
+        if prune:
+            # nan bounds of empty polygons compare false
+            rest = rest[(bounds[rest, 0] <= bounds[i, 2]) &
+                        (bounds[rest, 2] >= bounds[i, 0]) &
+                        (bounds[rest, 1] <= bounds[i, 3]) &
+                        (bounds[rest, 3] >= bounds[i, 1])]
+        iou = np.zeros(len(rest), dtype=np.float64)
+        if valid is None:
+            iou[:] = batch_poly_iou(polygons, areas, i, rest)
+        else:
+            rest_valid = valid[rest]
+            iou[rest_valid] = batch_poly_iou(polygons, areas, i,
+                                             rest[rest_valid])
+        suppressed[rest[iou > threshold]] = True
+    return keep
+
+
 def poly_nms(polygons, threshold):
     assert isinstance(polygons, list)
 
     polygons = np.array(sorted(polygons, key=lambda x: x[-1]))
-
-    keep_poly = []
-    index = [i for i in range(polygons.shape[0])]
-
-    while len(index) > 0:
-        keep_poly.append(polygons[index[-1]].tolist())
-        A = polygons[index[-1]][:-1]
-        index = np.delete(index, -1)
-        iou_list = np.zeros((len(index), ))
-        for i in range(len(index)):
-            B = polygons[index[i]][:-1]
-            iou_list[i] = boundary_iou(A, B)
-        remove_index = np.where(iou_list > threshold)
-        index = np.delete(index, remove_index)
-
-    return keep_poly
+    if len(polygons) == 0:
+        return []
+
+    # same iou as boundary_iou, which intersects buffered polygons
+    polys = points2polygons([polygon[:-1] for polygon in polygons])
+    if VECTORIZED:
+        areas = shapely.area(polys)
+        buffered = shapely.buffer(polys, 0.0001)
+    else:
+        areas = np.array([poly.area for poly in polys], dtype=np.float64)
+        buffered = np.empty(len(polys), dtype=object)
+        buffered[:] = [poly.buffer(0.0001) for poly in polys]
+    order = np.arange(len(polygons))[::-1]
+    keep = greedy_poly_nms(buffered, areas, order, threshold)
+    return [polygons[i].tolist() for i in keep]
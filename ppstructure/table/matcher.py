@@ -54,6 +54,46 @@ def compute_iou(rec1, rec2):
         return (intersect / (sum_area - intersect)) * 1.0
 
 
+def distance_matrix(boxes_1, boxes_2):
+    """
+    distance of every pair of xyxy boxes_1 [N, 4] and boxes_2 [M, 4]
+    :return: [N, M] distances
+    """
+    delta = np.abs(boxes_2[None] - boxes_1[:, None])
+    # summed in the order of distance
+    dis_2 = delta[..., 0] + delta[..., 1]
+    dis = dis_2 + delta[..., 2] + delta[..., 3]
+    dis_3 = delta[..., 2] + delta[..., 3]
+    return dis + np.minimum(dis_2, dis_3)
+
+
+def iou_matrix(recs_1, recs_2):
+    """
+    compute_iou of every pair of recs_1 [N, 4] and recs_2 [M, 4]
+    :return: [N, M] float64 IoU
+    """
+    recs_1 = recs_1[:, None]
+    recs_2 = recs_2[None]
+    S_rec1 = (recs_1[..., 2] - recs_1[..., 0]) * (
+        recs_1[..., 3] - recs_1[..., 1])
+    S_rec2 = (recs_2[..., 2] - recs_2[..., 0]) * (
+        recs_2[..., 3] - recs_2[..., 1])
+    sum_area = S_rec1 + S_rec2
+
+    left_line = np.maximum(recs_1[..., 1], recs_2[..., 1])
+    right_line = np.minimum(recs_1[..., 3], recs_2[..., 3])
+    top_line = np.maximum(recs_1[..., 0], recs_2[..., 0])
+    bottom_line = np.minimum(recs_1[..., 2], recs_2[..., 2])
+
+    intersect = (right_line - left_line) * (bottom_line - top_line)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iou = intersect / (sum_area - intersect)
+    # compute_iou divides in the dtype of the boxes and returns a float
+    iou = np.where((left_line < right_line) & (top_line < bottom_line), iou,
+                   0.)
+    return iou.astype(np.float64)
+
+
 class TableMatch:
     def __init__(self, filter_ocr_result=False, use_master=False):
         self.filter_ocr_result = filter_ocr_result
@@ -75,25 +115,30 @@ class TableMatch:
 
     def match_result(self, dt_boxes, pred_bboxes):
         matched = {}
-        for i, gt_box in enumerate(dt_boxes):
-            distances = []
-            for j, pred_box in enumerate(pred_bboxes):
-                if len(pred_box) == 8:
-                    pred_box = [
-                        np.min(pred_box[0::2]), np.min(pred_box[1::2]),
-                        np.max(pred_box[0::2]), np.max(pred_box[1::2])
-                    ]
-                distances.append((distance(gt_box, pred_box),
-                                  1. - compute_iou(gt_box, pred_box)
-                                  ))  # compute iou and l1 distance
-            sorted_distances = distances.copy()
-            # select det box by iou and l1 distance
-            sorted_distances = sorted(
-                sorted_distances, key=lambda item: (item[1], item[0]))
-            if distances.index(sorted_distances[0]) not in matched.keys():
-                matched[distances.index(sorted_distances[0])] = [i]
+        if len(dt_boxes) == 0:
+            return matched
+        dt_boxes = np.asarray(dt_boxes)
+        pred_bboxes = np.asarray(pred_bboxes)
+        if pred_bboxes.shape[-1] == 8:
+            pred_bboxes = np.stack(
+                [
+                    pred_bboxes[:, 0::2].min(axis=1),
+                    pred_bboxes[:, 1::2].min(axis=1),
+                    pred_bboxes[:, 0::2].max(axis=1),
+                    pred_bboxes[:, 1::2].max(axis=1)
+                ],
+                axis=1)
+        # compute iou and l1 distance
+        distances = distance_matrix(dt_boxes, pred_bboxes)
+        ious = 1. - iou_matrix(dt_boxes, pred_bboxes)
+        # select det box by iou and then l1 distance, the first one on ties
+        distances = np.where(ious == ious.min(axis=1, keepdims=True),
+                             distances, np.inf)
+        for i, j in enumerate(distances.argmin(axis=1).tolist()):
+            if j not in matched.keys():
+                matched[j] = [i]
             else:
-                matched[distances.index(sorted_distances[0])].append(i)
+                matched[j].append(i)
         return matched
 
     def get_pred_html(self, pred_structures, matched_index, ocr_contents):
@@ -112,7 +112,7 @@ class TableSystem(object):
     def _ocr(self, img):
         h, w = img.shape[:2]
         dt_boxes, det_elapse = self.text_detector(copy.deepcopy(img))
-        dt_boxes = sorted_boxes(dt_boxes)
+        dt_boxes = sorted_boxes(dt_boxes, self.args.det_sort_y_thresh)
 
         r_boxes = []
         for box in dt_boxes:
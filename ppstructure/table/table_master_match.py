@@ -130,6 +130,50 @@ def cal_iou(bbox1, bbox2):
     return iou
 
 
+def cal_iou_matrix(bboxes1, bboxes2):
+    """
+    cal_iou of every pair of xyxy bboxes1 [N, 4] and bboxes2 [M, 4] after
+    convert_coord, without shapely. The convex hull of the corners of two
+    bboxes is their enclosing bbox without a triangle at every corner of it
+    that one bbox reaches in x and the other one in y.
+    :param bboxes1:
+    :param bboxes2:
+    :return: [N, M] iou
+    """
+    # float32 like convert_coord, corners sorted like the convex hull
+    bboxes = []
+    for bbox in (bboxes1, bboxes2):
+        bbox = np.asarray(bbox, dtype=np.float32).astype(np.float64)
+        bboxes.append(
+            np.concatenate(
+                [
+                    np.minimum(bbox[:, :2], bbox[:, 2:]),
+                    np.maximum(bbox[:, :2], bbox[:, 2:])
+                ],
+                axis=1))
+    bbox1, bbox2 = bboxes[0][:, None], bboxes[1][None]
+
+    inter_w = np.minimum(bbox1[..., 2], bbox2[..., 2]) - np.maximum(
+        bbox1[..., 0], bbox2[..., 0])
+    inter_h = np.minimum(bbox1[..., 3], bbox2[..., 3]) - np.maximum(
+        bbox1[..., 1], bbox2[..., 1])
+    inter_area = np.maximum(inter_w, 0) * np.maximum(inter_h, 0)
+
+    union_area = (np.maximum(bbox1[..., 2], bbox2[..., 2]) - np.minimum(
+        bbox1[..., 0], bbox2[..., 0])) * (np.maximum(
+            bbox1[..., 3], bbox2[..., 3]) - np.minimum(bbox1[..., 1],
+                                                       bbox2[..., 1]))
+    # (x, y, sign) of the top left, top right, bottom right and bottom left
+    # corners, the triangle is cut if bbox1 is further out in x and bbox2 in
+    # y or the other way round
+    for x, y, sign in ((0, 1, -1), (2, 1, 1), (2, 3, -1), (0, 3, 1)):
+        union_area -= 0.5 * np.maximum(sign * (bbox1[..., x] - bbox2[..., x]) *
+                                       (bbox1[..., y] - bbox2[..., y]), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iou = inter_area / union_area
+    return np.where((inter_area > 0) & (union_area > 0), iou, 0.)
+
+
 def cal_distance(p1, p2):
     delta_x = p1[0] - p2[0]
     delta_y = p1[1] - p2[1]
@@ -175,7 +219,7 @@ def find_no_match(match_list, all_end2end_nums, type='end2end'):
 
     no_match_indexs = []
     # m[0] is end2end index m[1] is master index
-    matched_bbox_indexs = [m[idx] for m in match_list]
+    matched_bbox_indexs = set(m[idx] for m in match_list)
     for n in range(all_end2end_nums):
         if n not in matched_bbox_indexs:
             no_match_indexs.append(n)
@@ -313,18 +357,17 @@ def center_rule_match(end2end_xywh_bboxes, structure_master_xyxy_bboxes):
     :param structure_master_xyxy_bboxes:
     :return: match pairs list, e.g. [[0,1], [1,2], ...]
     """
-    match_pairs_list = []
-    for i, end2end_xywh in enumerate(end2end_xywh_bboxes):
-        for j, master_xyxy in enumerate(structure_master_xyxy_bboxes):
-            x_end2end, y_end2end = end2end_xywh[0], end2end_xywh[1]
-            x_master1, y_master1, x_master2, y_master2 \
-                = master_xyxy[0], master_xyxy[1], master_xyxy[2], master_xyxy[3]
-            center_point_end2end = (x_end2end, y_end2end)
-            corner_point_master = ((x_master1, y_master1),
-                                   (x_master2, y_master2))
-            if is_inside(center_point_end2end, corner_point_master):
-                match_pairs_list.append([i, j])
-    return match_pairs_list
+    if len(end2end_xywh_bboxes) == 0 or len(structure_master_xyxy_bboxes) == 0:
+        return []
+    # center point of every end2end bbox against every master bbox
+    center_points = np.asarray(end2end_xywh_bboxes)[:, None, :2]
+    master_xyxy = np.asarray(structure_master_xyxy_bboxes)[None]
+    inside = (center_points[..., 0] >= master_xyxy[..., 0]) & (
+        center_points[..., 0] <= master_xyxy[..., 2]) & (
+            center_points[..., 1] >= master_xyxy[..., 1]) & (
+                center_points[..., 1] <= master_xyxy[..., 3])
+    # row major like looping over end2end then master bboxes
+    return np.argwhere(inside).tolist()
 
 
 def iou_rule_match(end2end_xyxy_bboxes, end2end_xyxy_indexes,
@@ -338,22 +381,15 @@ def iou_rule_match(end2end_xyxy_bboxes, end2end_xyxy_indexes,
     :return: match pairs list, e.g. [[0,1], [1,2], ...]
     """
     match_pair_list = []
-    for end2end_xyxy_index, end2end_xyxy in zip(end2end_xyxy_indexes,
-                                                end2end_xyxy_bboxes):
-        max_iou = 0
-        max_match = [None, None]
-        for j, master_xyxy in enumerate(structure_master_xyxy_bboxes):
-            end2end_4xy = convert_coord(end2end_xyxy)
-            master_4xy = convert_coord(master_xyxy)
-            iou = cal_iou(end2end_4xy, master_4xy)
-            if iou > max_iou:
-                max_match[0], max_match[1] = end2end_xyxy_index, j
-                max_iou = iou
-
-        if max_match[0] is None:
-            # no match
-            continue
-        match_pair_list.append(max_match)
+    if len(end2end_xyxy_bboxes) == 0 or len(structure_master_xyxy_bboxes) == 0:
+        return match_pair_list
+    ious = cal_iou_matrix(end2end_xyxy_bboxes, structure_master_xyxy_bboxes)
+    # the first master bbox of the max iou
+    max_indexes = ious.argmax(axis=1).tolist()
+    for end2end_xyxy_index, iou, j in zip(end2end_xyxy_indexes, ious,
+                                          max_indexes):
+        if iou[j] > 0:
+            match_pair_list.append([end2end_xyxy_index, j])
     return match_pair_list
 
 
@@ -370,21 +406,16 @@ def distance_rule_match(end2end_indexes, end2end_bboxes, master_indexes,
     :param master_bboxes:
     :return: match_pairs list, e.g. [[0,1], [1,2], ...]
     """
-    min_match_list = []
-    for j, master_bbox in zip(master_indexes, master_bboxes):
-        min_distance = np.inf
-        min_match = [0, 0]  # i, j
-        for i, end2end_bbox in zip(end2end_indexes, end2end_bboxes):
-            x_end2end, y_end2end = end2end_bbox[0], end2end_bbox[1]
-            x_master, y_master = master_bbox[0], master_bbox[1]
-            end2end_point = (x_end2end, y_end2end)
-            master_point = (x_master, y_master)
-            dist = cal_distance(master_point, end2end_point)
-            if dist < min_distance:
-                min_match[0], min_match[1] = i, j
-                min_distance = dist
-        min_match_list.append(min_match)
-    return min_match_list
+    end2end_points = np.asarray(end2end_bboxes)[:, :2]
+    master_points = np.asarray(master_bboxes)[:, :2]
+    # [master, end2end] distances, squared in the dtype of the bboxes and
+    # rooted in float64 like cal_distance
+    delta = master_points[:, None] - end2end_points[None]
+    dists = np.sqrt((delta[..., 0]**2 + delta[..., 1]**2).astype(np.float64))
+    # the first end2end bbox of the min distance
+    min_indexes = dists.argmin(axis=1).tolist()
+    return [[end2end_indexes[i], j]
+            for j, i in zip(master_indexes, min_indexes)]
 
 
 def extra_match(no_match_end2end_indexes, master_bbox_nums):
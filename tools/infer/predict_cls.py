@@ -31,6 +31,7 @@ import tools.infer.utility as utility
 from ppocr.postprocess import build_post_process
 from ppocr.utils.logging import get_logger
 from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppocr.utils.crop_cache import CropCache
 
 logger = get_logger()
 
@@ -48,6 +49,10 @@ class TextClassifier(object):
         self.predictor, self.input_tensor, self.output_tensors, _ = \
             utility.create_predictor(args, 'cls', logger)
         self.use_onnx = args.use_onnx
+        self.cls_cache = None
+        if args.cls_cache_size > 0:
+            self.cls_cache = CropCache(args.cls_cache_size,
+                                       args.cls_cache_tolerance)
 
     def resize_norm_img(self, img):
         imgC, imgH, imgW = self.cls_image_shape
@@ -72,6 +77,19 @@ class TextClassifier(object):
         return padding_im
 
     def __call__(self, img_list):
+        if self.cls_cache is None:
+            return self.classify(img_list)
+        # crops seen before skip preprocessing and inference
+        st = time.time()
+        cls_res = self.cls_cache(img_list,
+                                 lambda imgs: self.classify(imgs)[1])
+        img_list = list(img_list)
+        for ino, (label, score) in enumerate(cls_res):
+            if '180' in label and score > self.cls_thresh:
+                img_list[ino] = cv2.rotate(img_list[ino], 1)
+        return img_list, cls_res, time.time() - st
+
+    def classify(self, img_list):
         img_list = copy.deepcopy(img_list)
         img_num = len(img_list)
         # Calculate the aspect ratio of all text bars
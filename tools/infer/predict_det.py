@@ -21,6 +21,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(__dir__, '../..')))
 os.environ["FLAGS_allocator_strategy"] = 'auto_growth'
 
 import cv2
+import math
+import itertools
 import numpy as np
 import time
 import sys
@@ -33,12 +35,15 @@ from ppocr.postprocess import build_post_process
 import json
 logger = get_logger()
 
+DET_BATCH_PAD = 128
+
 
 class TextDetector(object):
     def __init__(self, args):
         self.args = args
         self.det_algorithm = args.det_algorithm
         self.use_onnx = args.use_onnx
+        self.det_batch_num = args.det_batch_num
         pre_process_list = [{
             'DetResizeForTest': {
                 'limit_side_len': args.det_limit_side_len,
@@ -217,25 +222,14 @@ class TextDetector(object):
         dt_boxes = np.array(dt_boxes_new)
         return dt_boxes
 
-    def __call__(self, img):
-        ori_im = img.copy()
-        data = {'image': img}
-
-        st = time.time()
-
-        if self.args.benchmark:
-            self.autolog.times.start()
-
-        data = transform(data, self.preprocess_op)
-        img, shape_list = data
-        if img is None:
-            return None, 0
-        img = np.expand_dims(img, axis=0)
-        shape_list = np.expand_dims(shape_list, axis=0)
-        img = img.copy()
-
-        if self.args.benchmark:
-            self.autolog.times.stamp()
+    def run_predictor(self, img):
+        """
+        run the detection model on a preprocessed batch
+        args:
+            img(array): batch with shape [N, C, H, W]
+        return:
+            preds(dict): model outputs keyed as the postprocess expects
+        """
         if self.use_onnx:
             input_dict = {}
             input_dict[self.input_tensor.name] = img
@@ -247,8 +241,6 @@ class TextDetector(object):
             for output_tensor in self.output_tensors:
                 output = output_tensor.copy_to_cpu()
                 outputs.append(output)
-            if self.args.benchmark:
-                self.autolog.times.stamp()
 
         preds = {}
         if self.det_algorithm == "EAST":
@@ -269,20 +261,120 @@ class TextDetector(object):
             preds['score'] = outputs[1]
         else:
             raise NotImplementedError
+        return preds
 
+    def postprocess(self, preds, shape_list, ori_shape):
         post_result = self.postprocess_op(preds, shape_list)
         dt_boxes = post_result[0]['points']
 
         if self.args.det_box_type == 'poly':
-            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_im.shape)
+            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_shape)
         else:
-            dt_boxes = self.filter_tag_det_res(dt_boxes, ori_im.shape)
+            dt_boxes = self.filter_tag_det_res(dt_boxes, ori_shape)
+        return dt_boxes
+
+    def __call__(self, img):
+        ori_im = img.copy()
+        data = {'image': img}
+
+        st = time.time()
+
+        if self.args.benchmark:
+            self.autolog.times.start()
+
+        data = transform(data, self.preprocess_op)
+        img, shape_list = data
+        if img is None:
+            return None, 0
+        img = np.expand_dims(img, axis=0)
+        shape_list = np.expand_dims(shape_list, axis=0)
+        img = img.copy()
+
+        if self.args.benchmark:
+            self.autolog.times.stamp()
+        preds = self.run_predictor(img)
+        if self.args.benchmark:
+            self.autolog.times.stamp()
+
+        dt_boxes = self.postprocess(preds, shape_list, ori_im.shape)
 
         if self.args.benchmark:
             self.autolog.times.end(stamp=True)
         et = time.time()
         return dt_boxes, et - st
 
+    def detect_batch(self, img_list):
+        """
+        detect text in several images with batched model calls
+        args:
+            img_list(list): list of images
+        return:
+            dt_boxes_list(list): dt_boxes of each image, None for images
+                that failed preprocessing
+            elapse(float): total elapse of the batch
+        """
+        # only DB outputs maps at input resolution, which can be cropped
+        # back out of a padded batch
+        if self.det_algorithm not in ['DB', 'DB++'] or self.det_batch_num <= 1:
+            dt_boxes_list, total_elapse = [], 0
+            for img in img_list:
+                if img is None:
+                    dt_boxes_list.append(None)
+                    continue
+                dt_boxes, elapse = self.__call__(img)
+                dt_boxes_list.append(dt_boxes)
+                total_elapse += elapse
+            return dt_boxes_list, total_elapse
+
+        st = time.time()
+        if self.args.benchmark:
+            self.autolog.times.start()
+
+        dt_boxes_list = [None] * len(img_list)
+        buckets = {}
+        for idx, img in enumerate(img_list):
+            if img is None:
+                continue
+            data = transform({'image': img}, self.preprocess_op)
+            if data is None or data[0] is None:
+                continue
+            norm_img, shape_list = data
+            # images padded to a common multiple of DET_BATCH_PAD share a bucket
+            h, w = norm_img.shape[1:]
+            key = (int(math.ceil(h / DET_BATCH_PAD) * DET_BATCH_PAD),
+                   int(math.ceil(w / DET_BATCH_PAD) * DET_BATCH_PAD))
+            buckets.setdefault(key, []).append((idx, norm_img, shape_list))
+
+        if self.args.benchmark:
+            self.autolog.times.stamp()
+        # every chunk is post processed right after its forward pass, so only
+        # the maps of one chunk are alive. With benchmark on, the inference
+        # stamp covers the post processing as well.
+        for (pad_h, pad_w), items in buckets.items():
+            for beg in range(0, len(items), self.det_batch_num):
+                batch = items[beg:beg + self.det_batch_num]
+                norm_img_batch = np.zeros(
+                    (len(batch), batch[0][1].shape[0], pad_h, pad_w),
+                    dtype=np.float32)
+                for i, (_, norm_img, _) in enumerate(batch):
+                    h, w = norm_img.shape[1:]
+                    norm_img_batch[i, :, :h, :w] = norm_img
+                maps = self.run_predictor(norm_img_batch)['maps']
+                for i, (idx, norm_img, shape_list) in enumerate(batch):
+                    h, w = norm_img.shape[1:]
+                    preds = {'maps': maps[i:i + 1, :, :h, :w]}
+                    dt_boxes_list[idx] = self.postprocess(
+                        preds,
+                        np.expand_dims(
+                            shape_list, axis=0), img_list[idx].shape)
+            # the preprocessed images of a bucket are not needed any more
+            items.clear()
+        if self.args.benchmark:
+            self.autolog.times.stamp()
+            self.autolog.times.end(stamp=True)
+        et = time.time()
+        return dt_boxes_list, et - st
+
 
 if __name__ == "__main__":
     args = utility.parse_args()
@@ -298,26 +390,20 @@ if __name__ == "__main__":
             res = text_detector(img)
 
     save_results = []
-    for idx, image_file in enumerate(image_file_list):
-        img, flag_gif, flag_pdf = check_and_read(image_file)
-        if not flag_gif and not flag_pdf:
-            img = cv2.imread(image_file)
-        if not flag_pdf:
-            if img is None:
-                logger.debug("error in loading image:{}".format(image_file))
-                continue
-            imgs = [img]
-        else:
-            page_num = args.page_num
-            if page_num > len(img) or page_num == 0:
-                page_num = len(img)
-            imgs = img[:page_num]
-        for index, img in enumerate(imgs):
-            st = time.time()
-            dt_boxes, _ = text_detector(img)
-            elapse = time.time() - st
+    image_iter = utility.read_image_pages(image_file_list, args.page_num,
+                                          logger)
+    while True:
+        batch = list(itertools.islice(image_iter, max(args.det_batch_num, 1)))
+        if len(batch) == 0:
+            break
+        st = time.time()
+        dt_boxes_list, _ = text_detector.detect_batch(
+            [item[-1] for item in batch])
+        elapse = (time.time() - st) / len(batch)
+        for (idx, image_file, index, page_cnt, flag_gif, flag_pdf,
+             img), dt_boxes in zip(batch, dt_boxes_list):
             total_time += elapse
-            if len(imgs) > 1:
+            if page_cnt > 1:
                 save_pred = os.path.basename(image_file) + '_' + str(
                     index) + "\t" + str(
                         json.dumps([x.tolist() for x in dt_boxes])) + "\n"
@@ -326,7 +412,7 @@ if __name__ == "__main__":
                     json.dumps([x.tolist() for x in dt_boxes])) + "\n"
             save_results.append(save_pred)
             logger.info(save_pred)
-            if len(imgs) > 1:
+            if page_cnt > 1:
                 logger.info("{}_{} The predict time of {}: {}".format(
                     idx, index, image_file, elapse))
             else:
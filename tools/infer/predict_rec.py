@@ -24,6 +24,7 @@ import cv2
 import numpy as np
 import math
 import time
+import bisect
 import traceback
 import paddle
 
@@ -31,9 +32,68 @@ import tools.infer.utility as utility
 from ppocr.postprocess import build_post_process
 from ppocr.utils.logging import get_logger
 from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppocr.utils.crop_cache import CropCache
 
 logger = get_logger()
 
+# bucket widths of use_rec_bucket_batch in units of imgW
+BUCKET_WIDTH_SCALES = [0.25, 0.5, 0.75, 1, 1.5, 2, 3, 4]
+
+
+def plan_rec_batches(wh_ratios,
+                     rec_image_shape,
+                     batch_num,
+                     bucket_widths=None,
+                     batch_pixels=0):
+    """
+    Split crops sorted by aspect ratio into batches. Without bucket_widths
+    every batch_num crops form a batch padded to the width of its widest
+    crop and at least imgW. With bucket_widths every crop needs the smallest
+    bucket width it fits in (a multiple of imgW beyond the largest one), a
+    batch only holds crops of the same bucket and at most batch_pixels padded
+    pixels, so a wide crop no longer inflates the batch of narrow ones and
+    the predictor only sees a few input widths.
+
+    args:
+        wh_ratios: ascending w / h of the crops
+        rec_image_shape: [imgC, imgH, imgW] of the recognizer
+        batch_num: crops per batch without bucket_widths
+        bucket_widths: ascending input widths or None
+        batch_pixels: max padded pixels (crops * width * imgH) of a batch
+            with bucket_widths, one crop per batch at least
+    return: list of (beg, end, max_wh_ratio), crops [beg, end) of the sorted
+        order form a batch padded to the width of max_wh_ratio
+    """
+    imgH, imgW = rec_image_shape[1:3]
+    img_num = len(wh_ratios)
+    batches = []
+    if bucket_widths is None:
+        for beg_img_no in range(0, img_num, batch_num):
+            end_img_no = min(img_num, beg_img_no + batch_num)
+            max_wh_ratio = max(imgW / imgH, *wh_ratios[beg_img_no:end_img_no])
+            batches.append((beg_img_no, end_img_no, max_wh_ratio))
+        return batches
+
+    beg_img_no = 0
+    batch_width = 0
+    for ino in range(img_num):
+        need_w = int(math.ceil(imgH * wh_ratios[ino]))
+        pos = bisect.bisect_left(bucket_widths, need_w)
+        if pos < len(bucket_widths):
+            width = bucket_widths[pos]
+        else:
+            width = int(math.ceil(need_w / imgW)) * imgW
+        if ino > beg_img_no and (width != batch_width or
+                                 (ino - beg_img_no + 1) * width * imgH >
+                                 batch_pixels):
+            batches.append((beg_img_no, ino, batch_width))
+            beg_img_no = ino
+        batch_width = width
+    if img_num > 0:
+        batches.append((beg_img_no, img_num, batch_width))
+    # int(imgH * max_wh_ratio) of get_norm_img_width is exactly the width
+    return [(beg, end, (width + 0.5) / imgH) for beg, end, width in batches]
+
 
 class TextRecognizer(object):
     def __init__(self, args):
@@ -127,6 +187,38 @@ class TextRecognizer(object):
             utility.create_predictor(args, 'rec', logger)
         self.benchmark = args.benchmark
         self.use_onnx = args.use_onnx
+        # CRNN style and SVTR inputs are written straight into one reused
+        # batch buffer
+        self.use_batch_buffer = self.rec_algorithm not in [
+            "SAR", "SRN", "VisionLAN", "PREN", "SPIN", "ABINet",
+            "RobustScanner", "CAN", "NRTR", "ViTSTR", "RFL", "RARE"
+        ]
+        self.batch_buffer = None
+        self.rec_cache = None
+        if args.rec_cache_size > 0:
+            self.rec_cache = CropCache(args.rec_cache_size,
+                                       args.rec_cache_tolerance)
+        # batches padded to the width of their widest crop, see
+        # plan_rec_batches
+        self.dynamic_width = self.use_batch_buffer and \
+            self.rec_algorithm not in ["SVTR", "SATRN"]
+        self.bucket_widths = None
+        if args.use_rec_bucket_batch and self.dynamic_width:
+            imgW = self.rec_image_shape[2]
+            if args.rec_bucket_widths:
+                widths = [int(v) for v in args.rec_bucket_widths.split(",")]
+            else:
+                widths = [int(imgW * s) for s in BUCKET_WIDTH_SCALES]
+            self.bucket_widths = sorted(set(widths))
+        self.batch_pixels = args.rec_batch_pixels
+        if self.batch_pixels <= 0:
+            self.batch_pixels = self.rec_batch_num * int(
+                np.prod(self.rec_image_shape[1:3]))
+        # widths of the crops and of their padded inputs, for
+        # padding_log
+        self.useful_width = 0
+        self.padded_width = 0
+        self.batch_cnt = 0
         if args.benchmark:
             import auto_log
             pid = os.getpid()
@@ -177,13 +269,7 @@ class TextRecognizer(object):
             return resized_image
 
         assert imgC == img.shape[2]
-        imgW = int((imgH * max_wh_ratio))
-        if self.use_onnx:
-            w = self.input_tensor.shape[3:][0]
-            if isinstance(w, str):
-                pass
-            elif w is not None and w > 0:
-                imgW = w
+        imgW = self.get_norm_img_width(max_wh_ratio)
         h, w = img.shape[:2]
         ratio = w / float(h)
         if math.ceil(imgH * ratio) > imgW:
@@ -203,6 +289,60 @@ class TextRecognizer(object):
         padding_im[:, :, 0:resized_w] = resized_image
         return padding_im
 
+    def get_norm_img_width(self, max_wh_ratio):
+        imgC, imgH, imgW = self.rec_image_shape
+        if self.rec_algorithm in ["SVTR", "SATRN"]:
+            return imgW
+        imgW = int((imgH * max_wh_ratio))
+        if self.use_onnx:
+            w = self.input_tensor.shape[3:][0]
+            if isinstance(w, str):
+                pass
+            elif w is not None and w > 0:
+                imgW = w
+        return imgW
+
+    def get_batch_buffer(self, batch_size, max_wh_ratio):
+        """
+        Return a contiguous [N, C, H, W] float32 view of a buffer reused
+        across batches, it only grows when a batch needs more room.
+        """
+        imgC, imgH = self.rec_image_shape[:2]
+        shape = (batch_size, imgC, imgH, self.get_norm_img_width(max_wh_ratio))
+        size = int(np.prod(shape))
+        if self.batch_buffer is None or self.batch_buffer.size < size:
+            self.batch_buffer = np.empty(size, dtype=np.float32)
+        return self.batch_buffer[:size].reshape(shape)
+
+    def resize_norm_img_into(self, img, max_wh_ratio, out):
+        """
+        Same result as resize_norm_img (resize_norm_img_svtr for SVTR and
+        SATRN), but written into out, a [C, H, W] view of the batch buffer,
+        so the padded copy of every image and np.concatenate are avoided.
+        The resized image is normalized in place in one contiguous float32
+        copy, normalizing the strided view of out directly is slower.
+        """
+        imgC, imgH, imgW = out.shape
+        if self.rec_algorithm in ["SVTR", "SATRN"]:
+            resized_w = imgW
+            resized_image = cv2.resize(
+                img, (imgW, imgH), interpolation=cv2.INTER_LINEAR)
+        else:
+            assert imgC == img.shape[2]
+            h, w = img.shape[:2]
+            ratio = w / float(h)
+            if math.ceil(imgH * ratio) > imgW:
+                resized_w = imgW
+            else:
+                resized_w = int(math.ceil(imgH * ratio))
+            resized_image = cv2.resize(img, (resized_w, imgH))
+        norm_img = resized_image.transpose((2, 0, 1)).astype('float32')
+        norm_img /= 255
+        norm_img -= 0.5
+        norm_img /= 0.5
+        out[:, :, :resized_w] = norm_img
+        out[:, :, resized_w:] = 0
+
     def resize_norm_img_vl(self, img, image_shape):
 
         imgC, imgH, imgW = image_shape
@@ -391,6 +531,29 @@ class TextRecognizer(object):
         return img
 
     def __call__(self, img_list):
+        if self.rec_cache is None:
+            return self.recognize(img_list)
+        # crops seen before skip preprocessing and inference
+        st = time.time()
+        rec_res = self.rec_cache(img_list,
+                                 lambda imgs: self.recognize(imgs)[0])
+        return rec_res, time.time() - st
+
+    def padding_log(self, instances=None):
+        """
+        args:
+            instances(list): TextRecognizer instances whose padding stats
+                are summed, e.g. the clones of a PredictorPool, [self] if None
+        """
+        if instances is None:
+            instances = [self]
+        batch_cnt = sum(rec.batch_cnt for rec in instances)
+        useful_width = sum(rec.useful_width for rec in instances)
+        padded_width = sum(rec.padded_width for rec in instances)
+        return 'batches: {}, padding efficiency: {:.2%}'.format(
+            batch_cnt, useful_width / max(padded_width, 1))
+
+    def recognize(self, img_list):
         img_num = len(img_list)
         # Calculate the aspect ratio of all text bars
         width_list = []
@@ -403,8 +566,12 @@ class TextRecognizer(object):
         st = time.time()
         if self.benchmark:
             self.autolog.times.start()
-        for beg_img_no in range(0, img_num, batch_num):
-            end_img_no = min(img_num, beg_img_no + batch_num)
+        imgC, imgH, imgW = self.rec_image_shape[:3]
+        sorted_ratios = [width_list[i] for i in indices]
+        batches = plan_rec_batches(sorted_ratios, self.rec_image_shape,
+                                   batch_num, self.bucket_widths,
+                                   self.batch_pixels)
+        for beg_img_no, end_img_no, max_wh_ratio in batches:
             norm_img_batch = []
             if self.rec_algorithm == "SRN":
                 encoder_word_pos_list = []
@@ -413,15 +580,22 @@ class TextRecognizer(object):
                 gsrm_slf_attn_bias2_list = []
             if self.rec_algorithm == "SAR":
                 valid_ratios = []
-            imgC, imgH, imgW = self.rec_image_shape[:3]
-            max_wh_ratio = imgW / imgH
-            # max_wh_ratio = 0
-            for ino in range(beg_img_no, end_img_no):
-                h, w = img_list[indices[ino]].shape[0:2]
-                wh_ratio = w * 1.0 / h
-                max_wh_ratio = max(max_wh_ratio, wh_ratio)
+            if self.use_batch_buffer:
+                norm_img_batch = self.get_batch_buffer(end_img_no - beg_img_no,
+                                                       max_wh_ratio)
+            if self.dynamic_width:
+                batch_w = norm_img_batch.shape[3]
+                self.batch_cnt += 1
+                self.padded_width += (end_img_no - beg_img_no) * batch_w
+                self.useful_width += sum(
+                    min(batch_w, int(math.ceil(imgH * ratio)))
+                    for ratio in sorted_ratios[beg_img_no:end_img_no])
             for ino in range(beg_img_no, end_img_no):
-                if self.rec_algorithm == "SAR":
+                if self.use_batch_buffer:
+                    self.resize_norm_img_into(img_list[indices[ino]],
+                                              max_wh_ratio,
+                                              norm_img_batch[ino - beg_img_no])
+                elif self.rec_algorithm == "SAR":
                     norm_img, _, _, valid_ratio = self.resize_norm_img_sar(
                         img_list[indices[ino]], self.rec_image_shape)
                     norm_img = norm_img[np.newaxis, :]
@@ -485,8 +659,8 @@ class TextRecognizer(object):
                                                     max_wh_ratio)
                     norm_img = norm_img[np.newaxis, :]
                     norm_img_batch.append(norm_img)
-            norm_img_batch = np.concatenate(norm_img_batch)
-            norm_img_batch = norm_img_batch.copy()
+            if not self.use_batch_buffer:
+                norm_img_batch = np.concatenate(norm_img_batch)
             if self.benchmark:
                 self.autolog.times.stamp()
 
@@ -668,6 +842,8 @@ def main(args):
     for ino in range(len(img_list)):
         logger.info("Predicts of {}:{}".format(valid_image_file_list[ino],
                                                rec_res[ino]))
+    if text_recognizer.dynamic_width:
+        logger.info("rec {}".format(text_recognizer.padding_log()))
     if args.benchmark:
         text_recognizer.autolog.report()
 
@@ -13,7 +13,11 @@
 # limitations under the License.
 import os
 import sys
-import subprocess
+import multiprocessing
+import itertools
+import threading
+import queue
+import contextlib
 
 __dir__ = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(__dir__)
@@ -34,6 +38,7 @@ import tools.infer.predict_det as predict_det
 import tools.infer.predict_cls as predict_cls
 from ppocr.utils.utility import get_image_file_list, check_and_read
 from ppocr.utils.logging import get_logger
+from ppocr.utils.meter_align import MeterTemplateRegistry
 from tools.infer.utility import draw_ocr_box_txt, get_rotate_crop_image, get_minarea_rect_crop
 logger = get_logger()
 
@@ -50,9 +55,92 @@ class TextSystem(object):
         if self.use_angle_cls:
             self.text_classifier = predict_cls.TextClassifier(args)
 
+        self.meter_registry = None
+        if args.meter_template_config:
+            self.meter_registry = MeterTemplateRegistry.from_config(
+                args.meter_template_config)
+            # built before concurrent callers can query it
+            self.meter_registry.build()
+            self.meter_min_inliers = args.meter_min_inliers
+
         self.args = args
         self.crop_image_res_index = 0
 
+        # model instances of concurrent callers, see checkout
+        self.pools = {}
+        if args.predictor_pool_size > 1:
+            self.pools['text_detector'] = utility.PredictorPool(
+                self.text_detector, args, 'det', args.predictor_pool_size)
+            self.pools['text_recognizer'] = utility.PredictorPool(
+                self.text_recognizer, args, 'rec', args.predictor_pool_size)
+            if self.use_angle_cls:
+                self.pools['text_classifier'] = utility.PredictorPool(
+                    self.text_classifier, args, 'cls',
+                    args.predictor_pool_size)
+            if args.benchmark:
+                logger.warning(
+                    "the autolog timings of --benchmark are shared by the "
+                    "{} instances of every model and are only reliable "
+                    "without concurrent callers".format(
+                        args.predictor_pool_size))
+
+        # stateful frame mode, see ocr_frame
+        self.frame_diff_thresh = args.frame_diff_thresh
+        self.frame_redetect_interval = args.frame_redetect_interval
+        self.last_frame = None
+        self.frame_processed = 0
+        self.frame_skipped = 0
+        # frames reused since the last detection
+        self.frame_reused = 0
+
+    @contextlib.contextmanager
+    def checkout(self, name):
+        """
+        Instance of the text_detector, text_recognizer or text_classifier
+        model for the calling thread, taken from its pool for the duration of
+        the with block when predictor_pool_size > 1, so one TextSystem serves
+        concurrent __call__ and ocr_batch callers. ocr_frame keeps the state
+        of a single camera and is not meant for concurrent callers.
+        """
+        if name not in self.pools:
+            yield getattr(self, name)
+        else:
+            with self.pools[name].get() as model:
+                yield model
+
+    def instances(self, name):
+        """
+        All instances of the text_detector, text_recognizer or
+        text_classifier model created so far, to merge their statistics
+        """
+        if name not in self.pools:
+            return [getattr(self, name)]
+        return self.pools[name].instances()
+
+    def locate_meter_rois(self, img):
+        """
+        Align img to its meter template and project the template rois into it
+        args:
+            img(array): input frame
+        return:
+            rois(array) with shape [N, 4, 2] in reading order, None if the
+            alignment is not confident enough to skip text detection
+        """
+        name, h, num_inliers = self.meter_registry.estimate(img)
+        if h is None or num_inliers < self.meter_min_inliers:
+            logger.debug("meter alignment failed, template: {}, inliers: {}".
+                         format(name, num_inliers))
+            return None
+        rois = self.meter_registry.project_rois(name, h)
+        img_h, img_w = img.shape[:2]
+        if len(rois) == 0 or rois[..., 0].min() < 0 or rois[..., 1].min(
+        ) < 0 or rois[..., 0].max() > img_w or rois[..., 1].max() > img_h:
+            logger.debug("meter rois of {} out of image".format(name))
+            return None
+        logger.debug("meter template: {}, inliers: {}".format(name,
+                                                              num_inliers))
+        return rois
+
     def draw_crop_rec_res(self, output_dir, img_crop_list, rec_res):
         os.makedirs(output_dir, exist_ok=True)
         bbox_num = len(img_crop_list)
@@ -73,36 +161,139 @@ class TextSystem(object):
 
         start = time.time()
         ori_im = img.copy()
-        dt_boxes, elapse = self.text_detector(img)
-        time_dict['det'] = elapse
-
+        dt_boxes, det_box_type = self.detect(img, time_dict)
         if dt_boxes is None:
-            logger.debug("no dt_boxes found, elapsed : {}".format(elapse))
             end = time.time()
             time_dict['all'] = end - start
             return None, None, time_dict
-        else:
-            logger.debug("dt_boxes num : {}, elapsed : {}".format(
-                len(dt_boxes), elapse))
-        img_crop_list = []
+        img_crop_list = self.crop(ori_im, dt_boxes, det_box_type)
+        return self.recognize(dt_boxes, img_crop_list, cls, time_dict, start)
+
+    def ocr_frame(self, img, cls=True):
+        """
+        Stateful OCR of the frames of a fixed camera. The rois of the last
+        processed frame (meter rois or detected text boxes) are cropped from
+        img first, if none of them changed by more than frame_diff_thresh the
+        result of that frame is returned again and detection, classification
+        and recognition are skipped. Frames are detected again when the last
+        one had no rois and every frame_redetect_interval reused frames, so
+        text appearing outside of the rois is picked up as well.
+        args:
+            img(array): current frame
+        return:
+            (filter_boxes, filter_rec_res, time_dict) as __call__
+        """
+        time_dict = {'det': 0, 'rec': 0, 'cls': 0, 'all': 0}
+        if img is None:
+            logger.debug("no valid image provided")
+            return None, None, time_dict
 
-        dt_boxes = sorted_boxes(dt_boxes)
+        start = time.time()
+        ori_im = img.copy()
+        if self.last_frame is not None and len(self.last_frame[0]) > 0 and (
+                self.frame_redetect_interval <= 0 or
+                self.frame_reused < self.frame_redetect_interval):
+            last_boxes, last_box_type, last_thumbs, last_res = self.last_frame
+            thumbs = [
+                self.get_roi_thumb(img_crop)
+                for img_crop in self.crop(ori_im, last_boxes, last_box_type)
+            ]
+            if not self.rois_changed(last_thumbs, thumbs):
+                self.frame_skipped += 1
+                self.frame_reused += 1
+                filter_boxes, filter_rec_res = last_res
+                time_dict['all'] = time.time() - start
+                return filter_boxes, filter_rec_res, time_dict
+
+        self.frame_processed += 1
+        self.frame_reused = 0
+        dt_boxes, det_box_type = self.detect(img, time_dict)
+        if dt_boxes is None:
+            self.last_frame = None
+            time_dict['all'] = time.time() - start
+            return None, None, time_dict
+        img_crop_list = self.crop(ori_im, dt_boxes, det_box_type)
+        thumbs = [self.get_roi_thumb(img_crop) for img_crop in img_crop_list]
+        filter_boxes, filter_rec_res, time_dict = self.recognize(
+            dt_boxes, img_crop_list, cls, time_dict, start)
+        self.last_frame = (dt_boxes, det_box_type, thumbs,
+                           (filter_boxes, filter_rec_res))
+        return filter_boxes, filter_rec_res, time_dict
+
+    def get_roi_thumb(self, img_crop):
+        # small gray version of the roi with its mean removed, so a change
+        # of exposure does not count as a change of the display
+        if img_crop.ndim == 3:
+            img_crop = cv2.cvtColor(img_crop, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(
+            img_crop, (64, 16), interpolation=cv2.INTER_AREA).astype(
+                np.float32)
+        return thumb - thumb.mean()
 
+    def rois_changed(self, last_thumbs, thumbs):
+        if len(last_thumbs) != len(thumbs):
+            return True
+        for last_thumb, thumb in zip(last_thumbs, thumbs):
+            # max over columns of the mean abs difference, a single changed
+            # digit is not averaged away by the rest of the roi
+            if np.abs(thumb - last_thumb).mean(
+                    axis=0).max() > self.frame_diff_thresh:
+                return True
+        return False
+
+    def detect(self, img, time_dict):
+        """
+        Locate the text of img, with the meter rois if img is a registered
+        meter and with the text detector otherwise
+        return:
+            dt_boxes(array) in reading order, None if nothing is found
+            det_box_type(str): box type of dt_boxes
+        """
+        st = time.time()
+        if self.meter_registry is not None:
+            # rois of a registered meter replace text detection, alignment
+            # time is reported as det time
+            dt_boxes = self.locate_meter_rois(img)
+            if dt_boxes is not None:
+                time_dict['det'] = time.time() - st
+                return dt_boxes, "quad"
+        with self.checkout('text_detector') as text_detector:
+            dt_boxes, _ = text_detector(img)
+        time_dict['det'] = time.time() - st
+        return self.sort_detection(dt_boxes, time_dict)
+
+    def sort_detection(self, dt_boxes, time_dict):
+        if dt_boxes is None:
+            logger.debug("no dt_boxes found, elapsed : {}".format(time_dict[
+                'det']))
+            return None, self.args.det_box_type
+        logger.debug("dt_boxes num : {}, elapsed : {}".format(
+            len(dt_boxes), time_dict['det']))
+        dt_boxes = sorted_boxes(dt_boxes, self.args.det_sort_y_thresh)
+        return dt_boxes, self.args.det_box_type
+
+    def crop(self, ori_im, dt_boxes, det_box_type):
+        img_crop_list = []
         for bno in range(len(dt_boxes)):
             tmp_box = copy.deepcopy(dt_boxes[bno])
-            if self.args.det_box_type == "quad":
+            if det_box_type == "quad":
                 img_crop = get_rotate_crop_image(ori_im, tmp_box)
             else:
                 img_crop = get_minarea_rect_crop(ori_im, tmp_box)
             img_crop_list.append(img_crop)
+        return img_crop_list
+
+    def recognize(self, dt_boxes, img_crop_list, cls, time_dict, start):
         if self.use_angle_cls and cls:
-            img_crop_list, angle_list, elapse = self.text_classifier(
-                img_crop_list)
+            with self.checkout('text_classifier') as text_classifier:
+                img_crop_list, angle_list, elapse = text_classifier(
+                    img_crop_list)
             time_dict['cls'] = elapse
             logger.debug("cls num  : {}, elapsed : {}".format(
                 len(img_crop_list), elapse))
 
-        rec_res, elapse = self.text_recognizer(img_crop_list)
+        with self.checkout('text_recognizer') as text_recognizer:
+            rec_res, elapse = text_recognizer(img_crop_list)
         time_dict['rec'] = elapse
         logger.debug("rec_res num  : {}, elapsed : {}".format(
             len(rec_res), elapse))
@@ -119,78 +310,230 @@ class TextSystem(object):
         time_dict['all'] = end - start
         return filter_boxes, filter_rec_res, time_dict
 
+    def ocr_batch(self, img_list, cls=True):
+        """
+        Run the system on several images, batching text detection across
+        them with TextDetector.detect_batch
+        args:
+            img_list(list): list of images
+        return:
+            list of (filter_boxes, filter_rec_res, time_dict) of each image
+        """
+        if self.meter_registry is not None:
+            return [self.__call__(img, cls) for img in img_list]
+
+        with self.checkout('text_detector') as text_detector:
+            dt_boxes_list, elapse = text_detector.detect_batch(img_list)
+        # detection time is shared evenly by the images of the batch
+        det_elapse = elapse / max(len(img_list), 1)
+        results = []
+        for img, dt_boxes in zip(img_list, dt_boxes_list):
+            time_dict = {'det': det_elapse, 'rec': 0, 'cls': 0, 'all': 0}
+            if img is None:
+                logger.debug("no valid image provided")
+                results.append((None, None, time_dict))
+                continue
+            start = time.time() - det_elapse
+            dt_boxes, det_box_type = self.sort_detection(dt_boxes, time_dict)
+            if dt_boxes is None:
+                time_dict['all'] = time.time() - start
+                results.append((None, None, time_dict))
+                continue
+            img_crop_list = self.crop(img, dt_boxes, det_box_type)
+            results.append(
+                self.recognize(dt_boxes, img_crop_list, cls, time_dict,
+                               start))
+        return results
+
+    def stream(self, img_iter, cls=True, queue_size=4):
+        """
+        Pipelined OCR over an iterable of images or image paths. Decoding,
+        detection with cropping, and classification with recognition run in
+        their own threads connected by bounded queues, so the detector works
+        on the next image while the recognizer handles the current one.
+        Paddle inference releases the GIL while a predictor runs.
+        args:
+            img_iter(iterable): images or image file paths
+            queue_size(int): max number of images waiting between two stages
+        return:
+            generator of (filter_boxes, filter_rec_res, time_dict), in the
+            order of img_iter
+        """
+        stop = threading.Event()
+        end_flag = object()
+
+        def put(out_queue, item):
+            while not stop.is_set():
+                try:
+                    out_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(in_queue):
+            while not stop.is_set():
+                try:
+                    return in_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return end_flag
+
+        def decode_worker(out_queue):
+            try:
+                for img in img_iter:
+                    if isinstance(img, str):
+                        img = cv2.imread(img)
+                    if not put(out_queue, img):
+                        return
+            except Exception as e:
+                put(out_queue, _StageError(e))
+                return
+            put(out_queue, end_flag)
+
+        def stage_worker(func, in_queue, out_queue):
+            while True:
+                item = get(in_queue)
+                if item is end_flag or isinstance(item, _StageError):
+                    put(out_queue, item)
+                    return
+                try:
+                    item = func(item)
+                except Exception as e:
+                    put(out_queue, _StageError(e))
+                    return
+                if not put(out_queue, item):
+                    return
+
+        def det_stage(img):
+            time_dict = {'det': 0, 'rec': 0, 'cls': 0, 'all': 0}
+            start = time.time()
+            if img is None:
+                logger.debug("no valid image provided")
+                return start, time_dict, None, None
+            dt_boxes, det_box_type = self.detect(img, time_dict)
+            if dt_boxes is None:
+                return start, time_dict, None, None
+            img_crop_list = self.crop(img, dt_boxes, det_box_type)
+            return start, time_dict, dt_boxes, img_crop_list
+
+        def rec_stage(item):
+            start, time_dict, dt_boxes, img_crop_list = item
+            if dt_boxes is None:
+                time_dict['all'] = time.time() - start
+                return None, None, time_dict
+            return self.recognize(dt_boxes, img_crop_list, cls, time_dict,
+                                  start)
+
+        decode_queue = queue.Queue(queue_size)
+        det_queue = queue.Queue(queue_size)
+        out_queue = queue.Queue(queue_size)
+        workers = [
+            threading.Thread(
+                target=decode_worker, args=(decode_queue, )),
+            threading.Thread(
+                target=stage_worker,
+                args=(det_stage, decode_queue, det_queue)),
+            threading.Thread(
+                target=stage_worker, args=(rec_stage, det_queue, out_queue))
+        ]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        try:
+            while True:
+                item = get(out_queue)
+                if item is end_flag:
+                    break
+                if isinstance(item, _StageError):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+
+class _StageError(object):
+    """Carries an exception raised in a TextSystem.stream worker."""
+
+    def __init__(self, error):
+        self.error = error
 
-def sorted_boxes(dt_boxes):
+
+def sorted_boxes(dt_boxes, y_thresh=10):
     """
     Sort text boxes in order from top to bottom, left to right
     args:
-        dt_boxes(array):detected text boxes with shape [4, 2]
+        dt_boxes(array):detected text boxes with shape [N, 4, 2]
+        y_thresh(float): a box moves left past the previous box while their
+            top-left y differ by less than y_thresh and it starts further left
     return:
-        sorted boxes(array) with shape [4, 2]
+        sorted boxes(list) of arrays with shape [4, 2]
     """
-    num_boxes = dt_boxes.shape[0]
-    sorted_boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
-    _boxes = list(sorted_boxes)
-
-    for i in range(num_boxes - 1):
+    dt_boxes = np.asarray(dt_boxes)
+    if dt_boxes.shape[0] == 0:
+        return []
+    top_left = dt_boxes[:, 0, :]
+    # stable like sorted() with the key (y, x)
+    order = np.lexsort((top_left[:, 0], top_left[:, 1])).tolist()
+    xs = top_left[:, 0].tolist()
+    ys = top_left[:, 1].tolist()
+    # float differences of a narrower dtype round differently from the ones
+    # of python floats, they are redone in the dtype of the boxes near the
+    # threshold
+    exact = dt_boxes.dtype == np.float64 or not np.issubdtype(
+        dt_boxes.dtype, np.floating)
+    tolerance = 1e-5 * max(abs(y_thresh), 1)
+    for i in range(len(order) - 1):
         for j in range(i, -1, -1):
-            if abs(_boxes[j + 1][0][1] - _boxes[j][0][1]) < 10 and \
-                    (_boxes[j + 1][0][0] < _boxes[j][0][0]):
-                tmp = _boxes[j]
-                _boxes[j] = _boxes[j + 1]
-                _boxes[j + 1] = tmp
-            else:
+            prev_idx, idx = order[j], order[j + 1]
+            if xs[idx] >= xs[prev_idx]:
+                break
+            dy = abs(ys[idx] - ys[prev_idx])
+            if not exact and abs(dy - y_thresh) <= tolerance:
+                dy = abs(top_left[idx, 1] - top_left[prev_idx, 1])
+            if dy >= y_thresh:
                 break
-    return _boxes
+            order[j], order[j + 1] = idx, prev_idx
+    return list(dt_boxes[order])
 
 
-def main(args):
-    image_file_list = get_image_file_list(args.image_dir)
-    image_file_list = image_file_list[args.process_id::args.total_process_num]
-    text_sys = TextSystem(args)
+def ocr_image_files(text_sys, args, image_file_list, start_idx=0):
+    """
+    Run OCR over image files, save the visualized results and collect the
+    lines of system_results.txt.
+    args:
+        text_sys(TextSystem): loaded OCR system
+        image_file_list(list): image file paths
+        start_idx(int): index of the first file, used in logs
+    return:
+        save_results(list): result lines, in the order of image_file_list
+        total_time(float): predict time of all images
+    """
     is_visualize = True
     font_path = args.vis_font_path
     drop_score = args.drop_score
     draw_img_save_dir = args.draw_img_save_dir
-    os.makedirs(draw_img_save_dir, exist_ok=True)
     save_results = []
-
-    logger.info(
-        "In PP-OCRv3, rec_image_shape parameter defaults to '3, 48, 320', "
-        "if you are using recognition model with PP-OCRv2 or an older version, please set --rec_image_shape='3,32,320"
-    )
-
-    # warm up 10 times
-    if args.warmup:
-        img = np.random.uniform(0, 255, [640, 640, 3]).astype(np.uint8)
-        for i in range(10):
-            res = text_sys(img)
-
     total_time = 0
-    cpu_mem, gpu_mem, gpu_util = 0, 0, 0
-    _st = time.time()
-    count = 0
-    for idx, image_file in enumerate(image_file_list):
-
-        img, flag_gif, flag_pdf = check_and_read(image_file)
-        if not flag_gif and not flag_pdf:
-            img = cv2.imread(image_file)
-        if not flag_pdf:
-            if img is None:
-                logger.debug("error in loading image:{}".format(image_file))
-                continue
-            imgs = [img]
+    image_iter = utility.read_image_pages(image_file_list, args.page_num,
+                                          logger)
+    while True:
+        batch = list(itertools.islice(image_iter, max(args.det_batch_num, 1)))
+        if len(batch) == 0:
+            break
+        starttime = time.time()
+        if args.frame_diff_thresh > 0:
+            batch_res = [text_sys.ocr_frame(item[-1]) for item in batch]
         else:
-            page_num = args.page_num
-            if page_num > len(img) or page_num == 0:
-                page_num = len(img)
-            imgs = img[:page_num]
-        for index, img in enumerate(imgs):
-            starttime = time.time()
-            dt_boxes, rec_res, time_dict = text_sys(img)
-            elapse = time.time() - starttime
+            batch_res = text_sys.ocr_batch([item[-1] for item in batch])
+        elapse = (time.time() - starttime) / len(batch)
+        for (idx, image_file, index, page_cnt, flag_gif, flag_pdf, img), (
+                dt_boxes, rec_res, time_dict) in zip(batch, batch_res):
+            idx += start_idx
             total_time += elapse
-            if len(imgs) > 1:
+            if page_cnt > 1:
                 logger.debug(
                     str(idx) + '_' + str(index) + "  Predict time of %s: %.3fs"
                     % (image_file, elapse))
@@ -205,7 +548,7 @@ def main(args):
                 "transcription": rec_res[i][0],
                 "points": np.array(dt_boxes[i]).astype(np.int32).tolist(),
             } for i in range(len(dt_boxes))]
-            if len(imgs) > 1:
+            if page_cnt > 1:
                 save_pred = os.path.basename(image_file) + '_' + str(
                     index) + "\t" + json.dumps(
                         res, ensure_ascii=False) + "\n"
@@ -241,12 +584,17 @@ def main(args):
                 logger.debug("The visualized image saved in {}".format(
                     os.path.join(draw_img_save_dir, os.path.basename(
                         save_file))))
+    return save_results, total_time
+
+
+def warmup(text_sys):
+    # warm up 10 times
+    img = np.random.uniform(0, 255, [640, 640, 3]).astype(np.uint8)
+    for i in range(10):
+        res = text_sys(img)
 
-    logger.info("The predict total time is {}".format(time.time() - _st))
-    if args.benchmark:
-        text_sys.text_detector.autolog.report()
-        text_sys.text_recognizer.autolog.report()
 
+def save_system_results(draw_img_save_dir, save_results):
     with open(
             os.path.join(draw_img_save_dir, "system_results.txt"),
             'w',
@@ -254,19 +602,117 @@ def main(args):
         f.writelines(save_results)
 
 
+def main(args):
+    image_file_list = get_image_file_list(args.image_dir)
+    image_file_list = image_file_list[args.process_id::args.total_process_num]
+    text_sys = TextSystem(args)
+    os.makedirs(args.draw_img_save_dir, exist_ok=True)
+
+    logger.info(
+        "In PP-OCRv3, rec_image_shape parameter defaults to '3, 48, 320', "
+        "if you are using recognition model with PP-OCRv2 or an older version, please set --rec_image_shape='3,32,320"
+    )
+
+    if args.warmup:
+        warmup(text_sys)
+
+    _st = time.time()
+    save_results, total_time = ocr_image_files(text_sys, args,
+                                               image_file_list)
+
+    logger.info("The predict total time is {}".format(time.time() - _st))
+    if text_sys.text_recognizer.rec_cache is not None:
+        logger.info("rec cache {}".format(
+            text_sys.text_recognizer.rec_cache.log()))
+    if text_sys.text_recognizer.dynamic_width:
+        logger.info("rec {}".format(
+            text_sys.text_recognizer.padding_log(
+                text_sys.instances('text_recognizer'))))
+    if args.use_angle_cls and text_sys.text_classifier.cls_cache is not None:
+        logger.info("cls cache {}".format(
+            text_sys.text_classifier.cls_cache.log()))
+    if args.frame_diff_thresh > 0:
+        logger.info("frames processed: {}, skipped: {}".format(
+            text_sys.frame_processed, text_sys.frame_skipped))
+    if args.benchmark:
+        text_sys.text_detector.autolog.report()
+        text_sys.text_recognizer.autolog.report()
+
+    save_system_results(args.draw_img_save_dir, save_results)
+
+
+# TextSystem owned by the current pool worker, see init_mp_worker
+_worker_text_sys = None
+_worker_args = None
+
+
+def init_mp_worker(args):
+    global _worker_text_sys, _worker_args
+    _worker_args = args
+    _worker_text_sys = TextSystem(args)
+    if args.warmup:
+        warmup(_worker_text_sys)
+
+
+def run_mp_worker(task):
+    idx, image_file = task
+    return ocr_image_files(_worker_text_sys, _worker_args, [image_file], idx)
+
+
+def main_mp(args):
+    """
+    Run OCR with a pool of total_process_num worker processes. Each worker
+    loads the models once and pulls one image file at a time, so workers
+    that finish early take the remaining files instead of idling. The
+    results of all workers are merged into one system_results.txt in the
+    order of the image file list.
+    """
+    image_file_list = get_image_file_list(args.image_dir)
+    total_process_num = max(min(args.total_process_num, len(image_file_list)),
+                            1)
+    os.makedirs(args.draw_img_save_dir, exist_ok=True)
+
+    # split cpu_threads between workers instead of starting that many
+    # threads in every worker
+    worker_args = copy.copy(args)
+    worker_args.use_mp = False
+    worker_args.cpu_threads = max(args.cpu_threads // total_process_num, 1)
+    if args.benchmark:
+        # the autolog of every worker would only time its share of the images
+        logger.warning("--benchmark is not supported with --use_mp, "
+                       "run without --use_mp to report the autolog timings")
+        worker_args.benchmark = False
+
+    _st = time.time()
+    save_results = []
+    total_time = 0
+    # spawn instead of fork, paddle is not fork safe
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(
+        total_process_num,
+        initializer=init_mp_worker,
+        initargs=(worker_args, ))
+    try:
+        for res, elapse in pool.imap(
+                run_mp_worker, enumerate(image_file_list), chunksize=1):
+            save_results.extend(res)
+            total_time += elapse
+    except BaseException:
+        pool.terminate()
+        raise
+    # let workers exit on their own, terminate would kill them with SIGTERM
+    pool.close()
+    pool.join()
+
+    logger.info("The predict total time is {}".format(time.time() - _st))
+    logger.info("The predict time of all images summed over {} workers is "
+                "{}".format(total_process_num, total_time))
+    save_system_results(args.draw_img_save_dir, save_results)
+
+
 if __name__ == "__main__":
     args = utility.parse_args()
     if args.use_mp:
-        p_list = []
-        total_process_num = args.total_process_num
-        for process_id in range(total_process_num):
-            cmd = [sys.executable, "-u"] + sys.argv + [
-                "--process_id={}".format(process_id),
-                "--use_mp={}".format(False)
-            ]
-            p = subprocess.Popen(cmd, stdout=sys.stdout, stderr=sys.stdout)
-            p_list.append(p)
-        for p in p_list:
-            p.wait()
+        main_mp(args)
     else:
         main(args)
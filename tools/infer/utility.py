@@ -15,7 +15,11 @@
 import argparse
 import os
 import sys
+import copy
+import queue
 import platform
+import threading
+import contextlib
 import cv2
 import numpy as np
 import paddle
@@ -25,6 +29,7 @@ from paddle import inference
 import time
 import random
 from ppocr.utils.logging import get_logger
+from ppocr.utils.utility import check_and_read
 
 
 def str2bool(v):
@@ -54,6 +59,8 @@ def init_args():
     parser.add_argument("--det_limit_side_len", type=float, default=960)
     parser.add_argument("--det_limit_type", type=str, default='max')
     parser.add_argument("--det_box_type", type=str, default='quad')
+    parser.add_argument("--det_sort_y_thresh", type=float, default=10)
+    parser.add_argument("--det_batch_num", type=int, default=1)
 
     # DB parmas
     parser.add_argument("--det_db_thresh", type=float, default=0.3)
@@ -90,6 +97,10 @@ def init_args():
     parser.add_argument("--rec_image_inverse", type=str2bool, default=True)
     parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
     parser.add_argument("--rec_batch_num", type=int, default=6)
+    # batch crops by bucket width under a padded pixel budget
+    parser.add_argument("--use_rec_bucket_batch", type=str2bool, default=False)
+    parser.add_argument("--rec_bucket_widths", type=str, default="")
+    parser.add_argument("--rec_batch_pixels", type=int, default=0)
     parser.add_argument("--max_text_length", type=int, default=25)
     parser.add_argument(
         "--rec_char_dict_path",
@@ -99,6 +110,9 @@ def init_args():
     parser.add_argument(
         "--vis_font_path", type=str, default="./doc/fonts/simfang.ttf")
     parser.add_argument("--drop_score", type=float, default=0.5)
+    # lru cache of recognized crops, 0 disables it
+    parser.add_argument("--rec_cache_size", type=int, default=0)
+    parser.add_argument("--rec_cache_tolerance", type=int, default=0)
 
     # params for e2e
     parser.add_argument("--e2e_algorithm", type=str, default='PGNet')
@@ -120,6 +134,8 @@ def init_args():
     parser.add_argument("--label_list", type=list, default=['0', '180'])
     parser.add_argument("--cls_batch_num", type=int, default=6)
     parser.add_argument("--cls_thresh", type=float, default=0.9)
+    parser.add_argument("--cls_cache_size", type=int, default=0)
+    parser.add_argument("--cls_cache_tolerance", type=int, default=0)
 
     parser.add_argument("--enable_mkldnn", type=str2bool, default=False)
     parser.add_argument("--cpu_threads", type=int, default=10)
@@ -137,6 +153,20 @@ def init_args():
     parser.add_argument("--save_crop_res", type=str2bool, default=False)
     parser.add_argument("--crop_res_save_dir", type=str, default="./output")
 
+    # params for meter templates
+    parser.add_argument("--meter_template_config", type=str, default=None)
+    parser.add_argument("--meter_min_inliers", type=int, default=15)
+    # reuse the last result while the rois of a fixed camera do not change
+    # by more than this many gray levels, 0 processes every frame
+    parser.add_argument("--frame_diff_thresh", type=float, default=0)
+    # run detection again after this many reused frames, so that text
+    # outside of the last rois is found, 0 only detects on a change
+    parser.add_argument("--frame_redetect_interval", type=int, default=30)
+
+    # max instances of every model serving concurrent callers of TextSystem,
+    # they share the weights, see PredictorPool
+    parser.add_argument("--predictor_pool_size", type=int, default=1)
+
     # multi-process
     parser.add_argument("--use_mp", type=str2bool, default=False)
     parser.add_argument("--total_process_num", type=int, default=1)
@@ -278,18 +308,23 @@ def create_predictor(args, mode, logger):
 
         # create predictor
         predictor = inference.create_predictor(config)
-        input_names = predictor.get_input_names()
-        if mode in ['ser', 're']:
-            input_tensor = []
-            for name in input_names:
-                input_tensor.append(predictor.get_input_handle(name))
-        else:
-            for name in input_names:
-                input_tensor = predictor.get_input_handle(name)
+        input_tensor = get_input_tensor(mode, predictor)
         output_tensors = get_output_tensors(args, mode, predictor)
         return predictor, input_tensor, output_tensors, config
 
 
+def get_input_tensor(mode, predictor):
+    input_names = predictor.get_input_names()
+    if mode in ['ser', 're']:
+        input_tensor = []
+        for name in input_names:
+            input_tensor.append(predictor.get_input_handle(name))
+    else:
+        for name in input_names:
+            input_tensor = predictor.get_input_handle(name)
+    return input_tensor
+
+
 def get_output_tensors(args, mode, predictor):
     output_names = predictor.get_output_names()
     output_tensors = []
@@ -310,6 +345,93 @@ def get_output_tensors(args, mode, predictor):
     return output_tensors
 
 
+class PredictorPool(object):
+    """
+    Pool of instances of a model (TextDetector, TextRecognizer, ...) for
+    concurrent callers. Every instance but the first one owns a clone of the
+    predictor of model made with predictor.clone(), which shares the weights,
+    with its own input and output handles and batch buffer. An instance
+    serves one caller at a time, checkout blocks while max_size instances are
+    in use. onnxruntime sessions are thread safe and shared by all instances.
+
+    The other attributes of model are shared too: the crop caches, which
+    hold a lock, and the autolog of --benchmark, whose timings are only
+    reliable without concurrent callers. Counters like the padding stats of
+    TextRecognizer are per instance, merge them over instances().
+
+    args:
+        model: model created with args, the first instance
+        args: args of create_predictor
+        mode: mode of create_predictor
+        max_size: max number of instances
+    """
+
+    def __init__(self, model, args, mode, max_size):
+        self.model = model
+        self.args = args
+        self.mode = mode
+        self.max_size = max_size
+        self.size = 1
+        self.lock = threading.Lock()
+        self.free = queue.LifoQueue()
+        self.free.put(model)
+        self.created = [model]
+
+    def clone(self):
+        model = copy.copy(self.model)
+        if not self.args.use_onnx:
+            predictor = self.model.predictor.clone()
+            model.predictor = predictor
+            model.input_tensor = get_input_tensor(self.mode, predictor)
+            model.output_tensors = get_output_tensors(self.args, self.mode,
+                                                      predictor)
+        if hasattr(model, 'batch_buffer'):
+            model.batch_buffer = None
+        if hasattr(model, 'batch_cnt'):
+            # counted from zero, so that the sums over instances() hold
+            model.batch_cnt = 0
+            model.useful_width = 0
+            model.padded_width = 0
+        return model
+
+    def checkout(self):
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            grow = self.size < self.max_size
+            if grow:
+                self.size += 1
+        if not grow:
+            return self.free.get()
+        try:
+            model = self.clone()
+        except Exception:
+            with self.lock:
+                self.size -= 1
+            raise
+        with self.lock:
+            self.created.append(model)
+        return model
+
+    def instances(self):
+        """All instances created so far, in use or free."""
+        with self.lock:
+            return list(self.created)
+
+    def checkin(self, model):
+        self.free.put(model)
+
+    @contextlib.contextmanager
+    def get(self):
+        model = self.checkout()
+        try:
+            yield model
+        finally:
+            self.checkin(model)
+
+
 def get_infer_gpuid():
     sysstr = platform.system()
     if sysstr == "Windows":
@@ -327,6 +449,34 @@ def get_infer_gpuid():
         return int(gpu_id[0])
 
 
+def read_image_pages(image_file_list, page_num, logger):
+    """
+    Lazily load the images, gifs and pdf pages of image_file_list
+    args:
+        image_file_list(list): image file paths
+        page_num(int): max pages read from a pdf, 0 for all
+    return:
+        generator of (idx, image_file, index, page_cnt, flag_gif, flag_pdf,
+        img) where index is the page index inside a file of page_cnt pages
+    """
+    for idx, image_file in enumerate(image_file_list):
+        img, flag_gif, flag_pdf = check_and_read(image_file)
+        if not flag_gif and not flag_pdf:
+            img = cv2.imread(image_file)
+        if not flag_pdf:
+            if img is None:
+                logger.debug("error in loading image:{}".format(image_file))
+                continue
+            imgs = [img]
+        else:
+            num_pages = page_num
+            if num_pages > len(img) or num_pages == 0:
+                num_pages = len(img)
+            imgs = img[:num_pages]
+        for index, img in enumerate(imgs):
+            yield idx, image_file, index, len(imgs), flag_gif, flag_pdf, img
+
+
 def draw_e2e_res(dt_boxes, strs, img_path):
     src_im = cv2.imread(img_path)
     for box, str in zip(dt_boxes, strs):
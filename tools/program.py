@@ -374,6 +374,10 @@ def train(config,
                     total_samples / print_batch_step,
                     total_samples / train_batch_cost, eta_sec_format)
                 logger.info(strs)
+                op_profiler = getattr(train_dataloader.dataset, 'op_profiler',
+                                      None)
+                if op_profiler is not None:
+                    logger.info(op_profiler.log())
 
                 total_samples = 0
                 train_reader_cost = 0.0